@@ -1,7 +1,28 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+from app.core.startup import startup_timer
+from app.services.service_locator import navigation_service
 
 router = APIRouter()
 
 @router.get("")
 async def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    """Liveness: the process is up and serving, whether or not the engine is built"""
+    return {"status": "healthy"}
+
+@router.get("/ready")
+async def readiness_check():
+    """Readiness: route requests will not wait on path engine start-up"""
+    executor = navigation_service.executor
+    body = {
+        "status": "ready" if navigation_service.ready else "starting",
+        "engine_warm_up": navigation_service.warm_up_mode,
+        "engine_loaded": executor.ready,
+        "startup_ms": startup_timer.snapshot(),
+    }
+    if executor.warm_up_error:
+        body["status"] = "failed"
+        body["error"] = executor.warm_up_error
+    if body["status"] != "ready":
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=body)
+    return body
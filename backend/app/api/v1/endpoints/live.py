@@ -0,0 +1,110 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+from pydantic import BaseModel, ValidationError
+from app.auth.auth import _check_api_key
+from app.core.telemetry import stage_metrics
+from app.models.navigation import Coordinates
+from app.services.live_routing import LiveRouteSession, LiveSessionLimitError
+from app.services.service_locator import live_sessions, navigation_service
+
+router = APIRouter()
+
+# RFC 6455 close codes
+POLICY_VIOLATION = status.WS_1008_POLICY_VIOLATION
+TRY_AGAIN_LATER = status.WS_1013_TRY_AGAIN_LATER
+
+
+class LiveStart(BaseModel):
+    start: Coordinates
+    end: Coordinates
+    mode: str = "auto"
+
+
+class LiveUpdate(BaseModel):
+    position: Optional[Coordinates] = None
+    block: List[Coordinates] = []
+    unblock: List[Coordinates] = []
+    block_edges: List[List[int]] = []
+    unblock_edges: List[List[int]] = []
+
+
+async def _receive(websocket: WebSocket) -> Dict[str, Any]:
+    """Next JSON object from the client; TimeoutError once the session has been idle too long"""
+    text = await asyncio.wait_for(websocket.receive_text(), timeout=live_sessions.idle_seconds)
+    message = json.loads(text)
+    if not isinstance(message, dict):
+        raise ValueError("Messages are JSON objects")
+    return message
+
+
+async def _repair(session: LiveRouteSession, update: LiveUpdate) -> Dict[str, Any]:
+    budget = navigation_service.new_budget()
+    with stage_metrics.stage("live_repair"):
+        return await asyncio.to_thread(
+            live_sessions.update, session, position=update.position, block=update.block,
+            unblock=update.unblock, block_edges=update.block_edges, unblock_edges=update.unblock_edges,
+            budget=budget)
+
+
+@router.websocket("/live")
+async def live_route(websocket: WebSocket):
+    """Live re-routing: the route is repaired after every position or network update.
+
+    The first message opens the session,
+    `{"type": "start", "start": {...}, "end": {...}, "mode": "auto|grid|graph"}`;
+    after that each `{"type": "update", "position": {...}, "block": [...],
+    "unblock": [...], "block_edges": [[from_id, to_id]], "unblock_edges": [...]}`
+    is answered with the repaired route. Invalid messages get
+    `{"type": "error", "detail": ...}` and leave the session open.
+    """
+    api_key = websocket.headers.get("X-API-Key") or websocket.query_params.get("api_key")
+    try:
+        _check_api_key(api_key)
+    except HTTPException as e:
+        await websocket.close(code=POLICY_VIOLATION, reason=e.detail)
+        return
+    await websocket.accept()
+
+    session = None
+    try:
+        while session is None:
+            try:
+                message = await _receive(websocket)
+                if message.get("type") != "start":
+                    raise ValueError("Open the session with a 'start' message first")
+                request = LiveStart.model_validate(message)
+                session = await asyncio.to_thread(live_sessions.open, request.start, request.end, request.mode)
+                route = await _repair(session, LiveUpdate())
+            except LiveSessionLimitError as e:
+                await websocket.close(code=TRY_AGAIN_LATER, reason=str(e))
+                return
+            except (ValueError, ValidationError) as e:
+                if session is not None:
+                    live_sessions.close(session)
+                    session = None
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            await websocket.send_json(route)
+
+        while True:
+            try:
+                message = await _receive(websocket)
+                if not live_sessions.touch(session):
+                    await websocket.close(code=TRY_AGAIN_LATER, reason="Session expired")
+                    return
+                if message.get("type") != "update":
+                    raise ValueError(f"Unknown message type '{message.get('type')}'")
+                route = await _repair(session, LiveUpdate.model_validate(message))
+            except (ValueError, ValidationError) as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            await websocket.send_json(route)
+    except asyncio.TimeoutError:
+        await websocket.close(code=status.WS_1000_NORMAL_CLOSURE, reason="Idle timeout")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if session is not None:
+            live_sessions.close(session)
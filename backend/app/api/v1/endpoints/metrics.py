@@ -1,7 +1,11 @@
-from fastapi import APIRouter
-import psutil
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
 import time
-from app.services.service_locator import navigation_service
+from app.auth.auth import verify_api_key
+from app.core.telemetry import profiler, stage_metrics
+from app.services.service_locator import live_sessions, navigation_service
+from app.middleware.rate_limiter import rate_limiter
+from app.utils.logger import log_pipeline
 
 router = APIRouter()
 start_time = time.time()
@@ -9,13 +13,61 @@ start_time = time.time()
 @router.get("")
 async def get_metrics():
     """Return basic metrics about the API"""
+    # Imported on first use so workers don't pay for it during start-up
+    import psutil
+    executor = navigation_service.executor
+    engine_loaded = executor.ready and executor.mode != "process"
     return {
         "uptime_seconds": time.time() - start_time,
         "cpu_usage_percent": psutil.cpu_percent(),
         "memory_usage_percent": psutil.virtual_memory().percent,
         "active_threads": len(psutil.Process().threads()),
         "route_calculation_count": getattr(navigation_service, 'calculation_count', 0),
-        "cache_hits": getattr(navigation_service, 'cache_hits', 0),
-        "cache_size": len(getattr(navigation_service, 'cache', {})),
-        "using_wasm": getattr(navigation_service, 'use_wasm', False)
-    }
\ No newline at end of file
+        "cache_hits": navigation_service.cache.hits,
+        "cache_size": len(navigation_service.cache),
+        "cache": navigation_service.cache.stats(),
+        "cache_tiers": navigation_service.cache_tier_stats(),
+        "route_budget": navigation_service.budget_stats(),
+        "coalescing": navigation_service.in_flight.stats(),
+        "simplification": navigation_service.simplification_stats(),
+        "matrix": navigation_service.matrix_stats(),
+        "isochrone": navigation_service.isochrone_stats(),
+        "latency": stage_metrics.summary(),
+        "profiler": profiler.stats(),
+        "logging": log_pipeline.stats(),
+        "live_sessions": live_sessions.stats(),
+        # Reported once built; reading them must not trigger engine start-up
+        "using_wasm": navigation_service.use_wasm if engine_loaded else False,
+        "route_executor": executor.stats(),
+        "path_engine": executor.engine.stats() if engine_loaded else None,
+        "rate_limiter": rate_limiter.stats(),
+        "shared_state": navigation_service.shared_state.stats() if navigation_service.shared_state else None
+    }
+
+@router.get("/prometheus", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """Per-stage latency histograms in Prometheus text exposition format"""
+    return PlainTextResponse(stage_metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@router.post("/profiler")
+async def start_profiler(
+    requests: int = Query(100, ge=1, le=100_000, description="Stop after this many requests have finished"),
+    interval_ms: float = Query(5.0, ge=1, le=1000, description="Time between stack samples"),
+    api_key: str = Depends(verify_api_key)
+):
+    """Start sampling stacks for the next `requests` requests, discarding earlier results"""
+    profiler.start(requests, interval_ms)
+    return profiler.stats()
+
+@router.delete("/profiler")
+async def stop_profiler(api_key: str = Depends(verify_api_key)):
+    profiler.stop()
+    return profiler.stats()
+
+@router.get("/profiler", response_class=PlainTextResponse)
+async def get_profile(
+    limit: int = Query(200, ge=1, description="Most frequent stacks to return"),
+    api_key: str = Depends(verify_api_key)
+):
+    """Sampled stacks in collapsed format ("frame;frame;... count"), for flamegraph tools"""
+    return PlainTextResponse(profiler.collapsed(limit))
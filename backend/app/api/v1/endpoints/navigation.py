@@ -1,14 +1,241 @@
-from fastapi import APIRouter, Body, Depends
-from app.models.navigation import RouteRequest, RouteResponse
+import asyncio
+import time
+from typing import Awaitable, Iterator, Optional, TypeVar
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
+from app.models.navigation import (RouteRequest, RouteResponse, BatchRouteRequest, BatchRouteResponse,
+                                   MatrixRequest, MatrixResponse, IsochroneRequest, IsochroneResponse)
 from app.services.service_locator import navigation_service
 from app.auth.auth import verify_api_key
+from app.core.config import get_settings
+from app.core.telemetry import stage_metrics
+from app.services.search_budget import SearchBudget
+from app.utils.simplify import MAX_ZOOM, zoom_tolerance_m
+from app.utils.route_encoding import (FORMAT_MEDIA_TYPES, MATRIX_FORMATS, STREAMING_FORMATS, encode_matrix,
+                                      encode_route, encode_routes, iter_route_chunks, iter_routes_chunks,
+                                      negotiate_format)
 
 router = APIRouter()
 
+FORMAT_DESCRIPTION = "Response format: " + ", ".join(FORMAT_MEDIA_TYPES) + ". Overrides the Accept header."
+TIME_BUDGET_DESCRIPTION = "Deadline in milliseconds; can only tighten the server's limit"
+EXPANSIONS_DESCRIPTION = "Cap on nodes expanded per search; can only tighten the server's limit"
+TOLERANCE_DESCRIPTION = "Simplify the path, dropping points within this many meters of the simplified line"
+ZOOM_DESCRIPTION = "Simplify the path to one pixel of deviation at this map zoom level; ignored with tolerance_m"
+STREAM_DESCRIPTION = ("Send the path in chunks as it is encoded: NDJSON (the default) or chunked "
+                      "f32/f64. format=ndjson always streams.")
+
+# nginx's "client closed request"; nobody reads it, but it shows up in access logs
+CLIENT_CLOSED_REQUEST = 499
+_DISCONNECT_POLL_SECONDS = 0.1
+
+T = TypeVar("T")
+
+def _response_format(accept: Optional[str], requested: Optional[str]) -> str:
+    try:
+        return negotiate_format(accept, requested)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail=str(e))
+
+def _stream_format(fmt: str, stream: bool) -> Optional[str]:
+    """Format to stream the response in, or None to send a single body"""
+    if fmt == "ndjson":
+        return fmt
+    if not stream:
+        return None
+    if fmt == "json":
+        return "ndjson"
+    if fmt not in STREAMING_FORMATS:
+        raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                            detail=f"Format '{fmt}' cannot be streamed; use one of {', '.join(STREAMING_FORMATS)}")
+    return fmt
+
+def _tolerance(tolerance_m: Optional[float], zoom: Optional[int], lat: float) -> Optional[float]:
+    if tolerance_m is not None or zoom is None:
+        return tolerance_m
+    return zoom_tolerance_m(zoom, lat)
+
+def _timed_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Pass chunks through, recording the time spent encoding them as one serialization sample"""
+    encoding = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                encoding += time.perf_counter() - started
+            yield chunk
+    finally:
+        stage_metrics.observe("serialization", encoding)
+
+async def _until_disconnect(http_request: Request, work: Awaitable[T], budget: SearchBudget) -> Optional[T]:
+    """Await `work`, cancelling it and its search if the client disconnects first.
+
+    Returns None when the client went away.
+    """
+    task = asyncio.ensure_future(work)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=_DISCONNECT_POLL_SECONDS)
+        if done:
+            return task.result()
+        if await http_request.is_disconnected():
+            budget.cancel()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return None
+
 @router.post("/route", response_model=RouteResponse)
 async def calculate_route(
+    http_request: Request,
     request: RouteRequest = Body(...),
+    format: Optional[str] = Query(None, description=FORMAT_DESCRIPTION),
+    stream: bool = Query(False, description=STREAM_DESCRIPTION),
+    tolerance_m: Optional[float] = Query(None, gt=0, description=TOLERANCE_DESCRIPTION),
+    zoom: Optional[int] = Query(None, ge=0, le=MAX_ZOOM, description=ZOOM_DESCRIPTION),
+    time_budget_ms: Optional[float] = Query(None, gt=0, description=TIME_BUDGET_DESCRIPTION),
+    max_expansions: Optional[int] = Query(None, gt=0, description=EXPANSIONS_DESCRIPTION),
+    accept: Optional[str] = Header(None),
     api_key: str = Depends(verify_api_key)
 ):
     """Calculate a route between two points"""
-    return await navigation_service.calculate_route(request.start, request.end)
\ No newline at end of file
+    fmt = _response_format(accept, format)
+    stream_fmt = _stream_format(fmt, stream)
+    budget = navigation_service.new_budget(time_budget_ms, max_expansions)
+    tolerance = _tolerance(tolerance_m, zoom, request.start.lat)
+    route = await _until_disconnect(
+        http_request, navigation_service.compute_route(request.start, request.end, budget, tolerance), budget)
+    if route is None:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    stage_metrics.observe("route_calculation", route.calculation_time_ms / 1000)
+    headers = {
+        "X-Point-Count": str(len(route)),
+        "X-Original-Point-Count": str(route.original_point_count),
+        "X-Calculation-Time-Ms": f"{route.calculation_time_ms:.3f}",
+        "X-Route-Degraded": "true" if route.degraded else "false",
+    }
+    if stream_fmt is not None:
+        # Chunks are encoded as the client reads them, so the encoded body never exists whole
+        chunks = iter_route_chunks(route, stream_fmt, get_settings().ROUTE_STREAM_CHUNK_POINTS)
+        return StreamingResponse(_timed_chunks(chunks), media_type=FORMAT_MEDIA_TYPES[stream_fmt], headers=headers)
+    # Encoded directly from the array-backed result; returning a Response skips
+    # response_model re-validation, which stays declared for the OpenAPI schema
+    with stage_metrics.stage("serialization"):
+        content = encode_route(route, fmt)
+    return Response(content=content, media_type=FORMAT_MEDIA_TYPES[fmt], headers=headers)
+
+@router.post("/routes", response_model=BatchRouteResponse)
+async def calculate_routes(
+    http_request: Request,
+    request: BatchRouteRequest = Body(...),
+    format: Optional[str] = Query(None, description=FORMAT_DESCRIPTION),
+    tolerance_m: Optional[float] = Query(None, gt=0, description=TOLERANCE_DESCRIPTION),
+    zoom: Optional[int] = Query(None, ge=0, le=MAX_ZOOM, description=ZOOM_DESCRIPTION),
+    time_budget_ms: Optional[float] = Query(None, gt=0, description=TIME_BUDGET_DESCRIPTION),
+    max_expansions: Optional[int] = Query(None, gt=0, description=EXPANSIONS_DESCRIPTION),
+    accept: Optional[str] = Header(None),
+    api_key: str = Depends(verify_api_key)
+):
+    """Calculate routes for many start/end pairs in one request"""
+    fmt = _response_format(accept, format)
+    max_routes = get_settings().MAX_BATCH_ROUTES
+    if len(request.routes) > max_routes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch size exceeds the limit of {max_routes} routes"
+        )
+    pairs = [(route.start, route.end) for route in request.routes]
+    budget = navigation_service.new_budget(time_budget_ms, max_expansions)
+    # One tolerance for the whole batch, taken at the batch's mean latitude for zoom
+    mean_lat = sum(start.lat for start, _ in pairs) / len(pairs) if pairs else 0.0
+    tolerance = _tolerance(tolerance_m, zoom, mean_lat)
+    routes = await _until_disconnect(
+        http_request, navigation_service.compute_routes(pairs, budget, tolerance), budget)
+    if routes is None:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    # Binary bodies have no room for per-route flags, so the count goes in a header
+    headers = {
+        "X-Degraded-Routes": str(sum(route.degraded for route in routes)),
+        "X-Point-Count": str(sum(len(route) for route in routes)),
+        "X-Original-Point-Count": str(sum(route.original_point_count for route in routes)),
+    }
+    if fmt == "ndjson":
+        chunks = iter_routes_chunks(routes, fmt, get_settings().ROUTE_STREAM_CHUNK_POINTS)
+        return StreamingResponse(_timed_chunks(chunks), media_type=FORMAT_MEDIA_TYPES[fmt], headers=headers)
+    with stage_metrics.stage("serialization"):
+        content = encode_routes(routes, fmt)
+    return Response(content=content, media_type=FORMAT_MEDIA_TYPES[fmt], headers=headers)
+
+@router.post("/matrix", response_model=MatrixResponse)
+async def calculate_matrix(
+    http_request: Request,
+    request: MatrixRequest = Body(...),
+    format: Optional[str] = Query(None, description="Response format: " + ", ".join(MATRIX_FORMATS)),
+    time_budget_ms: Optional[float] = Query(None, gt=0, description=TIME_BUDGET_DESCRIPTION),
+    max_expansions: Optional[int] = Query(None, gt=0, description=EXPANSIONS_DESCRIPTION),
+    accept: Optional[str] = Header(None),
+    api_key: str = Depends(verify_api_key)
+):
+    """Distances and durations from every source to every destination, without paths"""
+    fmt = _response_format(accept, format)
+    if fmt not in MATRIX_FORMATS:
+        raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                            detail=f"Format '{fmt}' is not available for matrices; use one of {', '.join(MATRIX_FORMATS)}")
+    destinations = request.destinations or request.sources
+    max_cells = get_settings().MAX_MATRIX_CELLS
+    if len(request.sources) * len(destinations) > max_cells:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Matrix size exceeds the limit of {max_cells} cells"
+        )
+    budget = navigation_service.new_budget(time_budget_ms, max_expansions)
+    try:
+        matrix = await _until_disconnect(
+            http_request,
+            navigation_service.compute_matrix(request.sources, destinations, request.mode, request.speed_kmh, budget),
+            budget)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if matrix is None:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    headers = {
+        "X-Matrix-Mode": matrix.mode,
+        "X-Calculation-Time-Ms": f"{matrix.calculation_time_ms:.3f}",
+        "X-Route-Degraded": "true" if matrix.degraded else "false",
+    }
+    with stage_metrics.stage("serialization"):
+        content = encode_matrix(matrix, fmt)
+    return Response(content=content, media_type=FORMAT_MEDIA_TYPES[fmt], headers=headers)
+
+@router.post("/isochrone", response_model=IsochroneResponse)
+async def calculate_isochrone(
+    http_request: Request,
+    request: IsochroneRequest = Body(...),
+    time_budget_ms: Optional[float] = Query(None, gt=0, description=TIME_BUDGET_DESCRIPTION),
+    max_expansions: Optional[int] = Query(None, gt=0, description=EXPANSIONS_DESCRIPTION),
+    api_key: str = Depends(verify_api_key)
+):
+    """Everything reachable from the origin within `max_cost`, as polygons or cells"""
+    budget = navigation_service.new_budget(time_budget_ms, max_expansions)
+    try:
+        isochrone = await _until_disconnect(
+            http_request,
+            navigation_service.compute_isochrone(request.origin, request.max_cost, request.mode, budget),
+            budget)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if isochrone is None:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    headers = {
+        "X-Isochrone-Mode": isochrone.mode,
+        "X-Expanded": str(isochrone.expanded),
+        "X-Cache": "hit" if isochrone.cached else "miss",
+        "X-Calculation-Time-Ms": f"{isochrone.calculation_time_ms:.3f}",
+        "X-Route-Degraded": "true" if isochrone.degraded else "false",
+    }
+    # Tracing and simplifying the outline takes tens of milliseconds for large areas; keep it off the loop
+    with stage_metrics.stage("serialization"):
+        content = await asyncio.to_thread(isochrone.to_json, request.output, request.tolerance_m)
+    return Response(content=content, media_type="application/json", headers=headers)
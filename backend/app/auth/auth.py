@@ -2,6 +2,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import APIKeyHeader
 import os
 from dotenv import load_dotenv
+from app.core.telemetry import stage_metrics
 
 load_dotenv()
 
@@ -9,6 +10,10 @@ API_KEY = os.getenv("API_KEY", "development_key")
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 async def verify_api_key(api_key: str = Depends(api_key_header)):
+    with stage_metrics.stage("auth"):
+        return _check_api_key(api_key)
+
+def _check_api_key(api_key: str) -> str:
     if api_key is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,3 +1,4 @@
+import logging
 import os
 
 # Try to import from pydantic_settings, fall back to pydantic
@@ -10,6 +11,8 @@ except ImportError:
 from functools import lru_cache
 from typing import List
 
+from pydantic import field_validator
+
 class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "Navigation System API"
@@ -22,9 +25,129 @@ class Settings(BaseSettings):
     
     # Add any additional configuration items here
     MAPBOX_API_KEY: str = ""
-    
+
+    # Rate limits (sliding one-minute window). The per-API-key limit is
+    # applied on top of the per-IP one; 0 disables it.
+    MAX_REQUESTS_PER_MINUTE: int = 100
+    MAX_REQUESTS_PER_MINUTE_PER_API_KEY: int = 0
+    RATE_LIMIT_IDLE_SECONDS: float = 300
+
+    # Host-wide state shared by all workers through a memory-mapped file.
+    # Empty path keeps rate limits and the route cache per process.
+    SHARED_STATE_PATH: str = ""
+    SHARED_STATE_LIMITER_SLOTS: int = 65536
+    SHARED_STATE_CACHE_SLOTS: int = 4096
+    SHARED_STATE_CACHE_MAX_POINTS: int = 2048
+    SHARED_STATE_LOCK_STRIPES: int = 64
+
+    # Route cache limits (TTL of 0 disables expiry)
+    ROUTE_CACHE_MAX_ENTRIES: int = 10000
+    ROUTE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    ROUTE_CACHE_TTL_SECONDS: float = 0
+    # "exact" keys on raw coordinates; "grid" keys on the A* grid cell
+    ROUTE_CACHE_KEY_MODE: str = "exact"
+    # Must match the grid used by find_path in wasm/src/lib.rs (0.01 degrees)
+    ROUTE_GRID_RESOLUTION: float = 0.01
+
+    # Persistent on-disk route cache consulted after the in-memory and shared tiers.
+    # Empty path disables it; the store is trimmed back under the byte limit in the background.
+    ROUTE_CACHE_DISK_PATH: str = ""
+    ROUTE_CACHE_DISK_MAX_BYTES: int = 1024 * 1024 * 1024
+    ROUTE_CACHE_DISK_COMPACT_INTERVAL_SECONDS: float = 300
+
+    # Road network (CSV exports: nodes "id,lat,lng", edges "source,target[,length_m]").
+    # When set, routes follow the network and the grid/straight-line engines are fallbacks.
+    # The cache directory holds the parsed CSR arrays, which later loads memory-map.
+    GRAPH_NODES_PATH: str = ""
+    GRAPH_EDGES_PATH: str = ""
+    GRAPH_CACHE_DIR: str = ""
+    GRAPH_BIDIRECTIONAL: bool = True
+    GRAPH_INDEX_CELL_DEGREES: float = 0.01
+    # Query points farther than this from any node are not routed on the network
+    GRAPH_SNAP_MAX_DISTANCE_M: float = 5000
+    # A* heuristic: "astar" (haversine), "alt" (landmarks from `python -m app.services.landmarks`,
+    # stored in GRAPH_CACHE_DIR) or "auto" (landmarks whenever they have been built)
+    GRAPH_SEARCH: str = "auto"
+
+    # Logging goes through a bounded queue to a background writer. LOG_FORMAT is
+    # "json" or "text"; an empty LOG_FILE logs to stdout only. Each message type
+    # may log LOG_RATE_PER_SECOND records per second with bursts of LOG_RATE_BURST
+    # (0 disables rate limiting); the excess is dropped and counted in /metrics.
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_FILE: str = ""
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_RATE_PER_SECOND: float = 10.0
+    LOG_RATE_BURST: int = 20
+
+    @field_validator("LOG_LEVEL")
+    @classmethod
+    def _known_log_level(cls, value: str) -> str:
+        level = value.upper()
+        if not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"LOG_LEVEL must be DEBUG, INFO, WARNING, ERROR or CRITICAL, not {value!r}")
+        return level
+
+    # Upper bound on start/end pairs accepted by POST /navigation/routes
+    MAX_BATCH_ROUTES: int = 1000
+    # Points per chunk when a route is streamed (`?stream=true` or `?format=ndjson`)
+    ROUTE_STREAM_CHUNK_POINTS: int = 1024
+    # POST /navigation/matrix: largest sources x destinations accepted, and the
+    # average speed (km/h) used for durations when the request gives none
+    MAX_MATRIX_CELLS: int = 250_000
+    MATRIX_SPEED_KMH: float = 50.0
+    # POST /navigation/isochrone: graph-mode results are rasterized at
+    # ISOCHRONE_GRAPH_RESOLUTION degrees and cached by origin quantized to that
+    # cell and budget rounded down to ISOCHRONE_COST_STEP_M (grid mode keys on the
+    # route grid cell and whole steps). One expansion covers at most
+    # ISOCHRONE_MAX_CELLS cells or nodes.
+    ISOCHRONE_GRAPH_RESOLUTION: float = 0.001
+    ISOCHRONE_COST_STEP_M: float = 10.0
+    ISOCHRONE_MAX_CELLS: int = 1_000_000
+    ISOCHRONE_CACHE_MAX_ENTRIES: int = 1000
+    ISOCHRONE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Live re-routing over WebSocket (/navigation/live). Each session keeps an
+    # incremental search; sessions idle longer than LIVE_SESSION_IDLE_SECONDS are
+    # closed, and one search may hold at most LIVE_SESSION_MAX_STATES vertices and
+    # LIVE_SESSION_MAX_BLOCKED closed cells, nodes or edges. All sessions together
+    # hold at most LIVE_MAX_TOTAL_STATES vertices (0 = no shared cap); at roughly
+    # 200-250 bytes per vertex the default is about 250 MB.
+    LIVE_MAX_SESSIONS: int = 1000
+    LIVE_MAX_TOTAL_STATES: int = 1_000_000
+    LIVE_SESSION_IDLE_SECONDS: float = 300
+    LIVE_SESSION_MAX_STATES: int = 200_000
+    LIVE_SESSION_MAX_BLOCKED: int = 10_000
+
+    # Route computation pool: "thread", "process" or "inline" (on the event loop).
+    # Workers default to the host's CPU count; beyond workers + queue, requests get 503.
+    ROUTE_EXECUTOR_MODE: str = "thread"
+    ROUTE_EXECUTOR_WORKERS: int = 0
+    ROUTE_EXECUTOR_MAX_QUEUE: int = 256
+
+    # Per-request search budget. A search that expands more nodes or runs past
+    # the deadline returns a degraded best-effort path instead of blocking a
+    # worker; requests may only tighten these (0 = unbounded).
+    ROUTE_MAX_EXPANSIONS: int = 500_000
+    ROUTE_TIME_BUDGET_MS: int = 5000
+
+    # WASM engine. The pool holds one instance per concurrent search (0 = CPU count);
+    # instances whose linear memory grows past the limit are recycled.
+    USE_WASM: bool = True
+    WASM_PATH: str = ""
+    WASM_POOL_SIZE: int = 0
+    WASM_MAX_MEMORY_BYTES: int = 64 * 1024 * 1024
+    # Directory for precompiled modules keyed by the binary's hash; empty compiles on every start.
+    # Artifacts are loaded without validation, so only this service should be able to write here.
+    WASM_ARTIFACT_CACHE_DIR: str = ""
+    # When the path engine is built: "background" (after startup, gated by /health/ready),
+    # "eager" (before the app accepts requests) or "lazy" (on the first route request)
+    ENGINE_WARMUP: str = "background"
+
     class Config:
         env_file = ".env"
+        # The repository-root .env also carries the frontend's REACT_APP_* keys
+        extra = "ignore"
 
 @lru_cache
 def get_settings() -> Settings:
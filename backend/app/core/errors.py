@@ -1,18 +1,36 @@
+import math
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
+class ServiceOverloadedError(Exception):
+    """Raised when route computation cannot accept more work right now"""
+
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
     )
 
+def _json_safe(error: dict) -> dict:
+    # The rejected input is echoed back, and NaN/Infinity have no JSON encoding
+    value = error.get("input")
+    if isinstance(value, float) and not math.isfinite(value):
+        return {**error, "input": str(value)}
+    return error
+
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     return JSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-        content={"detail": exc.errors()},
+        content={"detail": [_json_safe(error) for error in exc.errors()]},
+    )
+
+async def service_overloaded_handler(request: Request, exc: ServiceOverloadedError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
     )
 
 async def generic_exception_handler(request: Request, exc: Exception):
@@ -0,0 +1,41 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Records how long each startup phase took, so cold-start regressions show up in /health/ready"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._phases: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._phases[name] = seconds * 1000
+        logger.info(f"Startup phase {name} took {seconds * 1000:.1f} ms")
+
+    def mark(self, name: str) -> None:
+        """Record the time elapsed since the process started importing the app"""
+        self.record(name, time.perf_counter() - self.started)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Phase durations in milliseconds, in the order they finished"""
+        with self._lock:
+            return dict(self._phases)
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,238 @@
+"""Per-stage latency histograms and an on-demand sampling profiler.
+
+Every stage of the routing pipeline (rate limiting, auth, cache lookup,
+the engine call, result parsing, serialization, ...) records its duration
+into a fixed-bucket histogram. Recording is a bisect and two increments
+under a lock, so it is cheap enough to leave on for every request. The
+histograms are exported in Prometheus text format, and p50/p95/p99 are
+estimated from the buckets the same way `histogram_quantile` does.
+
+Timings recorded inside process-pool workers stay in those processes;
+in ROUTE_EXECUTOR_MODE=process only the event-loop side of the engine call
+("engine_call") is exported.
+"""
+import bisect
+import collections
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds, from 10 µs to 10 s
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (cumulative counts are computed on export)"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One slot per bucket plus the +Inf overflow
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def snapshot(self) -> Tuple[List[int], int, float]:
+        with self._lock:
+            return list(self.counts), self.count, self.sum
+
+    def quantile(self, q: float) -> float:
+        """Estimate by linear interpolation inside the bucket holding the q-th observation"""
+        counts, count, _ = self.snapshot()
+        if count == 0:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if index == len(self.buckets):
+                    # Past the last finite bound: that bound is the best estimate available
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+
+class StageMetrics:
+    """Histograms keyed by pipeline stage"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, stage: str, seconds: float) -> None:
+        self.histogram(stage).observe(seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, mean and p50/p95/p99 per stage, in milliseconds"""
+        result = {}
+        for stage, histogram in sorted(self._histograms.items()):
+            _, count, total = histogram.snapshot()
+            result[stage] = {
+                "count": count,
+                "avg_ms": total / count * 1000 if count else 0.0,
+                **{f"p{int(q * 100)}_ms": histogram.quantile(q) * 1000 for q in QUANTILES},
+            }
+        return result
+
+    def render_prometheus(self, prefix: str = "naviwasm") -> str:
+        """Prometheus text exposition (format 0.0.4) of every stage histogram"""
+        name = f"{prefix}_stage_duration_seconds"
+        lines = [f"# HELP {name} Time spent in each routing pipeline stage.",
+                 f"# TYPE {name} histogram"]
+        quantile_lines = [f"# HELP {name}_quantile Quantiles estimated from the stage histogram buckets.",
+                          f"# TYPE {name}_quantile gauge"]
+        for stage, histogram in sorted(self._histograms.items()):
+            counts, count, total = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound!r}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total!r}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+            for q in QUANTILES:
+                quantile_lines.append(f'{name}_quantile{{stage="{stage}",quantile="{q}"}} '
+                                      f'{histogram.quantile(q)!r}')
+        return "\n".join(lines + quantile_lines) + "\n"
+
+
+class SamplingProfiler:
+    """Statistical profiler switched on at runtime for the next N requests.
+
+    While armed, a daemon thread snapshots every thread's Python stack
+    (`sys._current_frames`) at a fixed interval and counts identical stacks.
+    It stops by itself once the requested number of requests has finished.
+    Stopping only signals the thread, which exits at its next tick, so the
+    request that finishes a run is not held up waiting for it. The result
+    is in collapsed-stack format ("frame;frame;frame count"),
+    which flamegraph tools read directly.
+    """
+
+    def __init__(self, max_stacks: int = 10000):
+        self.max_stacks = max_stacks
+        self._lock = threading.Lock()
+        self._stacks_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.stacks: "collections.Counter[str]" = collections.Counter()
+        self.remaining_requests = 0
+        self.interval_seconds = 0.005
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, requests: int, interval_ms: float = 5.0) -> None:
+        """Start sampling (clearing previous results) until `requests` requests finish"""
+        with self._lock:
+            self._stop_locked()
+            with self._stacks_lock:
+                self.stacks = collections.Counter()
+                self.samples = 0
+            self.remaining_requests = requests
+            self.interval_seconds = interval_ms / 1000
+            self.started_at, self.stopped_at = time.time(), None
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop_event,),
+                                            name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stop_locked()
+
+    def _stop_locked(self) -> None:
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread = None
+            self.stopped_at = time.time()
+
+    def request_finished(self) -> None:
+        """Called once per completed request; cheap when the profiler is off"""
+        if self.remaining_requests <= 0:
+            return
+        with self._lock:
+            self.remaining_requests -= 1
+            if self.remaining_requests <= 0:
+                self._stop_locked()
+
+    def _run(self, stop: threading.Event) -> None:
+        own_id = threading.get_ident()
+        while not stop.wait(self.interval_seconds):
+            keys = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                    frame = frame.f_back
+                keys.append(";".join(reversed(stack)))
+            with self._stacks_lock:
+                # Nobody waits for a stopped thread, so check before touching what may be a newer run's counts
+                if stop.is_set():
+                    return
+                for key in keys:
+                    # Past the cap only already-seen stacks are counted, to bound memory
+                    if key in self.stacks or len(self.stacks) < self.max_stacks:
+                        self.stacks[key] += 1
+                self.samples += 1
+
+    def collapsed(self, limit: Optional[int] = None) -> str:
+        with self._stacks_lock:
+            top = self.stacks.most_common(limit)
+        return "\n".join(f"{stack} {count}" for stack, count in top)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "active": self.active,
+            "remaining_requests": max(0, self.remaining_requests),
+            "interval_ms": self.interval_seconds * 1000,
+            "samples": self.samples,
+            "distinct_stacks": len(self.stacks),
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+        }
+
+
+stage_metrics = StageMetrics()
+profiler = SamplingProfiler()
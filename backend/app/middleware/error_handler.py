@@ -7,7 +7,7 @@ logger = logging.getLogger(__name__)
 def setup_error_handlers(app: FastAPI):
     @app.exception_handler(Exception)
     async def generic_exception_handler(request: Request, exc: Exception):
-        logger.error(f"Unhandled exception: {exc}", exc_info=True)
+        logger.error("Unhandled exception: %s", exc, exc_info=True)
         return JSONResponse(
             status_code=500,
             content={"detail": "An unexpected error occurred. Please try again later."}
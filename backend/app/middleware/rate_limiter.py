@@ -1,35 +1,160 @@
-from fastapi import Request, HTTPException
+from fastapi import HTTPException
+from starlette.requests import HTTPConnection
 from starlette.status import HTTP_429_TOO_MANY_REQUESTS
 import time
-from collections import defaultdict
-import asyncio
+from typing import Callable, Dict, Hashable, Optional
+from app.core.config import get_settings
+from app.core.telemetry import stage_metrics
+from app.services.shared_state import SharedState, get_shared_state
+
+class _ClientWindow:
+    """Fixed-size sliding-window-counter state for one client"""
+    __slots__ = ("window_start", "current", "previous", "last_seen")
+
+    def __init__(self, now: float):
+        self.window_start = now
+        self.current = 0
+        self.previous = 0
+        self.last_seen = now
+
 
-# Simple in-memory rate limiter store
 class RateLimiter:
-    def __init__(self, requests_per_minute=100):
+    """Sliding-window-counter rate limiter.
+
+    Each client costs two counters instead of a timestamp per request: the
+    count for the current window and for the previous one, with the previous
+    count weighted by how much of it still overlaps the sliding window.
+    Limits apply per client IP and, when an X-API-Key header is sent, per API
+    key. Idle clients are swept periodically from inside the request path, so
+    no background tasks are needed.
+
+    With a `shared` backend the counters live in the host-wide SharedState
+    file instead, so the limits hold across all worker processes.
+    """
+
+    def __init__(self, requests_per_minute: int = 100, api_key_requests_per_minute: int = 0,
+                 window_seconds: float = 60.0, idle_seconds: float = 300.0,
+                 sweep_interval_seconds: float = 60.0, clock: Optional[Callable[[], float]] = None,
+                 shared: Optional[SharedState] = None):
+        # Shared counters are compared across processes, so they need wall-clock time
+        clock = clock or (time.time if shared is not None else time.monotonic)
+        self.shared = shared
         self.requests_per_minute = requests_per_minute
-        self.request_counts = defaultdict(list)
-    
-    async def check_rate_limit(self, request: Request):
-        client_ip = request.client.host
-        current_time = time.time()
-        
-        # Remove timestamps older than 1 minute
-        self.request_counts[client_ip] = [
-            timestamp for timestamp in self.request_counts[client_ip]
-            if current_time - timestamp < 60
-        ]
-        
-        # Check if rate limit is exceeded
-        if len(self.request_counts[client_ip]) >= self.requests_per_minute:
+        self.api_key_requests_per_minute = api_key_requests_per_minute
+        self.window_seconds = window_seconds
+        self.idle_seconds = max(idle_seconds, 2 * window_seconds)
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.clock = clock
+        self.ip_windows: Dict[Hashable, _ClientWindow] = {}
+        self.api_key_windows: Dict[Hashable, _ClientWindow] = {}
+        self._next_sweep = clock() + sweep_interval_seconds
+        self.allowed = 0
+        self.rejected = 0
+        self.swept = 0
+        self.decision_time_total = 0.0
+        self.decision_time_max = 0.0
+
+    def _window(self, table: Dict[Hashable, _ClientWindow], identity: Hashable, now: float) -> _ClientWindow:
+        record = table.get(identity)
+        if record is None:
+            record = table[identity] = _ClientWindow(now)
+            return record
+        elapsed = now - record.window_start
+        if elapsed >= self.window_seconds:
+            windows_passed = int(elapsed // self.window_seconds)
+            record.previous = record.current if windows_passed == 1 else 0
+            record.current = 0
+            record.window_start += windows_passed * self.window_seconds
+        record.last_seen = now
+        return record
+
+    def _estimate(self, record: _ClientWindow, now: float) -> float:
+        overlap = 1.0 - (now - record.window_start) / self.window_seconds
+        return record.previous * overlap + record.current
+
+    def allow(self, client_ip: Hashable, api_key: Optional[str] = None) -> bool:
+        """Record one request and return whether it is within every applicable limit"""
+        started = time.perf_counter()
+        now = self.clock()
+        if self.shared is not None:
+            allowed = self._allow_shared(client_ip, api_key, now)
+        else:
+            allowed = self._allow_local(client_ip, api_key, now)
+        if allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+
+        elapsed = time.perf_counter() - started
+        stage_metrics.observe("rate_limit", elapsed)
+        self.decision_time_total += elapsed
+        self.decision_time_max = max(self.decision_time_max, elapsed)
+        return allowed
+
+    def _allow_shared(self, client_ip: Hashable, api_key: Optional[str], now: float) -> bool:
+        # Idle clients need no sweep here: their slots are reused when a bucket fills
+        clients = [(("ip", client_ip), self.requests_per_minute)]
+        if api_key is not None and self.api_key_requests_per_minute > 0:
+            clients.append((("api_key", api_key), self.api_key_requests_per_minute))
+        return self.shared.limiter_admit(clients, now, self.window_seconds)
+
+    def _allow_local(self, client_ip: Hashable, api_key: Optional[str], now: float) -> bool:
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        windows = [(self._window(self.ip_windows, client_ip, now), self.requests_per_minute)]
+        if api_key is not None and self.api_key_requests_per_minute > 0:
+            windows.append((self._window(self.api_key_windows, api_key, now),
+                            self.api_key_requests_per_minute))
+
+        allowed = all(self._estimate(record, now) < limit for record, limit in windows)
+        if allowed:
+            for record, _ in windows:
+                record.current += 1
+        return allowed
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop clients idle long enough that their counters no longer matter"""
+        now = self.clock() if now is None else now
+        cutoff = now - self.idle_seconds
+        removed = 0
+        for table in (self.ip_windows, self.api_key_windows):
+            idle = [identity for identity, record in table.items() if record.last_seen < cutoff]
+            for identity in idle:
+                del table[identity]
+            removed += len(idle)
+        self.swept += removed
+        self._next_sweep = now + self.sweep_interval_seconds
+        return removed
+
+    async def check_rate_limit(self, request: HTTPConnection):
+        # HTTPConnection rather than Request so the check also runs on WebSocket routes
+        client_ip = request.client.host if request.client else "unknown"
+        if not self.allow(client_ip, request.headers.get("X-API-Key")):
             raise HTTPException(
                 status_code=HTTP_429_TOO_MANY_REQUESTS,
                 detail="Rate limit exceeded. Try again later."
             )
-        
-        # Add current request timestamp
-        self.request_counts[client_ip].append(current_time)
         return True
 
+    def stats(self) -> Dict[str, float]:
+        decisions = self.allowed + self.rejected
+        return {
+            "backend": "shared" if self.shared is not None else "local",
+            "tracked_ips": len(self.ip_windows),
+            "tracked_api_keys": len(self.api_key_windows),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "swept_clients": self.swept,
+            "avg_decision_us": (self.decision_time_total / decisions * 1e6) if decisions else 0.0,
+            "max_decision_us": self.decision_time_max * 1e6,
+        }
+
 # Create an instance
-rate_limiter = RateLimiter()
\ No newline at end of file
+_settings = get_settings()
+rate_limiter = RateLimiter(
+    requests_per_minute=_settings.MAX_REQUESTS_PER_MINUTE,
+    api_key_requests_per_minute=_settings.MAX_REQUESTS_PER_MINUTE_PER_API_KEY,
+    idle_seconds=_settings.RATE_LIMIT_IDLE_SECONDS,
+    shared=get_shared_state(),
+)
@@ -0,0 +1,24 @@
+import time
+from app.core.telemetry import profiler, stage_metrics
+
+
+class TelemetryMiddleware:
+    """Times whole HTTP requests and tells the sampling profiler when each one ends.
+
+    Plain ASGI rather than BaseHTTPMiddleware, so it adds no extra task or
+    body buffering to streamed responses.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            stage_metrics.observe("request", time.perf_counter() - started)
+            profiler.request_finished()
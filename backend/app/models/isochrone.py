@@ -0,0 +1,76 @@
+import json
+import math
+from typing import Optional
+import numpy as np
+from app.models.navigation import IsochroneResponse
+from app.models.route_path import _path_json
+from app.utils.cell_outline import cell_centers, cell_polygons
+from app.utils.geo import EARTH_RADIUS_M
+
+class Isochrone:
+    """Internal, array-backed isochrone result.
+
+    `cells` is an (n, 2) int64 array of (x, y) grid cells at `resolution`
+    and `costs` the lowest cost reaching each. Polygons are traced from the
+    cells when a response asks for them, so one cached expansion serves
+    every output and tolerance.
+    """
+    __slots__ = ("cells", "costs", "resolution", "mode", "max_cost", "reached_cost", "expanded",
+                 "calculation_time_ms", "cached", "degraded")
+
+    def __init__(self, cells: np.ndarray, costs: np.ndarray, resolution: float, mode: str, max_cost: float,
+                 reached_cost: float, expanded: int, calculation_time_ms: float = 0.0, cached: bool = False,
+                 degraded: bool = False):
+        self.cells = cells
+        self.costs = costs
+        self.resolution = resolution
+        self.mode = mode
+        self.max_cost = max_cost
+        self.reached_cost = reached_cost
+        self.expanded = expanded
+        self.calculation_time_ms = calculation_time_ms
+        self.cached = cached
+        self.degraded = degraded
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    @property
+    def nbytes(self) -> int:
+        return self.cells.nbytes + self.costs.nbytes
+
+    def served(self, calculation_time_ms: float, cached: bool) -> "Isochrone":
+        """This result as returned to one request"""
+        return Isochrone(self.cells, self.costs, self.resolution, self.mode, self.max_cost, self.reached_cost,
+                         self.expanded, calculation_time_ms, cached, self.degraded)
+
+    def to_response(self, output: str = "polygon", tolerance_m: Optional[float] = None) -> IsochroneResponse:
+        return IsochroneResponse(**json.loads(self.to_json(output, tolerance_m)))
+
+    def to_json(self, output: str = "polygon", tolerance_m: Optional[float] = None) -> str:
+        """Serialize with the `IsochroneResponse` schema.
+
+        Polygons are simplified to `tolerance_m`, or to one cell's height
+        when it is None, which turns the outline's cell-by-cell staircase
+        into straight edges.
+        """
+        if output == "polygon":
+            if tolerance_m is None:
+                tolerance_m = math.radians(self.resolution) * EARTH_RADIUS_M
+            rings = cell_polygons(self.cells, self.resolution, tolerance_m)
+            geometry = f'"polygons":[{",".join(_path_json(ring) for ring in rings)}]'
+        else:
+            centers = cell_centers(self.cells, self.resolution)
+            geometry = ('"cells":{"lat":' + json.dumps(centers[:, 0].tolist())
+                        + ',"lng":' + json.dumps(centers[:, 1].tolist())
+                        + ',"cost":' + json.dumps(np.round(self.costs, 3).tolist()) + '}')
+        return (f'{{"mode":{json.dumps(self.mode)},'
+                f'"max_cost":{json.dumps(self.max_cost)},'
+                f'"reached_cost":{json.dumps(self.reached_cost)},'
+                f'"resolution":{json.dumps(self.resolution)},'
+                f'{geometry},'
+                f'"cell_count":{len(self.cells)},'
+                f'"expanded":{self.expanded},'
+                f'"calculation_time_ms":{json.dumps(self.calculation_time_ms)},'
+                f'"cached":{"true" if self.cached else "false"},'
+                f'"degraded":{"true" if self.degraded else "false"}}}')
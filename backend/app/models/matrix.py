@@ -0,0 +1,43 @@
+import json
+import numpy as np
+from app.models.navigation import MatrixResponse
+
+class DistanceMatrix:
+    """Internal, array-backed matrix result.
+
+    `distances_m` and `durations_s` are (sources, destinations) float64
+    arrays with NaN where there is no route. Like RoutePath, the public
+    `MatrixResponse` model is only built on request.
+    """
+    __slots__ = ("distances_m", "durations_s", "mode", "calculation_time_ms", "degraded")
+
+    def __init__(self, distances_m: np.ndarray, durations_s: np.ndarray, mode: str,
+                 calculation_time_ms: float, degraded: bool = False):
+        self.distances_m = distances_m
+        self.durations_s = durations_s
+        self.mode = mode
+        self.calculation_time_ms = calculation_time_ms
+        self.degraded = degraded
+
+    @property
+    def shape(self):
+        return self.distances_m.shape
+
+    def to_response(self) -> MatrixResponse:
+        return MatrixResponse(**json.loads(self.to_json()))
+
+    def to_json(self) -> str:
+        """Serialize with the `MatrixResponse` schema"""
+        return (f'{{"distances_m":{_matrix_json(self.distances_m)},'
+                f'"durations_s":{_matrix_json(self.durations_s)},'
+                f'"mode":{json.dumps(self.mode)},'
+                f'"calculation_time_ms":{json.dumps(self.calculation_time_ms)},'
+                f'"degraded":{"true" if self.degraded else "false"}}}')
+
+
+def _matrix_json(matrix: np.ndarray) -> str:
+    # Rounded to the millimeter / millisecond; nothing downstream needs more
+    rounded = np.round(matrix, 3)
+    if np.isfinite(rounded).all():
+        return json.dumps(rounded.tolist(), separators=(",", ":"))
+    return json.dumps(np.where(np.isfinite(rounded), rounded, None).tolist(), separators=(",", ":"))
@@ -1,9 +1,10 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
 class Coordinates(BaseModel):
-    lat: float
-    lng: float
+    # The bounds also reject NaN and infinity, which no output format can encode
+    lat: float = Field(..., ge=-90, le=90)
+    lng: float = Field(..., ge=-180, le=180)
 
 class RouteRequest(BaseModel):
     start: Coordinates
@@ -11,4 +12,60 @@ class RouteRequest(BaseModel):
 
 class RouteResponse(BaseModel):
     path: List[Coordinates]
-    calculation_time_ms: float
\ No newline at end of file
+    calculation_time_ms: float
+    # True when the search ran out of its time or expansion budget and the
+    # path is a best-effort approximation
+    degraded: bool = False
+
+class BatchRouteRequest(BaseModel):
+    routes: List[RouteRequest]
+
+class BatchRouteResponse(BaseModel):
+    routes: List[RouteResponse]
+
+class MatrixRequest(BaseModel):
+    sources: List[Coordinates] = Field(..., min_length=1)
+    # Defaults to the sources, for a square all-pairs matrix
+    destinations: Optional[List[Coordinates]] = None
+    mode: Literal["auto", "haversine", "grid", "graph"] = "auto"
+    # Average speed used to turn distances into durations
+    speed_kmh: Optional[float] = Field(None, gt=0)
+
+class MatrixResponse(BaseModel):
+    # Row i, column j: cost from sources[i] to destinations[j]; null where there is no route
+    distances_m: List[List[Optional[float]]]
+    durations_s: List[List[Optional[float]]]
+    mode: str
+    calculation_time_ms: float
+    degraded: bool = False
+
+class IsochroneRequest(BaseModel):
+    origin: Coordinates
+    # Steps on the route grid in grid mode, meters along the roads in graph mode
+    max_cost: float = Field(..., gt=0)
+    mode: Literal["auto", "grid", "graph"] = "auto"
+    # "polygon": outlines of the reachable area; "cells": every reachable cell and its cost
+    output: Literal["polygon", "cells"] = "polygon"
+    # Polygon simplification in meters; defaults to one cell, 0 keeps the exact cell outline
+    tolerance_m: Optional[float] = Field(None, ge=0)
+
+class IsochroneCells(BaseModel):
+    # Cell centers, columnar; each cell spans `resolution` degrees
+    lat: List[float]
+    lng: List[float]
+    cost: List[float]
+
+class IsochroneResponse(BaseModel):
+    mode: str
+    # The requested cost after quantization, and the cost the result is complete up to
+    max_cost: float
+    reached_cost: float
+    resolution: float
+    # Outer rings, closed and counterclockwise, largest first
+    polygons: Optional[List[List[Coordinates]]] = None
+    cells: Optional[IsochroneCells] = None
+    cell_count: int
+    expanded: int
+    calculation_time_ms: float
+    cached: bool = False
+    degraded: bool = False
@@ -0,0 +1,56 @@
+from typing import Optional, Sequence
+import json
+import numpy as np
+from app.models.navigation import Coordinates, RouteResponse
+
+class RoutePath:
+    """Internal, array-backed route result.
+
+    `points` is an (n, 2) float64 array of lat/lng. The engine, cache and
+    encoders all work on this type; the public `RouteResponse` model is only
+    built when a caller explicitly asks for it.
+    """
+    __slots__ = ("points", "calculation_time_ms", "degraded", "original_point_count")
+
+    def __init__(self, points: np.ndarray, calculation_time_ms: float, degraded: bool = False,
+                 original_point_count: Optional[int] = None):
+        self.points = points
+        self.calculation_time_ms = calculation_time_ms
+        self.degraded = degraded
+        # Point count before level-of-detail simplification
+        self.original_point_count = len(points) if original_point_count is None else original_point_count
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def to_response(self) -> RouteResponse:
+        return RouteResponse(
+            # Engine output, already checked; grid cell centers may also lie just past +-90/180
+            path=[Coordinates.model_construct(lat=lat, lng=lng) for lat, lng in self.points.tolist()],
+            calculation_time_ms=self.calculation_time_ms,
+            degraded=self.degraded,
+        )
+
+    def to_json(self) -> str:
+        """Serialize with the `RouteResponse` schema without building per-point models"""
+        return (f'{{"path":{_path_json(self.points)},'
+                f'"calculation_time_ms":{json.dumps(self.calculation_time_ms)},'
+                f'"degraded":{"true" if self.degraded else "false"}}}')
+
+
+def _path_json(points: np.ndarray) -> str:
+    if len(points) == 0:
+        return "[]"
+    if not np.isfinite(points).all():
+        # repr() of nan/inf is not valid JSON; take the slow, standard-compliant path
+        return json.dumps([{"lat": lat, "lng": lng} for lat, lng in points.tolist()])
+    # float.__repr__ produces the same shortest round-trip text as json.dumps,
+    # and joining through map/zip keeps the per-point loop in C
+    lats = map(float.__repr__, points[:, 0].tolist())
+    lngs = map(float.__repr__, points[:, 1].tolist())
+    return '[{"lat":' + '},{"lat":'.join(map(',"lng":'.join, zip(lats, lngs))) + '}]'
+
+
+def routes_to_json(routes: Sequence[RoutePath]) -> str:
+    """Serialize a batch with the `BatchRouteResponse` schema"""
+    return '{"routes":[' + ",".join(route.to_json() for route in routes) + ']}'
@@ -0,0 +1,310 @@
+"""Offline bulk routing: origin/destination pairs in, routes out, as a stream.
+
+Pairs are read lazily from CSV or NDJSON, routed in fixed-size batches
+through a NavigationService, and written in input order as they finish,
+so memory depends on the batch size and the number of batches in flight,
+never on the length of the input.
+
+Every `checkpoint_rows` rows the output is flushed and a small JSON
+checkpoint records how many rows and output bytes are complete. A resumed
+run skips that many input rows and truncates the output back to that many
+bytes before appending, so a run killed at any point continues without
+duplicated or missing records.
+
+Output formats:
+
+- ``ndjson``: one line per input row, ``{"row", "id", "point_count",
+  "calculation_time_ms", "degraded", "lat", "lng"}``; rows that could not
+  be parsed get ``{"row", "error"}`` instead.
+- ``f32`` / ``f64``: per row a little-endian header (uint64 row, uint32
+  point count, uint8 flags: 1 = degraded, 2 = invalid input row) followed
+  by the lat/lng pairs.
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+import struct
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import numpy as np
+
+from app.models.navigation import Coordinates
+from app.models.route_path import RoutePath
+from app.services.navigation_service import NavigationService
+from app.services.search_budget import SearchBudget
+from app.utils.route_encoding import BINARY_DTYPES
+
+INPUT_FORMATS = ("csv", "ndjson")
+OUTPUT_FORMATS = ("ndjson", "f32", "f64")
+RECORD_HEADER = struct.Struct("<QIB")
+FLAG_DEGRADED = 1
+FLAG_INVALID = 2
+
+_CSV_COLUMNS = ("start_lat", "start_lng", "end_lat", "end_lng")
+
+
+@dataclass
+class BulkRow:
+    """One input row: its 0-based index among data rows, optional id, and the pair or a parse error"""
+    row: int
+    id: Optional[str] = None
+    start: Optional[Coordinates] = None
+    end: Optional[Coordinates] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BulkProgress:
+    rows: int
+    routed: int
+    invalid: int
+    degraded: int
+    elapsed_seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        # Rows handled by this run; `rows` also counts those a resumed run skipped
+        handled = self.routed + self.invalid
+        return handled / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+
+def input_format_for(path: str) -> str:
+    """Guess the input format from a file name"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".ndjson", ".jsonl"):
+        return "ndjson"
+    raise ValueError(f"Cannot tell the input format of '{path}'; use one of {', '.join(INPUT_FORMATS)}")
+
+
+def _pair(start_lat, start_lng, end_lat, end_lng) -> Tuple[Coordinates, Coordinates]:
+    return (Coordinates(lat=float(start_lat), lng=float(start_lng)),
+            Coordinates(lat=float(end_lat), lng=float(end_lng)))
+
+
+def _csv_rows(stream: TextIO) -> Iterator[BulkRow]:
+    """Rows with a `start_lat,start_lng,end_lat,end_lng[,id]` header, or four bare columns"""
+    reader = csv.reader(stream)
+    columns: Optional[Dict[str, int]] = None
+    row = 0
+    for fields in reader:
+        if not fields:
+            continue
+        if row == 0 and columns is None:
+            names = {name.strip(): index for index, name in enumerate(fields)}
+            # Only a row naming the columns is a header; anything else is data, bad or not
+            if any(name in names for name in _CSV_COLUMNS):
+                missing = [name for name in _CSV_COLUMNS if name not in names]
+                if missing:
+                    raise ValueError(f"CSV header is missing {', '.join(missing)}")
+                columns = names
+                continue
+        try:
+            if columns is None:
+                start, end = _pair(*fields[:4])
+                row_id = fields[4] if len(fields) > 4 else None
+            else:
+                start, end = _pair(*(fields[columns[name]] for name in _CSV_COLUMNS))
+                row_id = fields[columns["id"]] if "id" in columns else None
+            yield BulkRow(row, row_id, start, end)
+        except (ValueError, TypeError, IndexError) as e:
+            yield BulkRow(row, error=f"invalid row: {e}".splitlines()[0])
+        row += 1
+
+
+def _ndjson_rows(stream: TextIO) -> Iterator[BulkRow]:
+    """Objects with `start`/`end` coordinates or flat `start_lat`... keys, and an optional `id`"""
+    row = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if "start" in record:
+                start, end = Coordinates(**record["start"]), Coordinates(**record["end"])
+            else:
+                start, end = _pair(*(record[name] for name in _CSV_COLUMNS))
+            row_id = record.get("id")
+            yield BulkRow(row, None if row_id is None else str(row_id), start, end)
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            yield BulkRow(row, error=f"invalid row: {e}".splitlines()[0])
+        row += 1
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[BulkRow]:
+    if fmt == "csv":
+        return _csv_rows(stream)
+    if fmt == "ndjson":
+        return _ndjson_rows(stream)
+    raise ValueError(f"Unknown input format '{fmt}'; use one of {', '.join(INPUT_FORMATS)}")
+
+
+def encode_record(row: BulkRow, route: Optional[RoutePath], fmt: str) -> bytes:
+    if fmt == "ndjson":
+        if route is None:
+            record = {"row": row.row, "id": row.id, "error": row.error}
+        else:
+            record = {"row": row.row, "id": row.id, "point_count": len(route),
+                      "calculation_time_ms": route.calculation_time_ms, "degraded": route.degraded,
+                      "lat": route.points[:, 0].tolist(), "lng": route.points[:, 1].tolist()}
+        return (json.dumps(record, separators=(",", ":")) + "\n").encode()
+    if fmt in BINARY_DTYPES:
+        if route is None:
+            return RECORD_HEADER.pack(row.row, 0, FLAG_INVALID)
+        flags = FLAG_DEGRADED if route.degraded else 0
+        return (RECORD_HEADER.pack(row.row, len(route), flags)
+                + np.ascontiguousarray(route.points, dtype=BINARY_DTYPES[fmt]).tobytes())
+    raise ValueError(f"Unknown output format '{fmt}'; use one of {', '.join(OUTPUT_FORMATS)}")
+
+
+def read_checkpoint(path: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def run_state(input_path: str, input_format: str, output_format: str) -> dict:
+    """What a checkpoint must match to be resumed: the input file as it is now, and the formats"""
+    state = {"input": input_path, "input_format": input_format, "format": output_format}
+    if input_path != "-":
+        # An edited input would otherwise resume at a row offset that no longer lines up
+        stat = os.stat(input_path)
+        state.update(input=os.path.abspath(input_path), input_size=stat.st_size,
+                     input_mtime_ns=stat.st_mtime_ns)
+    return state
+
+
+def resume_point(state: Optional[dict], run_state: dict, output_path: str) -> Tuple[int, int]:
+    """(rows, output bytes) to resume from; (0, 0) when there is no checkpoint for this run.
+
+    Raises ValueError when the checkpoint matches the run but `output_path`
+    is missing or shorter than the bytes it records, since truncating to
+    that length would pad the output with zeros.
+    """
+    if state is None or any(state.get(key) != value for key, value in run_state.items()):
+        return 0, 0
+    rows, output_bytes = state["rows"], state["output_bytes"]
+    try:
+        size = os.path.getsize(output_path)
+    except OSError:
+        size = -1
+    if size < output_bytes:
+        raise ValueError(f"{output_path} is missing or shorter than its checkpoint ({output_bytes:,} bytes)")
+    return rows, output_bytes
+
+
+def write_checkpoint(path: str, state: dict) -> None:
+    # Replaced atomically, so a crash mid-write leaves the previous checkpoint intact
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def _batches(rows: Iterable[BulkRow], size: int) -> Iterator[List[BulkRow]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BulkRouter:
+    """Routes a stream of rows through `service` with a bounded number of batches in flight.
+
+    With a process-pool executor each batch is one call into a worker, so
+    `max_in_flight` should be at least the worker count to keep every
+    worker busy; results are still written strictly in input order.
+    """
+
+    def __init__(self, service: NavigationService, batch_size: int = 256, max_in_flight: int = 8,
+                 max_expansions: Optional[int] = None):
+        self.service = service
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.max_expansions = max_expansions
+
+    def _budget(self) -> SearchBudget:
+        # Offline runs have no deadline to meet; only the expansion cap applies
+        return SearchBudget(max_expansions=self.service.new_budget(max_expansions=self.max_expansions).max_expansions)
+
+    async def _route_batch(self, batch: List[BulkRow]) -> List[Optional[RoutePath]]:
+        valid = [row for row in batch if row.error is None]
+        routes = iter(await self.service.compute_routes([(row.start, row.end) for row in valid], self._budget())
+                      if valid else [])
+        return [next(routes) if row.error is None else None for row in batch]
+
+    async def run(self, rows: Iterable[BulkRow], output, fmt: str,
+                  checkpoint: Optional[Callable[[int, int], None]] = None, checkpoint_rows: int = 100_000,
+                  progress: Optional[Callable[[BulkProgress], None]] = None, start_row: int = 0) -> BulkProgress:
+        """Route every row and write its record to the binary stream `output`.
+
+        `checkpoint(rows_done, output_position)` is called after the output
+        has been flushed, every `checkpoint_rows` rows and at the end;
+        `progress` after every written batch. Rows before `start_row` were
+        finished by an earlier run; they are parsed but not routed.
+        """
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{fmt}'; use one of {', '.join(OUTPUT_FORMATS)}")
+        started = time.perf_counter()
+        stats = BulkProgress(start_row, 0, 0, 0, 0.0)
+        pending: "deque[Tuple[List[BulkRow], asyncio.Task]]" = deque()
+        last_checkpoint = start_row
+        batches = _batches((row for row in rows if row.row >= start_row), self.batch_size)
+
+        async def drain_one() -> None:
+            nonlocal last_checkpoint
+            batch, task = pending.popleft()
+            routes = await task
+            output.write(b"".join(encode_record(row, route, fmt) for row, route in zip(batch, routes)))
+            for route in routes:
+                if route is None:
+                    stats.invalid += 1
+                else:
+                    stats.routed += 1
+                    stats.degraded += route.degraded
+            stats.rows = batch[-1].row + 1
+            stats.elapsed_seconds = time.perf_counter() - started
+            if checkpoint is not None and stats.rows - last_checkpoint >= checkpoint_rows:
+                self._checkpoint(output, checkpoint, stats.rows)
+                last_checkpoint = stats.rows
+            if progress is not None:
+                progress(stats)
+
+        try:
+            for batch in batches:
+                pending.append((batch, asyncio.ensure_future(self._route_batch(batch))))
+                if len(pending) >= self.max_in_flight:
+                    await drain_one()
+            while pending:
+                await drain_one()
+        finally:
+            for _, task in pending:
+                task.cancel()
+        if checkpoint is not None:
+            self._checkpoint(output, checkpoint, stats.rows)
+        stats.elapsed_seconds = time.perf_counter() - started
+        return stats
+
+    @staticmethod
+    def _checkpoint(output, checkpoint: Callable[[int, int], None], rows: int) -> None:
+        output.flush()
+        if hasattr(output, "fileno"):
+            try:
+                os.fsync(output.fileno())
+            except (OSError, io.UnsupportedOperation):
+                pass
+        checkpoint(rows, output.tell())
@@ -0,0 +1,301 @@
+"""Incremental shortest paths with D* Lite (Koenig & Likhachev, 2002).
+
+D* Lite searches backward, from the goal toward the current position, and
+keeps its g/rhs values between queries. When the traveller moves, only
+the key offset `km` changes; when edges are blocked or reopened, only the
+vertices whose distance-to-goal actually changes are expanded again. A
+repair after a small change therefore touches a small part of the
+graph, while a replan from scratch repeats the whole search.
+
+The search runs over a "space" that provides successors, predecessors,
+edge costs and an admissible heuristic:
+
+- `GridSpace` is the unbounded 4-connected unit-cost grid that
+  `find_path` in wasm/src/lib.rs searches, plus a set of blocked cells.
+- `GraphSpace` is a RoadGraph with blocked nodes and edges.
+"""
+import heapq
+import math
+from typing import Dict, Hashable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.services.road_graph import RoadGraph
+from app.services.search_budget import SearchBudget, SearchBudgetExceeded
+
+INF = math.inf
+# Edge whose cost changed: (from, to, cost before the change)
+EdgeChange = Tuple[Hashable, Hashable, float]
+
+
+class GridSpace:
+    """lib.rs's grid: cells are truncated lat/lng multiples of `resolution`, steps cost 1"""
+
+    def __init__(self, resolution: float = 0.01):
+        self.scale = 1.0 / resolution
+        self.blocked: Set[Tuple[int, int]] = set()
+
+    def node(self, lat: float, lng: float) -> Tuple[int, int]:
+        # (x, y) = (lng, lat) truncated toward zero, as `as i32` does in lib.rs
+        return int(lng * self.scale), int(lat * self.scale)
+
+    def points(self, nodes: Sequence[Tuple[int, int]]) -> np.ndarray:
+        cells = np.array(nodes, dtype=np.float64).reshape(-1, 2)
+        return cells[:, ::-1] / self.scale
+
+    def successors(self, node: Tuple[int, int]) -> Iterator[Tuple[Tuple[int, int], float]]:
+        x, y = node
+        closed = node in self.blocked
+        for neighbor in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            yield neighbor, INF if closed or neighbor in self.blocked else 1.0
+
+    predecessors = successors
+
+    def cost(self, u: Tuple[int, int], v: Tuple[int, int]) -> float:
+        return INF if u in self.blocked or v in self.blocked else 1.0
+
+    @staticmethod
+    def heuristic(a: Tuple[int, int], b: Tuple[int, int]) -> float:
+        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+    def set_blocked(self, node: Tuple[int, int], blocked: bool) -> List[EdgeChange]:
+        if (node in self.blocked) == blocked:
+            return []
+        changes = ([(node, v, c) for v, c in self.successors(node)]
+                   + [(u, node, c) for u, c in self.predecessors(node)])
+        if blocked:
+            self.blocked.add(node)
+        else:
+            self.blocked.discard(node)
+        return changes
+
+    @property
+    def blocked_count(self) -> int:
+        return len(self.blocked)
+
+
+class GraphSpace:
+    """A RoadGraph whose nodes and directed edges can be closed"""
+
+    def __init__(self, graph: RoadGraph):
+        self.graph = graph
+        self.blocked_nodes: Set[int] = set()
+        self.blocked_edges: Set[Tuple[int, int]] = set()
+        # Symmetric networks are their own reverse
+        self._reverse = None if graph.symmetric else graph.reverse_csr()
+
+    def node(self, lat: float, lng: float) -> Optional[int]:
+        snapped = self.graph.snap(lat, lng)
+        return None if snapped is None else snapped[0]
+
+    def points(self, nodes: Sequence[int]) -> np.ndarray:
+        return np.column_stack([self.graph.lat[list(nodes)], self.graph.lng[list(nodes)]])
+
+    def _closed(self, u: int, v: int) -> bool:
+        return u in self.blocked_nodes or v in self.blocked_nodes or (u, v) in self.blocked_edges
+
+    def successors(self, node: int) -> Iterator[Tuple[int, float]]:
+        graph = self.graph
+        start, end = int(graph.offsets[node]), int(graph.offsets[node + 1])
+        for neighbor, weight in zip(graph.targets[start:end].tolist(), graph.weights[start:end].tolist()):
+            yield neighbor, INF if self._closed(node, neighbor) else weight
+
+    def predecessors(self, node: int) -> Iterator[Tuple[int, float]]:
+        if self._reverse is None:
+            for neighbor, weight in self.successors(node):
+                yield neighbor, INF if self._closed(neighbor, node) else weight
+            return
+        offsets, sources, weights = self._reverse
+        start, end = int(offsets[node]), int(offsets[node + 1])
+        for neighbor, weight in zip(sources[start:end].tolist(), weights[start:end].tolist()):
+            yield neighbor, INF if self._closed(neighbor, node) else weight
+
+    def cost(self, u: int, v: int) -> float:
+        if self._closed(u, v):
+            return INF
+        # Parallel edges: the shortest one counts
+        return min((weight for neighbor, weight in self.successors(u) if neighbor == v), default=INF)
+
+    def heuristic(self, a: int, b: int) -> float:
+        return self.graph.lower_bound(a, b)
+
+    def set_blocked(self, node: int, blocked: bool) -> List[EdgeChange]:
+        if (node in self.blocked_nodes) == blocked:
+            return []
+        changes = ([(node, v, c) for v, c in self.successors(node)]
+                   + [(u, node, c) for u, c in self.predecessors(node)])
+        if blocked:
+            self.blocked_nodes.add(node)
+        else:
+            self.blocked_nodes.discard(node)
+        return changes
+
+    def set_edge_blocked(self, u: int, v: int, blocked: bool) -> List[EdgeChange]:
+        """Close or reopen u -> v (and v -> u on symmetric networks, whose costs must stay symmetric)"""
+        edges = [(u, v), (v, u)] if self.graph.symmetric else [(u, v)]
+        changes = []
+        for edge in edges:
+            if (edge in self.blocked_edges) != blocked:
+                changes.append((*edge, self.cost(*edge)))
+                if blocked:
+                    self.blocked_edges.add(edge)
+                else:
+                    self.blocked_edges.discard(edge)
+        return changes
+
+    @property
+    def blocked_count(self) -> int:
+        return len(self.blocked_nodes) + len(self.blocked_edges)
+
+
+class DStarLite:
+    """Shortest path from a moving `start` to a fixed `goal`, repaired in place after changes.
+
+    `max_states` bounds memory: a search that would hold more vertices
+    raises SearchBudgetExceeded with reason "states".
+    """
+
+    def __init__(self, space, start: Hashable, goal: Hashable, max_states: int = 0):
+        self.space = space
+        self.start = self._last = start
+        self.goal = goal
+        self.max_states = max_states
+        self.km = 0.0
+        self.g: Dict[Hashable, float] = {}
+        self.rhs: Dict[Hashable, float] = {goal: 0.0}
+        # Current key per open vertex; heap entries that disagree with it are stale
+        self._open: Dict[Hashable, Tuple[float, float]] = {}
+        self._heap: List[Tuple[float, float, int, Hashable]] = []
+        self._pushes = 0
+        self.expanded = 0
+        self._push(goal, (space.heuristic(start, goal), 0.0))
+
+    def __len__(self) -> int:
+        """Vertices holding search state (every vertex with a g value also has an rhs value)"""
+        return len(self.rhs)
+
+    def _key(self, node: Hashable) -> Tuple[float, float]:
+        best = min(self.g.get(node, INF), self.rhs.get(node, INF))
+        return best + self.space.heuristic(self.start, node) + self.km, best
+
+    def _push(self, node: Hashable, key: Tuple[float, float]) -> None:
+        self._open[node] = key
+        # The counter breaks ties so nodes themselves are never compared
+        self._pushes += 1
+        heapq.heappush(self._heap, (key[0], key[1], self._pushes, node))
+        if len(self._heap) > 4 * len(self._open) + 1024:
+            # Mostly stale entries after many repairs: rebuild from the live keys
+            self._heap = [(k1, k2, i, n) for i, (n, (k1, k2)) in enumerate(self._open.items())]
+            heapq.heapify(self._heap)
+
+    def _top(self) -> Tuple[Tuple[float, float], Optional[Hashable]]:
+        heap, open_keys = self._heap, self._open
+        while heap:
+            k1, k2, _, node = heap[0]
+            if open_keys.get(node) == (k1, k2):
+                return (k1, k2), node
+            heapq.heappop(heap)
+        return (INF, INF), None
+
+    def _update_vertex(self, node: Hashable) -> None:
+        if self.g.get(node, INF) != self.rhs.get(node, INF):
+            self._push(node, self._key(node))
+        else:
+            self._open.pop(node, None)
+
+    def _best_successor_cost(self, node: Hashable) -> float:
+        g = self.g
+        return min((cost + g.get(neighbor, INF) for neighbor, cost in self.space.successors(node)), default=INF)
+
+    def move_start(self, node: Hashable) -> None:
+        """The traveller is now at `node`; keys already queued stay valid through `km`"""
+        if node != self._last:
+            self.km += self.space.heuristic(self._last, node)
+            self._last = node
+        self.start = node
+
+    def update_edges(self, changes: Sequence[EdgeChange]) -> None:
+        """Account for edges whose cost changed; the space must already reflect the new costs"""
+        rhs, g = self.rhs, self.g
+        for u, v, old_cost in changes:
+            new_cost = self.space.cost(u, v)
+            if new_cost == old_cost or u == self.goal:
+                continue
+            if new_cost < old_cost:
+                rhs[u] = min(rhs.get(u, INF), new_cost + g.get(v, INF))
+            elif rhs.get(u, INF) == old_cost + g.get(v, INF):
+                rhs[u] = self._best_successor_cost(u)
+            self._update_vertex(u)
+
+    def compute(self, budget: Optional[SearchBudget] = None) -> int:
+        """Bring the start's distance up to date; returns the vertices expanded by this call"""
+        g, rhs, space, goal = self.g, self.rhs, self.space, self.goal
+        max_expansions = budget.max_expansions if budget is not None and budget.max_expansions else INF
+        expanded = 0
+        while True:
+            top_key, node = self._top()
+            if node is None:
+                break
+            start_g, start_rhs = g.get(self.start, INF), rhs.get(self.start, INF)
+            if not (top_key < self._key(self.start) or start_rhs > start_g):
+                break
+            expanded += 1
+            if budget is not None and (expanded > max_expansions or not expanded & 0xFF):
+                reason = budget.check(expanded)
+                if reason is not None:
+                    self.expanded += expanded
+                    raise SearchBudgetExceeded(reason, expanded)
+            if self.max_states and not expanded & 0xFF and len(self) > self.max_states:
+                self.expanded += expanded
+                raise SearchBudgetExceeded("states", expanded)
+
+            new_key = self._key(node)
+            if top_key < new_key:
+                self._push(node, new_key)
+                continue
+            del self._open[node]
+            node_g, node_rhs = g.get(node, INF), rhs.get(node, INF)
+            if node_g > node_rhs:
+                g[node] = node_rhs
+                for neighbor, cost in space.predecessors(node):
+                    if neighbor != goal and cost + node_rhs < rhs.get(neighbor, INF):
+                        rhs[neighbor] = cost + node_rhs
+                        self._update_vertex(neighbor)
+            else:
+                old_g = node_g
+                g[node] = INF
+                for neighbor, cost in space.predecessors(node):
+                    if neighbor != goal and rhs.get(neighbor, INF) == cost + old_g:
+                        rhs[neighbor] = self._best_successor_cost(neighbor)
+                    self._update_vertex(neighbor)
+                if node != goal:
+                    rhs[node] = self._best_successor_cost(node)
+                self._update_vertex(node)
+        self.expanded += expanded
+        return expanded
+
+    @property
+    def distance(self) -> float:
+        """Cost from the start to the goal (inf when unreachable), valid after `compute`"""
+        return self.rhs.get(self.start, INF)
+
+    def path(self) -> Optional[List[Hashable]]:
+        """Vertices from start to goal following the repaired distances, or None when unreachable"""
+        if self.distance == INF:
+            return None
+        g = self.g
+        node, nodes = self.start, [self.start]
+        # Every step strictly lowers the remaining distance, so a path never revisits a vertex
+        for _ in range(len(self) + 1):
+            if node == self.goal:
+                return nodes
+            best, best_cost = None, INF
+            for neighbor, cost in self.space.successors(node):
+                total = cost + g.get(neighbor, INF)
+                if total < best_cost:
+                    best, best_cost = neighbor, total
+            if best is None:
+                return None
+            node = best
+            nodes.append(node)
+        return None
@@ -0,0 +1,117 @@
+"""Bounded expansions for isochrones: everything within a cost of one origin.
+
+Both searches stop at the cost limit instead of at a target, and both
+report cells in lib.rs's grid (see app.utils.cell_outline) so one outline
+tracer serves either:
+
+- `expand_grid` is breadth-first search on the 4-connected unit-cost grid
+  that `find_path` in wasm/src/lib.rs searches; the cost is a step count.
+- `road_cells` rasterizes a bounded RoadGraph search: the reached nodes,
+  and every road between them up to where the cost runs out, in meters.
+
+If the budget runs out, the expansion keeps what it had completed, which
+is an exact isochrone for a smaller cost (`reached_cost`).
+"""
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.services.road_graph import RoadGraph
+from app.services.search_budget import SearchBudget
+from app.utils.cell_outline import cell_keys
+from app.utils.geo import EARTH_RADIUS_M
+
+ISOCHRONE_MODES = ("auto", "grid", "graph")
+_STEPS = np.array([(1, 0), (-1, 0), (0, 1), (0, -1)], dtype=np.int64)
+_METERS_PER_DEGREE = EARTH_RADIUS_M * math.pi / 180
+
+
+def expand_grid(origin: Tuple[int, int], max_steps: int,
+                budget: Optional[SearchBudget] = None) -> Tuple[np.ndarray, np.ndarray, float, Optional[str]]:
+    """(cells, step counts, reached cost, stop reason) for cells within `max_steps` of `origin`.
+
+    The search runs one BFS layer at a time. A cell's neighbors are in the
+    layers before and after it, so only the two previous layers are needed
+    to tell new cells apart. A layer that would break the budget is dropped
+    whole.
+    """
+    layer = np.array([origin], dtype=np.int64)
+    layers, previous_keys, layer_keys = [layer], np.empty(0, dtype=np.int64), cell_keys(layer)
+    expanded, reason = 1, None
+    for _ in range(int(max_steps)):
+        neighbors = (layer[:, None, :] + _STEPS[None, :, :]).reshape(-1, 2)
+        keys, first = np.unique(cell_keys(neighbors), return_index=True)
+        new = ~np.isin(keys, layer_keys) & ~np.isin(keys, previous_keys)
+        if budget is not None:
+            reason = budget.check(expanded + int(new.sum()))
+            if reason is not None:
+                break
+        layer, previous_keys, layer_keys = neighbors[first[new]], layer_keys, keys[new]
+        layers.append(layer)
+        expanded += len(layer)
+    costs = np.repeat(np.arange(len(layers), dtype=np.float64), [len(layer) for layer in layers])
+    return np.concatenate(layers), costs, float(len(layers) - 1), reason
+
+
+def _sample_segments(lat0: np.ndarray, lng0: np.ndarray, lat1: np.ndarray, lng1: np.ndarray,
+                     cost0: np.ndarray, lengths: np.ndarray, fractions: np.ndarray,
+                     step_m: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Points every `step_m` along the first `fractions` of each segment, with their costs"""
+    counts = np.ceil(fractions * lengths / step_m).astype(np.int64) + 1
+    segment = np.repeat(np.arange(len(counts)), counts)
+    position = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    t = position / np.maximum(counts - 1, 1)[segment] * fractions[segment]
+    lat = lat0[segment] + (lat1[segment] - lat0[segment]) * t
+    lng = lng0[segment] + (lng1[segment] - lng0[segment]) * t
+    return lat, lng, cost0[segment] + t * lengths[segment]
+
+
+def road_cells(graph: RoadGraph, origin_lat: float, origin_lng: float, max_distance: float,
+               resolution: float, budget: Optional[SearchBudget] = None
+               ) -> Tuple[np.ndarray, np.ndarray, int, float, Optional[str]]:
+    """(cells, meters, nodes expanded, reached cost, stop reason) for roads within `max_distance`.
+
+    The straight leg from the origin to its snapped node counts against the
+    distance, as it does for routes. A cell's cost is the lowest of the
+    points sampled in it, which are at most half a cell width apart along each road.
+    """
+    snapped = graph.snap(origin_lat, origin_lng)
+    if snapped is None:
+        raise ValueError(f"({origin_lat}, {origin_lng}) is too far from the road network")
+    source, leg = snapped
+    if leg > max_distance:
+        return np.empty((0, 2), dtype=np.int64), np.empty(0), 0, max_distance, None
+    nodes, distances, reason = graph.reachable(source, max_distance - leg, budget)
+    distances = distances + leg
+    # Dijkstra settles in order, so a partial search is complete up to its farthest node
+    if reason is None:
+        reached_cost = max_distance
+    else:
+        reached_cost = float(distances[-1]) if len(distances) else leg
+
+    # Every edge out of a reached node, as far along as the remaining distance allows
+    offsets = graph.offsets
+    degree = offsets[nodes + 1] - offsets[nodes]
+    edges = (np.repeat(offsets[nodes], degree)
+             + np.arange(degree.sum()) - np.repeat(np.cumsum(degree) - degree, degree))
+    tails, heads, lengths = np.repeat(nodes, degree), graph.targets[edges], graph.weights[edges]
+    tail_cost = np.repeat(distances, degree)
+    fractions = np.clip((reached_cost - tail_cost) / np.where(lengths > 0, lengths, 1), 0, 1)
+    # Cells are narrowest east-west, by the cosine of the latitude
+    step_m = resolution * _METERS_PER_DEGREE * max(math.cos(math.radians(origin_lat)), 0.1) / 2
+    lat, lng, costs = _sample_segments(graph.lat[tails], graph.lng[tails], graph.lat[heads], graph.lng[heads],
+                                       tail_cost, lengths, fractions, step_m)
+    leg_lat, leg_lng, leg_costs = _sample_segments(
+        np.array([origin_lat]), np.array([origin_lng]), graph.lat[[source]], graph.lng[[source]],
+        np.zeros(1), np.array([leg]), np.ones(1), step_m)
+    lat, lng = np.concatenate([lat, leg_lat, graph.lat[nodes]]), np.concatenate([lng, leg_lng, graph.lng[nodes]])
+    costs = np.concatenate([costs, leg_costs, distances])
+
+    cells = np.trunc(np.column_stack([lng, lat]) / resolution).astype(np.int64)
+    # Lowest cost per cell: sort by cell, then cost, and keep each cell's first row
+    keys = cell_keys(cells)
+    order = np.lexsort((costs, keys))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = keys[order][1:] != keys[order][:-1]
+    return cells[order][first], costs[order][first], len(nodes), reached_cost, reason
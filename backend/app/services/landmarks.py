@@ -0,0 +1,206 @@
+"""ALT (A*, landmarks, triangle inequality) preprocessing for the road graph.
+
+For a handful of landmark nodes L, exact distances d(L, v) (and d(v, L) on
+one-way networks) are computed offline for every node. At query time the
+triangle inequality turns them into a lower bound on d(v, t) that is far
+tighter than the straight-line distance, so A* expands a small fraction of
+the nodes on long trips.
+
+The distances are stored as one (nodes, landmarks) float32 array, so a
+node's bounds are a single contiguous row. The file is memory-mapped, which
+lets every worker share one copy in the page cache.
+
+Build the data for the configured network with:
+
+    python -m app.services.landmarks --count 16
+"""
+import argparse
+import heapq
+import json
+import logging
+import math
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_FORMAT = 1
+# Unreachable nodes get a huge finite distance: sentinel - sentinel is 0 and
+# sentinel - d is still huge, so bounds stay valid without inf/nan arithmetic
+_UNREACHABLE = np.float32(np.finfo(np.float32).max / 4)
+
+
+def dijkstra(offsets: np.ndarray, targets: np.ndarray, weights: np.ndarray, source: int) -> np.ndarray:
+    """Distances in meters from `source` to every node (inf where unreachable)"""
+    distances = np.full(len(offsets) - 1, math.inf)
+    best = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        distance, node = heapq.heappop(heap)
+        if distance > best[node]:
+            continue
+        distances[node] = distance
+        start, end = int(offsets[node]), int(offsets[node + 1])
+        for neighbor, weight in zip(targets[start:end].tolist(), weights[start:end].tolist()):
+            candidate = distance + weight
+            if candidate < best.get(neighbor, math.inf):
+                best[neighbor] = candidate
+                heapq.heappush(heap, (candidate, neighbor))
+    return distances
+
+
+def reverse_csr(offsets: np.ndarray, targets: np.ndarray,
+                weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """CSR arrays of the graph with every edge flipped"""
+    node_count = len(offsets) - 1
+    sources = np.repeat(np.arange(node_count, dtype=np.int32), np.diff(offsets))
+    order = np.argsort(targets, kind="stable")
+    reversed_offsets = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(targets, minlength=node_count), out=reversed_offsets[1:])
+    return reversed_offsets, sources[order], weights[order]
+
+
+class Landmarks:
+    """Precomputed landmark distances and the ALT lower bound built on them"""
+
+    def __init__(self, nodes: np.ndarray, from_landmarks: np.ndarray,
+                 to_landmarks: Optional[np.ndarray] = None, max_distance: float = 0.0):
+        self.nodes = nodes
+        self.from_landmarks = from_landmarks
+        # None on symmetric networks, where d(v, L) == d(L, v)
+        self.to_landmarks = to_landmarks
+        self.max_distance = max_distance
+        # float32 storage rounds each distance by up to half a unit in the last place;
+        # subtracting this keeps the bound admissible
+        self.slack = 2 * float(np.spacing(np.float32(max_distance)))
+
+    @property
+    def count(self) -> int:
+        return len(self.nodes)
+
+    @classmethod
+    def build(cls, offsets: np.ndarray, targets: np.ndarray, weights: np.ndarray,
+              count: int = 16, symmetric: bool = True, seed: int = 0) -> "Landmarks":
+        """Pick landmarks by farthest-point selection and compute their distances.
+
+        Each new landmark is the node farthest (by road distance) from the
+        ones already chosen, which spreads them around the edge of the network
+        where their bounds are tightest.
+        """
+        node_count = len(offsets) - 1
+        count = min(count, node_count)
+        reverse = None if symmetric else reverse_csr(offsets, targets, weights)
+        rng = np.random.default_rng(seed)
+
+        # Start from whatever is farthest from a random connected node, not that node itself
+        connected = np.flatnonzero(np.diff(offsets))
+        start = int(rng.choice(connected)) if len(connected) else 0
+        seed_distances = dijkstra(offsets, targets, weights, start)
+        candidate = int(np.argmax(np.where(np.isfinite(seed_distances), seed_distances, -1)))
+
+        nodes: List[int] = []
+        from_rows, to_rows = [], []
+        nearest = np.full(node_count, math.inf)
+        for _ in range(count):
+            nodes.append(candidate)
+            forward = dijkstra(offsets, targets, weights, candidate)
+            from_rows.append(forward)
+            if reverse is not None:
+                to_rows.append(dijkstra(*reverse, candidate))
+            nearest = np.minimum(nearest, forward)
+            # Only nodes in the landmarks' component are candidates; picking a node
+            # from a tiny disconnected piece would waste a landmark on it
+            reachable = np.isfinite(nearest)
+            if nearest[reachable].max() == 0:
+                break
+            candidate = int(np.argmax(np.where(reachable, nearest, -1)))
+
+        rows = np.array(from_rows + to_rows)
+        max_distance = float(rows[np.isfinite(rows)].max())
+
+        def pack(rows):
+            return np.where(np.isfinite(rows), rows, _UNREACHABLE).astype(np.float32).T.copy()
+
+        return cls(np.array(nodes, dtype=np.int64), pack(np.array(from_rows)),
+                   pack(np.array(to_rows)) if to_rows else None, max_distance=max_distance)
+
+    def heuristic(self, target: int) -> Callable[[int], float]:
+        """Admissible estimate of d(node, target) in meters, as a function of node"""
+        from_landmarks, slack = self.from_landmarks, self.slack
+        target_from = np.array(from_landmarks[target])
+        if self.to_landmarks is None:
+            def bound(node: int) -> float:
+                return max(0.0, float(np.abs(target_from - from_landmarks[node]).max()) - slack)
+            return bound
+
+        # One-way streets: d(L, t) - d(L, v) and d(v, L) - d(t, L) are the valid bounds
+        to_landmarks = self.to_landmarks
+        target_to = np.array(to_landmarks[target])
+
+        def one_way_bound(node: int) -> float:
+            bound = max(float((target_from - from_landmarks[node]).max()),
+                        float((to_landmarks[node] - target_to).max()))
+            return max(0.0, bound - slack)
+        return one_way_bound
+
+    def save(self, directory: str, graph_signature: Dict[str, Any]) -> None:
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "landmarks.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        np.save(os.path.join(directory, "landmarks_from.npy"), self.from_landmarks)
+        if self.to_landmarks is not None:
+            np.save(os.path.join(directory, "landmarks_to.npy"), self.to_landmarks)
+        # Written last so a half-finished preprocessing run is never picked up
+        with open(meta_path, "w") as f:
+            json.dump({"format": _FORMAT, "graph": graph_signature, "nodes": self.nodes.tolist(),
+                       "one_way": self.to_landmarks is not None, "max_distance": self.max_distance}, f)
+
+    @classmethod
+    def load(cls, directory: str, graph_signature: Dict[str, Any]) -> Optional["Landmarks"]:
+        """Memory-map landmark data built for this exact graph, if there is any"""
+        try:
+            with open(os.path.join(directory, "landmarks.json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("format") != _FORMAT or meta.get("graph") != graph_signature:
+            logger.warning(f"Ignoring landmark data in {directory}: built for a different graph")
+            return None
+
+        def mapped(name):
+            return np.asarray(np.load(os.path.join(directory, name), mmap_mode="r"))
+
+        return cls(np.array(meta["nodes"], dtype=np.int64), mapped("landmarks_from.npy"),
+                   mapped("landmarks_to.npy") if meta["one_way"] else None,
+                   max_distance=meta["max_distance"])
+
+    def memory_bytes(self) -> int:
+        return int(self.from_landmarks.nbytes + (self.to_landmarks.nbytes if self.to_landmarks is not None else 0))
+
+
+def main():
+    from app.services.road_graph import get_road_graph
+    from app.core.config import get_settings
+
+    parser = argparse.ArgumentParser(description="Precompute ALT landmark distances for the configured road graph")
+    parser.add_argument("--count", type=int, default=16, help="number of landmarks")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    graph = get_road_graph()
+    if graph is None or not settings.GRAPH_CACHE_DIR:
+        parser.error("GRAPH_NODES_PATH, GRAPH_EDGES_PATH and GRAPH_CACHE_DIR must be set")
+    started = time.perf_counter()
+    landmarks = Landmarks.build(graph.offsets, graph.targets, graph.weights,
+                                count=args.count, symmetric=graph.symmetric)
+    landmarks.save(settings.GRAPH_CACHE_DIR, graph.signature())
+    print(f"Built {landmarks.count} landmarks for {graph.node_count} nodes in "
+          f"{time.perf_counter() - started:.1f} s ({landmarks.memory_bytes() / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Per-connection state for live re-routing over WebSocket.
+
+Each session keeps a D* Lite search toward its destination. Position
+updates move the search's start, and blocked or reopened cells, nodes and
+edges change its costs. Either way the route is repaired in place
+instead of searched again from scratch.
+
+Sessions are bounded in four ways: a cap on live sessions, a cap on
+search states and closures per session, a cap on search states across
+all sessions, and eviction of sessions that have been idle too long.
+"""
+import collections
+import itertools
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.models.navigation import Coordinates
+from app.services.dstar_lite import DStarLite, GraphSpace, GridSpace
+from app.services.road_graph import RoadGraph, get_road_graph
+from app.services.search_budget import SearchBudget, SearchBudgetExceeded
+
+LIVE_MODES = ("auto", "grid", "graph")
+
+
+class LiveSessionError(ValueError):
+    """A request the session cannot serve; reported to the client without closing the socket"""
+
+
+class LiveSessionLimitError(RuntimeError):
+    """No room for another session"""
+
+
+class LiveRouteSession:
+    """One traveller's route, repaired as they move and as the network changes"""
+
+    def __init__(self, session_id: str, start: Coordinates, end: Coordinates, mode: str,
+                 graph: Optional[RoadGraph], resolution: float, max_states: int, max_blocked: int):
+        if mode == "auto":
+            mode = "graph" if graph is not None else "grid"
+        if mode == "graph" and graph is None:
+            raise LiveSessionError("No road graph is loaded")
+        self.id = session_id
+        self.mode = mode
+        self.end = end
+        self.position = start
+        self.max_blocked = max_blocked
+        self.space = GraphSpace(graph) if mode == "graph" else GridSpace(resolution)
+        self.search = DStarLite(self.space, self._node(start), self._node(end), max_states)
+        self._id_order: Optional[np.ndarray] = None
+        self.created_at = self.last_active = time.monotonic()
+        # States this session may hold while a repair is running, drawn from the manager's shared budget
+        self.grant: Optional[int] = None
+        self.updates = 0
+        self.repair_seconds = 0.0
+
+    def _node(self, point: Coordinates):
+        node = self.space.node(point.lat, point.lng)
+        if node is None:
+            raise LiveSessionError(f"({point.lat}, {point.lng}) is too far from the road network")
+        return node
+
+    def _edge(self, edge: Sequence[int]) -> Tuple[int, int]:
+        """Node indices of an edge given by the network's own (OSM) node ids"""
+        if self.mode != "graph":
+            raise LiveSessionError("Edge closures need a road graph; close cells with `block` instead")
+        if len(edge) != 2:
+            raise LiveSessionError(f"Edges are [from_id, to_id] pairs, got {list(edge)}")
+        node_ids = self.space.graph.node_ids
+        if self._id_order is None:
+            self._id_order = np.argsort(node_ids)
+        positions = np.searchsorted(node_ids, edge, sorter=self._id_order)
+        u, v = (int(self._id_order[min(int(i), len(node_ids) - 1)]) for i in positions)
+        if node_ids[u] != edge[0] or node_ids[v] != edge[1]:
+            raise LiveSessionError(f"Unknown edge {list(edge)}")
+        return u, v
+
+    def update(self, position: Optional[Coordinates] = None,
+               block: Sequence[Coordinates] = (), unblock: Sequence[Coordinates] = (),
+               block_edges: Sequence[Sequence[int]] = (), unblock_edges: Sequence[Sequence[int]] = (),
+               budget: Optional[SearchBudget] = None) -> Dict[str, Any]:
+        """Apply a position and/or network change and repair the route.
+
+        Returns the route message: columnar `lat`/`lng` from the current
+        position to the destination (empty when it cannot be reached), the
+        remaining cost, and how many vertices the repair expanded. Invalid
+        updates raise LiveSessionError before anything is changed.
+        """
+        started = time.perf_counter()
+        search = self.search
+        start = self._node(position) if position is not None else search.start
+        closing = [self._node(point) for point in block]
+        opening = [self._node(point) for point in unblock]
+        closing_edges = [self._edge(edge) for edge in block_edges]
+        opening_edges = [self._edge(edge) for edge in unblock_edges]
+        if search.goal in closing or start in closing:
+            raise LiveSessionError("Cannot close the current position or the destination")
+        if self.space.blocked_count + len(closing) + len(closing_edges) > self.max_blocked:
+            raise LiveSessionError(f"Sessions can close at most {self.max_blocked} cells, nodes or edges")
+
+        if position is not None:
+            self.position = position
+            search.move_start(start)
+        changes = []
+        for nodes, blocked in ((closing, True), (opening, False)):
+            for node in nodes:
+                changes += self.space.set_blocked(node, blocked)
+        for edges, blocked in ((closing_edges, True), (opening_edges, False)):
+            for u, v in edges:
+                changes += self.space.set_edge_blocked(u, v, blocked)
+        search.update_edges(changes)
+
+        # An interrupted repair resumes from where it stopped on the next update
+        reason = None
+        try:
+            expanded = search.compute(budget)
+        except SearchBudgetExceeded as e:
+            expanded, reason = e.expanded, e.reason
+        nodes = search.path() if reason is None else None
+        elapsed = time.perf_counter() - started
+        self.updates += 1
+        self.repair_seconds += elapsed
+        if nodes is None:
+            lat, lng = [], []
+        else:
+            points = self.space.points(nodes)
+            # The exact position and destination replace the first and last cell or node
+            points = np.vstack([[(self.position.lat, self.position.lng)], points[1:-1],
+                                [(self.end.lat, self.end.lng)]])
+            lat, lng = points[:, 0].tolist(), points[:, 1].tolist()
+        distance = search.distance
+        return {
+            "type": "route",
+            "session": self.id,
+            "mode": self.mode,
+            "reachable": nodes is not None,
+            "degraded": reason is not None,
+            "reason": reason,
+            "cost": distance if math.isfinite(distance) and reason is None else None,
+            "lat": lat,
+            "lng": lng,
+            "expanded": expanded,
+            "repair_ms": elapsed * 1000,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "states": len(self.search),
+            "blocked": self.space.blocked_count,
+            "updates": self.updates,
+            "expanded": self.search.expanded,
+        }
+
+
+class LiveSessionManager:
+    """Owns every live session; enforces the session and memory caps and evicts idle sessions.
+
+    `max_total_states` bounds the search states held by all sessions
+    together. Each repair may grow its search into whatever the other
+    sessions leave free (up to `max_states`); a repair that runs out stops
+    with reason "states", and no new session opens while none is free.
+    """
+
+    def __init__(self, max_sessions: int = 1000, idle_seconds: float = 300, max_states: int = 200_000,
+                 max_blocked: int = 10_000, resolution: float = 0.01, max_total_states: int = 0):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.max_states = max_states
+        self.max_total_states = max_total_states
+        self.max_blocked = max_blocked
+        self.resolution = resolution
+        self.sessions: "collections.OrderedDict[str, LiveRouteSession]" = collections.OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+        self.evicted_idle = 0
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def open(self, start: Coordinates, end: Coordinates, mode: str = "auto") -> LiveRouteSession:
+        if mode not in LIVE_MODES:
+            raise LiveSessionError(f"Unknown mode '{mode}'; use one of {', '.join(LIVE_MODES)}")
+        graph = get_road_graph() if mode != "grid" else None
+        with self._lock:
+            self.evict_idle()
+            if len(self.sessions) >= self.max_sessions:
+                self.rejected += 1
+                raise LiveSessionLimitError(f"All {self.max_sessions} live sessions are in use")
+            if self.max_total_states and self._states_held() >= self.max_total_states:
+                self.rejected += 1
+                raise LiveSessionLimitError("Live sessions are holding all the search state memory allowed")
+            session = LiveRouteSession(str(next(self._ids)), start, end, mode, graph,
+                                       self.resolution, self.max_states, self.max_blocked)
+            self.sessions[session.id] = session
+            self.opened += 1
+        return session
+
+    def _states_held(self, excluding: Optional[LiveRouteSession] = None) -> int:
+        # A session mid-repair counts for everything it was granted; callers hold the lock
+        return sum(session.grant if session.grant is not None else len(session.search)
+                   for session in self.sessions.values() if session is not excluding)
+
+    def update(self, session: LiveRouteSession, **changes) -> Dict[str, Any]:
+        """`session.update(**changes)` with its state cap drawn from the shared budget"""
+        with self._lock:
+            limit = self.max_states
+            if self.max_total_states:
+                free = self.max_total_states - self._states_held(excluding=session)
+                limit = max(len(session.search), min(limit, free) if limit else free)
+            session.grant = session.search.max_states = limit
+        try:
+            return session.update(**changes)
+        finally:
+            with self._lock:
+                session.grant = None
+
+    def touch(self, session: LiveRouteSession) -> bool:
+        """Mark the session active; False if it was evicted in the meantime"""
+        with self._lock:
+            if session.id not in self.sessions:
+                return False
+            self.sessions.move_to_end(session.id)
+            session.last_active = time.monotonic()
+            return True
+
+    def close(self, session: LiveRouteSession) -> None:
+        with self._lock:
+            self.sessions.pop(session.id, None)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drop sessions idle for longer than `idle_seconds`; callers hold the lock"""
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        # Ordered by last activity, so the scan stops at the first live session
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if now - session.last_active < self.idle_seconds:
+                break
+            self.sessions.popitem(last=False)
+            evicted += 1
+        self.evicted_idle += evicted
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        sessions: List[LiveRouteSession] = list(self.sessions.values())
+        return {
+            "active": len(sessions),
+            "max_sessions": self.max_sessions,
+            "max_total_states": self.max_total_states,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "evicted_idle": self.evicted_idle,
+            "updates": sum(session.updates for session in sessions),
+            "search_states": sum(len(session.search) for session in sessions),
+        }
+
+
+def create_live_sessions() -> LiveSessionManager:
+    settings = get_settings()
+    return LiveSessionManager(
+        max_sessions=settings.LIVE_MAX_SESSIONS,
+        idle_seconds=settings.LIVE_SESSION_IDLE_SECONDS,
+        max_states=settings.LIVE_SESSION_MAX_STATES,
+        max_total_states=settings.LIVE_MAX_TOTAL_STATES,
+        max_blocked=settings.LIVE_SESSION_MAX_BLOCKED,
+        resolution=settings.ROUTE_GRID_RESOLUTION,
+    )
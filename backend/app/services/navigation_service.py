@@ -1,123 +1,598 @@
 from app.models.navigation import Coordinates, RouteResponse
+from app.models.route_path import RoutePath
+from app.models.matrix import DistanceMatrix
+from app.models.isochrone import Isochrone
+from app.core.config import get_settings
+from app.core.errors import ServiceOverloadedError
+from app.core.telemetry import stage_metrics
+from app.services.path_engine import PathEngine
+from app.services.route_cache import RouteCache
+from app.services.route_executor import RouteExecutor
+from app.services.route_store import PersistentRouteStore, route_cache_version
+from app.services.search_budget import SearchBudget
+from app.services.shared_state import get_shared_state
+from app.services.single_flight import SingleFlight
+from app.utils.cell_outline import cell_centers
+from app.utils.simplify import quantize_tolerance
+import asyncio
+import logging
+import math
 import time
-import os
-import sys
-from typing import List
-import json
-from functools import lru_cache
-import hashlib
+from functools import partial
+from typing import List, Optional, Tuple
+import numpy as np
 
-class NavigationService:
-    def __init__(self):
-        try:
-            from wasmer import Store, Module, Instance, ImportObject
-            store = Store()
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            wasm_path = os.path.join(current_dir, "../../wasm/pkg/wasm_bg.wasm")
-            
-            if not os.path.exists(wasm_path):
-                raise FileNotFoundError(f"WASM file not found at {wasm_path}")
-            
-            print(f"Loading WASM from: {wasm_path}")
-            
-            with open(wasm_path, "rb") as wasm_file:
-                wasm_bytes = wasm_file.read()
-            
-            self.module = Module(store, wasm_bytes)
-            import_object = ImportObject()
-            self.instance = Instance(self.module, import_object)
-            self.use_wasm = True
-            print("WASM module loaded successfully")
-            
-        except ImportError as e:
-            print(f"Warning: Wasmer not available, falling back to Python implementation: {str(e)}")
-            self.use_wasm = False
-        except Exception as e:
-            print(f"Error initializing WASM: {str(e)}", file=sys.stderr)
-            self.use_wasm = False
+logger = logging.getLogger(__name__)
 
+# Rough per-entry overhead (key tuple, array header, LRU bookkeeping) on top of the path bytes
+_CACHE_ENTRY_OVERHEAD_BYTES = 256
+# Extra wait past the deadline so a search that stopped on time can still hand back its partial path
+_DEADLINE_GRACE_SECONDS = 0.05
+
+class NavigationService:
+    def __init__(self, executor: Optional[RouteExecutor] = None):
+        """`executor` replaces the one built from the ROUTE_EXECUTOR_* settings"""
+        settings = get_settings()
+        self.cache_key_mode = settings.ROUTE_CACHE_KEY_MODE
+        self.grid_scale = 1.0 / settings.ROUTE_GRID_RESOLUTION
         self.calculation_count = 0
-        self.cache = {}
-        self.cache_hits = 0  # Track cache effectiveness
-
-    def _get_cache_key(self, start: Coordinates, end: Coordinates) -> str:
-        """Generate a cache key based on start and end coordinates"""
-        data = f"{start.lat}:{start.lng}:{end.lat}:{end.lng}"
-        return hashlib.md5(data.encode()).hexdigest()
-
-    def _calculate_path_python(self, start: Coordinates, end: Coordinates) -> List[Coordinates]:
-        """Fallback Python implementation when WASM is not available"""
-        path = []
-        steps = 50
-        for i in range(steps + 1):
-            t = i / steps
-            lat = start.lat + (end.lat - start.lat) * t
-            lng = start.lng + (end.lng - start.lng) * t
-            path.append(Coordinates(lat=lat, lng=lng))
+        self.warm_up_mode = "lazy"
+        self.matrix_speed_kmh = settings.MATRIX_SPEED_KMH
+        self.matrix_count = 0
+        self.matrix_cells = 0
+        # "auto" isochrones follow the road graph when one is configured
+        self.graph_configured = bool(settings.GRAPH_NODES_PATH and settings.GRAPH_EDGES_PATH)
+        self.isochrone_resolution = settings.ISOCHRONE_GRAPH_RESOLUTION
+        self.isochrone_cost_step = settings.ISOCHRONE_COST_STEP_M
+        self.isochrone_max_cells = settings.ISOCHRONE_MAX_CELLS
+        self.isochrone_count = 0
+        self.isochrone_expanded = 0
+        self.max_expansions = settings.ROUTE_MAX_EXPANSIONS
+        self.time_budget_ms = settings.ROUTE_TIME_BUDGET_MS
+        self.budget_exceeded = {"expansions": 0, "time": 0, "cancelled": 0}
+        self.degraded_routes = 0
+        self.engine_errors = 0
+        self.simplified_routes = 0
+        self.points_before_simplification = 0
+        self.points_after_simplification = 0
+        self.cache = RouteCache(
+            max_entries=settings.ROUTE_CACHE_MAX_ENTRIES,
+            max_bytes=settings.ROUTE_CACHE_MAX_BYTES,
+            ttl_seconds=settings.ROUTE_CACHE_TTL_SECONDS,
+        )
+        # Isochrones are keyed by quantized origin and budget (see compute_isochrone)
+        self.isochrone_cache = RouteCache(
+            max_entries=settings.ISOCHRONE_CACHE_MAX_ENTRIES,
+            max_bytes=settings.ISOCHRONE_CACHE_MAX_BYTES,
+            ttl_seconds=settings.ROUTE_CACHE_TTL_SECONDS,
+        )
+        # Optional host-wide cache shared with the other workers
+        self.shared_state = get_shared_state()
+        self.disk_cache = self._open_disk_cache(settings)
+        # Identical cache misses arriving together share one search
+        self.in_flight = SingleFlight()
+        if executor is None:
+            # Process workers each get their own engine, so one pooled instance is enough there
+            engine_factory = (partial(PathEngine, wasm_pool_size=1)
+                              if settings.ROUTE_EXECUTOR_MODE == "process" else PathEngine)
+            executor = RouteExecutor(
+                engine_factory,
+                mode=settings.ROUTE_EXECUTOR_MODE,
+                workers=settings.ROUTE_EXECUTOR_WORKERS,
+                max_queue=settings.ROUTE_EXECUTOR_MAX_QUEUE,
+            )
+        self.executor = executor
+
+    @staticmethod
+    def _open_disk_cache(settings) -> Optional[PersistentRouteStore]:
+        """Persistent tier, stamped so it is discarded when the path engine changes"""
+        if not settings.ROUTE_CACHE_DISK_PATH:
+            return None
+        return PersistentRouteStore(
+            settings.ROUTE_CACHE_DISK_PATH,
+            version=route_cache_version(settings),
+            max_bytes=settings.ROUTE_CACHE_DISK_MAX_BYTES,
+            compact_interval_seconds=settings.ROUTE_CACHE_DISK_COMPACT_INTERVAL_SECONDS,
+        )
+
+    def start(self, warm_up: str = "background") -> None:
+        """Begin building the path engine according to the ENGINE_WARMUP setting"""
+        if warm_up not in ("background", "eager", "lazy"):
+            raise ValueError(f"Unknown engine warm-up mode: {warm_up}")
+        self.warm_up_mode = warm_up
+        if warm_up != "lazy":
+            self.executor.warm_up(background=warm_up == "background")
+
+    @property
+    def ready(self) -> bool:
+        """Whether route requests will be served without waiting on engine start-up.
+
+        A lazy engine is built by the first request, so it counts as ready.
+        """
+        return self.warm_up_mode == "lazy" or self.executor.ready
+
+    def shutdown(self) -> None:
+        self.executor.shutdown()
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+
+    @property
+    def use_wasm(self) -> bool:
+        return self.executor.engine.use_wasm
+
+    @property
+    def cache_hits(self) -> int:
+        return self.cache.hits
+
+    def _get_cache_key(self, start: Coordinates, end: Coordinates) -> Tuple:
+        """Generate a cache key based on start and end coordinates.
+
+        In "grid" mode the key is the pair of grid cells that the WASM A*
+        actually searches on, so nearby requests share one cached path.
+        """
+        if self.cache_key_mode == "grid":
+            return (
+                self._grid_cell(start.lat), self._grid_cell(start.lng),
+                self._grid_cell(end.lat), self._grid_cell(end.lng),
+            )
+        return (start.lat, start.lng, end.lat, end.lng)
+
+    def _grid_cell(self, value: float) -> int:
+        # lib.rs converts with `(value * 100.0) as i32`, which truncates toward zero
+        return int(value * self.grid_scale)
+
+    def _cell_center(self, cell: int) -> float:
+        """Coordinate that truncates back into `cell` without float edge effects"""
+        if cell == 0:
+            return 0.0
+        offset = 0.5 if cell > 0 else -0.5
+        return (cell + offset) / self.grid_scale
+
+    def _search_endpoints(self, start: Coordinates, end: Coordinates) -> Tuple[Coordinates, Coordinates]:
+        """Coordinates handed to the path engines for a cache miss"""
+        if self.cache_key_mode != "grid":
+            return start, end
+        # Unvalidated: the center of a cell at the edge of the map lies just past +-90/180
+        return (
+            Coordinates.model_construct(lat=self._cell_center(self._grid_cell(start.lat)),
+                                        lng=self._cell_center(self._grid_cell(start.lng))),
+            Coordinates.model_construct(lat=self._cell_center(self._grid_cell(end.lat)),
+                                        lng=self._cell_center(self._grid_cell(end.lng))),
+        )
+
+    def _stitch_endpoints(self, path: np.ndarray, start: Coordinates, end: Coordinates) -> np.ndarray:
+        """Put the caller's exact start and end back onto a cell-level path"""
+        if self.cache_key_mode != "grid" or len(path) < 2:
+            return path
+        stitched = path.copy()
+        stitched[0] = (start.lat, start.lng)
+        stitched[-1] = (end.lat, end.lng)
+        return stitched
+
+    @staticmethod
+    def _estimate_size(path: np.ndarray) -> int:
+        """Approximate memory held by a cached route, scaled by path length"""
+        return _CACHE_ENTRY_OVERHEAD_BYTES + path.nbytes
+
+    async def _cache_get(self, keys: List[Tuple]) -> List[Optional[np.ndarray]]:
+        """Look the keys up tier by tier: process memory, shared file, then disk.
+
+        The disk tier is SQLite, so its lookups for the whole batch run on
+        one thread off the event loop.
+        """
+        with stage_metrics.stage("cache_lookup"):
+            paths = [self._memory_lookup(key) for key in keys]
+            missed = [index for index, path in enumerate(paths) if path is None]
+            if self.disk_cache is not None and missed:
+                found = await asyncio.to_thread(lambda: [self.disk_cache.get(keys[index]) for index in missed])
+                for index, path in zip(missed, found):
+                    if path is not None:
+                        paths[index] = path
+                        self.cache.put(keys[index], path, self._estimate_size(path))
+                        if self.shared_state is not None:
+                            self.shared_state.cache_put(keys[index], path)
+            return paths
+
+    def _memory_lookup(self, key: Tuple) -> Optional[np.ndarray]:
+        path = self.cache.get(key)
+        if path is not None:
+            return path
+        if self.shared_state is not None:
+            path = self.shared_state.cache_get(key)
+            if path is not None:
+                self.cache.put(key, path, self._estimate_size(path))
         return path
 
+    def _cache_put(self, key: Tuple, path: np.ndarray) -> None:
+        self.cache.put(key, path, self._estimate_size(path))
+        if self.shared_state is not None:
+            self.shared_state.cache_put(key, path)
+        if self.disk_cache is not None:
+            self.disk_cache.put(key, path)
+
+    async def _simplify(self, keys: List[Tuple], paths: List[np.ndarray], tolerance_m: Optional[float],
+                        degraded: frozenset = frozenset()) -> List[np.ndarray]:
+        """Level-of-detail variants of searched paths.
+
+        Variants live in the in-memory cache next to the full path, keyed
+        by the path's key and the tolerance, and count against the same
+        byte budget. They are cheap to rebuild, so they skip the shared and
+        disk tiers. Missing variants are built in one executor call, off
+        the event loop; degraded paths are never cached.
+        """
+        if tolerance_m is None:
+            return paths
+        simplified: List[Optional[np.ndarray]] = [None] * len(paths)
+        pending = {}
+        for index, key in enumerate(keys):
+            if key not in degraded:
+                simplified[index] = self.cache.get(("simplified", tolerance_m) + key)
+            if simplified[index] is None:
+                pending.setdefault(key, index)
+        if pending:
+            built = await self.executor.run("simplify_paths", [paths[index] for index in pending.values()],
+                                            tolerance_m)
+            built_by_key = dict(zip(pending.keys(), built))
+            for key, variant in built_by_key.items():
+                if key not in degraded:
+                    self.cache.put(("simplified", tolerance_m) + key, variant, self._estimate_size(variant))
+            simplified = [variant if variant is not None else built_by_key[key]
+                          for key, variant in zip(keys, simplified)]
+        self.simplified_routes += len(paths)
+        self.points_before_simplification += sum(len(path) for path in paths)
+        self.points_after_simplification += sum(len(variant) for variant in simplified)
+        return simplified
+
+    async def _route_paths(self, keys: List[Tuple], paths: List[np.ndarray],
+                           pairs: List[Tuple[Coordinates, Coordinates]], calculation_time: float,
+                           tolerance_m: Optional[float], degraded: frozenset = frozenset()) -> List[RoutePath]:
+        simplified = await self._simplify(keys, paths, tolerance_m, degraded)
+        return [RoutePath(self._stitch_endpoints(variant, start, end), calculation_time,
+                          degraded=key in degraded, original_point_count=len(path))
+                for key, path, variant, (start, end) in zip(keys, paths, simplified, pairs)]
+
+    def simplification_stats(self) -> dict:
+        before, after = self.points_before_simplification, self.points_after_simplification
+        return {
+            "routes": self.simplified_routes,
+            "points_before": before,
+            "points_after": after,
+            "point_reduction": 1 - after / before if before else 0.0,
+        }
+
+    def matrix_stats(self) -> dict:
+        return {"matrices": self.matrix_count, "cells": self.matrix_cells}
+
+    def isochrone_stats(self) -> dict:
+        return {
+            "isochrones": self.isochrone_count,
+            "expanded": self.isochrone_expanded,
+            "cache": self.isochrone_cache.stats(),
+        }
+
+    def cache_tier_stats(self) -> dict:
+        return {
+            "memory": self.cache.stats(),
+            "shared": self.shared_state.stats() if self.shared_state is not None else None,
+            "disk": self.disk_cache.stats() if self.disk_cache is not None else None,
+        }
+
+    def new_budget(self, time_budget_ms: Optional[float] = None,
+                   max_expansions: Optional[int] = None) -> SearchBudget:
+        """Budget for one request; requested limits can only tighten the configured ones"""
+        def tighten(requested, limit):
+            if not requested:
+                return limit
+            return min(requested, limit) if limit else requested
+
+        return SearchBudget(max_expansions=tighten(max_expansions, self.max_expansions),
+                            time_budget_ms=tighten(time_budget_ms, self.time_budget_ms))
+
+    def budget_stats(self) -> dict:
+        return {
+            "max_expansions": self.max_expansions,
+            "time_budget_ms": self.time_budget_ms,
+            "exceeded": dict(self.budget_exceeded),
+            "degraded_routes": self.degraded_routes,
+            "engine_errors": self.engine_errors,
+        }
+
+    async def _search(self, pairs: List[Tuple[Coordinates, Coordinates]],
+                      budget: SearchBudget) -> List[Tuple[np.ndarray, Optional[str]]]:
+        """Run the engine under `budget`; each result is (path, degraded reason or None).
+
+        The engine stops itself at the deadline, but WASM searches only know
+        their expansion budget, so the wait is also cut off here and the
+        search is cancelled if it overruns.
+        """
+        try:
+            search = self.executor.run("calculate_paths_bounded", pairs, budget)
+            remaining = budget.remaining_seconds()
+            # Round trip through the executor, queueing included
+            with stage_metrics.stage("engine_call"):
+                if remaining is None:
+                    results = await search
+                else:
+                    try:
+                        results = await asyncio.wait_for(search, remaining + _DEADLINE_GRACE_SECONDS)
+                    except asyncio.TimeoutError:
+                        budget.cancel()
+                        straight = PathEngine.calculate_paths_python(pairs, steps=10)
+                        results = [(path, "time") for path in straight]
+        except asyncio.CancelledError:
+            # The client went away; stop the worker's search at its next check
+            budget.cancel()
+            self.budget_exceeded["cancelled"] += 1
+            raise
+        for _, reason in results:
+            if reason is not None:
+                if reason == "error":
+                    self.engine_errors += 1
+                else:
+                    self.budget_exceeded[reason] += 1
+                self.degraded_routes += 1
+        return results
+
+    async def _coalesced_search(self, keys: List[Tuple],
+                                pairs: List[Tuple[Coordinates, Coordinates]],
+                                budget: SearchBudget) -> List[Tuple[np.ndarray, Optional[str]]]:
+        """`_search` for the cache-missed `keys`, joining searches already in flight.
+
+        A search is only joined by requests with the same budget limits, so
+        a request with a tiny budget never hands its degraded route to one
+        with the default limits. It gets its own budget, so only the last
+        of its requests going away cancels it. Complete results are cached
+        once, by the search itself.
+        """
+        flight_keys = [(budget.limits, key) for key in keys]
+        pairs_by_key = dict(zip(flight_keys, pairs))
+
+        async def compute(new_keys: List[Tuple]) -> List[Tuple[np.ndarray, Optional[str]]]:
+            results = await self._search([pairs_by_key[key] for key in new_keys], budget.detached())
+            # Degraded paths depend on load and budget, so they are never cached
+            for (_, key), (path, reason) in zip(new_keys, results):
+                if reason is None:
+                    self._cache_put(key, path)
+            return results
+
+        return await self.in_flight.run(flight_keys, compute)
+
     async def calculate_route(
         self,
         start: Coordinates,
         end: Coordinates
     ) -> RouteResponse:
+        return (await self.compute_route(start, end)).to_response()
+
+    async def calculate_routes(
+        self,
+        pairs: List[Tuple[Coordinates, Coordinates]]
+    ) -> List[RouteResponse]:
+        return [route.to_response() for route in await self.compute_routes(pairs)]
+
+    async def compute_route(
+        self,
+        start: Coordinates,
+        end: Coordinates,
+        budget: Optional[SearchBudget] = None,
+        tolerance_m: Optional[float] = None
+    ) -> RoutePath:
+        """Return the route as an array-backed RoutePath.
+
+        Callers that encode their own response format use this directly and
+        never build per-point models. Without a `budget` the configured
+        limits apply. A `tolerance_m` simplifies the path to that many
+        meters of deviation.
+        """
+        tolerance_m = quantize_tolerance(tolerance_m)
         # Increment counter for metrics
         self.calculation_count += 1
 
         start_time = time.perf_counter()
-        
+
         # Check cache first
         cache_key = self._get_cache_key(start, end)
-        if cache_key in self.cache:
-            self.cache_hits += 1
-            return self.cache[cache_key]
-        
+        cached = (await self._cache_get([cache_key]))[0]
+        if cached is not None:
+            return (await self._route_paths([cache_key], [cached], [(start, end)],
+                                            (time.perf_counter() - start_time) * 1000, tolerance_m))[0]
+
         try:
-            # Fix WASM integration - properly check if WASM is available
-            if self.use_wasm and hasattr(self, 'instance'):
-                try:
-                    # Properly call the WASM module using wasmer
-                    find_path = self.instance.exports.find_path
-                    result = find_path(start.lat, start.lng, end.lat, end.lng)
-                    # Parse the result into path coordinates
-                    path = [Coordinates(lat=point["lat"], lng=point["lng"]) 
-                           for point in json.loads(result)]
-                except Exception as e:
-                    print(f"WASM execution error: {e}")
-                    path = self._calculate_path_python(start, end)
-            else:
-                # Fallback to Python implementation
-                path = self._calculate_path_python(start, end)
-            
+            # Paths are cached as searched; endpoints are stitched per request
+            path, reason = (await self._coalesced_search(
+                [cache_key], [self._search_endpoints(start, end)], budget or self.new_budget()))[0]
+
             calculation_time = (time.perf_counter() - start_time) * 1000
-            
-            result = RouteResponse(
-                path=path,
-                calculation_time_ms=calculation_time
-            )
-            
-            # Cache the result
-            self.cache[cache_key] = result
-            return result
+            return (await self._route_paths([cache_key], [path], [(start, end)], calculation_time, tolerance_m,
+                                            frozenset([cache_key]) if reason is not None else frozenset()))[0]
+        except ServiceOverloadedError:
+            raise
         except Exception as e:
-            print(f"Error calculating route: {e}")
+            logger.error("Error calculating route: %s", e)
+            self.engine_errors += 1
             # Fallback to simple interpolation
             return self._calculate_simple_route(start, end, start_time)
 
-    def _calculate_simple_route(self, start: Coordinates, end: Coordinates, start_time: float) -> RouteResponse:
+    async def compute_routes(
+        self,
+        pairs: List[Tuple[Coordinates, Coordinates]],
+        budget: Optional[SearchBudget] = None,
+        tolerance_m: Optional[float] = None
+    ) -> List[RoutePath]:
+        """Calculate many routes at once.
+
+        Cache lookups for the whole batch happen up front; the remaining
+        unique misses are computed together so the Python fallback can
+        interpolate all of them in a single NumPy pass. The budget's
+        deadline covers the whole batch.
+        """
+        tolerance_m = quantize_tolerance(tolerance_m)
+        self.calculation_count += len(pairs)
+        start_time = time.perf_counter()
+
+        keys = [self._get_cache_key(start, end) for start, end in pairs]
+        paths = await self._cache_get(keys)
+
+        # Duplicate pairs inside one batch are only computed once
+        pending = {}
+        for index, path in enumerate(paths):
+            if path is None:
+                pending.setdefault(keys[index], index)
+
+        degraded = set()
+        if pending:
+            try:
+                computed = await self._coalesced_search(
+                    list(pending.keys()),
+                    [self._search_endpoints(*pairs[index]) for index in pending.values()],
+                    budget or self.new_budget())
+            except ServiceOverloadedError:
+                raise
+            except Exception as e:
+                logger.error("Error calculating routes: %s", e)
+                self.engine_errors += 1
+                return [self._calculate_simple_route(start, end, start_time) for start, end in pairs]
+            computed_by_key = {}
+            for key, (path, reason) in zip(pending.keys(), computed):
+                computed_by_key[key] = path
+                if reason is not None:
+                    degraded.add(key)
+            paths = [path if path is not None else computed_by_key[key]
+                     for key, path in zip(keys, paths)]
+
+        calculation_time = (time.perf_counter() - start_time) * 1000
+        return await self._route_paths(keys, paths, pairs, calculation_time, tolerance_m, frozenset(degraded))
+
+    async def compute_matrix(
+        self,
+        sources: List[Coordinates],
+        destinations: List[Coordinates],
+        mode: str = "auto",
+        speed_kmh: Optional[float] = None,
+        budget: Optional[SearchBudget] = None
+    ) -> DistanceMatrix:
+        """Costs between every source and destination, without building paths.
+
+        Raises ValueError for a mode the engine cannot serve. If the budget
+        runs out, the pairs not yet searched are left empty and the
+        matrix is marked degraded.
+        """
+        self.matrix_count += 1
+        self.matrix_cells += len(sources) * len(destinations)
+        start_time = time.perf_counter()
+        source_array = np.array([(c.lat, c.lng) for c in sources], dtype=np.float64).reshape(-1, 2)
+        destination_array = np.array([(c.lat, c.lng) for c in destinations], dtype=np.float64).reshape(-1, 2)
+        budget = budget or self.new_budget()
+        try:
+            search = self.executor.run("calculate_matrix", source_array, destination_array, mode, budget)
+            remaining = budget.remaining_seconds()
+            with stage_metrics.stage("engine_call"):
+                if remaining is None:
+                    distances, mode, reason = await search
+                else:
+                    try:
+                        distances, mode, reason = await asyncio.wait_for(
+                            search, remaining + _DEADLINE_GRACE_SECONDS)
+                    except asyncio.TimeoutError:
+                        # Same fallback as an overrunning route: straight lines
+                        budget.cancel()
+                        distances = PathEngine.haversine_matrix(source_array, destination_array)
+                        mode, reason = "haversine", "time"
+        except asyncio.CancelledError:
+            budget.cancel()
+            self.budget_exceeded["cancelled"] += 1
+            raise
+        if reason is not None:
+            self.budget_exceeded[reason] += 1
+        durations = distances / ((speed_kmh or self.matrix_speed_kmh) / 3.6)
+        return DistanceMatrix(distances, durations, mode, (time.perf_counter() - start_time) * 1000,
+                              degraded=reason is not None)
+
+    def _isochrone_key(self, origin: Coordinates, max_cost: float, mode: str) -> Tuple[Tuple, float, float, float]:
+        """Cache key, plus the origin and budget the expansion actually runs with.
+
+        Grid expansions start from the lib.rs cell and count whole steps, so
+        their key loses nothing. Graph origins are snapped to the center of
+        their output cell and budgets rounded down to the cost step; the
+        expansion runs from the quantized values, so every request sharing a
+        key gets the same result.
+        """
+        if mode == "grid":
+            x, y = self._grid_cell(origin.lng), self._grid_cell(origin.lat)
+            max_cost = float(math.floor(max_cost))
+            return ("isochrone", mode, x, y, max_cost), self._cell_center(y), self._cell_center(x), max_cost
+        resolution, step = self.isochrone_resolution, self.isochrone_cost_step
+        # Output cells truncate toward zero, like lib.rs's
+        x, y = int(origin.lng / resolution), int(origin.lat / resolution)
+        lat, lng = cell_centers([(x, y)], resolution)[0].tolist()
+        max_cost = math.floor(max_cost / step) * step
+        return ("isochrone", mode, x, y, max_cost), lat, lng, max_cost
+
+    async def compute_isochrone(
+        self,
+        origin: Coordinates,
+        max_cost: float,
+        mode: str = "auto",
+        budget: Optional[SearchBudget] = None
+    ) -> Isochrone:
+        """Everything reachable from `origin` within `max_cost`, from one bounded expansion.
+
+        Raises ValueError for a mode the engine cannot serve. Complete
+        results are cached; one cut short by the budget is returned
+        degraded, exact up to its `reached_cost`, and not cached.
+        """
+        self.isochrone_count += 1
+        start_time = time.perf_counter()
+        if mode == "auto":
+            mode = "graph" if self.graph_configured else "grid"
+        key, lat, lng, max_cost = self._isochrone_key(origin, max_cost, mode)
+        resolution = 1.0 / self.grid_scale if mode == "grid" else self.isochrone_resolution
+        cached = self.isochrone_cache.get(key)
+        if cached is not None:
+            return cached.served((time.perf_counter() - start_time) * 1000, cached=True)
+
+        # A capped copy; the caller's budget is left as it was
+        budget = (budget or self.new_budget()).detached()
+        if not budget.max_expansions or budget.max_expansions > self.isochrone_max_cells:
+            budget.max_expansions = self.isochrone_max_cells
+
+        async def compute(keys: List[Tuple]) -> List[Isochrone]:
+            search_budget = budget.detached()
+            try:
+                search = self.executor.run("calculate_isochrone", lat, lng, max_cost, mode, resolution,
+                                           search_budget)
+                remaining = search_budget.remaining_seconds()
+                with stage_metrics.stage("engine_call"):
+                    if remaining is None:
+                        result = await search
+                    else:
+                        try:
+                            result = await asyncio.wait_for(search, remaining + _DEADLINE_GRACE_SECONDS)
+                        except asyncio.TimeoutError:
+                            # Nothing partial comes back from an overrunning worker
+                            search_budget.cancel()
+                            result = (np.empty((0, 2), dtype=np.int64), np.empty(0), mode, 0, 0.0, "time")
+            except asyncio.CancelledError:
+                search_budget.cancel()
+                self.budget_exceeded["cancelled"] += 1
+                raise
+            cells, costs, used_mode, expanded, reached_cost, reason = result
+            self.isochrone_expanded += expanded
+            isochrone = Isochrone(cells, costs, resolution, used_mode, max_cost, reached_cost, expanded,
+                                  degraded=reason is not None)
+            if reason is None:
+                self.isochrone_cache.put(key, isochrone, isochrone.nbytes + _CACHE_ENTRY_OVERHEAD_BYTES)
+            else:
+                self.budget_exceeded[reason] += 1
+            return [isochrone]
+
+        isochrone = (await self.in_flight.run([(budget.limits, key)], compute))[0]
+        return isochrone.served((time.perf_counter() - start_time) * 1000, cached=False)
+
+    def _calculate_simple_route(self, start: Coordinates, end: Coordinates,
+                                start_time: float) -> RoutePath:
         # Simple linear interpolation for testing
-        steps = 10
-        path: List[Coordinates] = []
-        
-        for i in range(steps + 1):
-            t = i / steps
-            lat = start.lat + (end.lat - start.lat) * t
-            lng = start.lng + (end.lng - start.lng) * t
-            path.append(Coordinates(lat=lat, lng=lng))
-        
+        path = PathEngine.calculate_paths_python([(start, end)], steps=10)[0]
         calculation_time = (time.perf_counter() - start_time) * 1000
-        
-        return RouteResponse(
-            path=path,
-            calculation_time_ms=calculation_time
-        )
\ No newline at end of file
+        self.degraded_routes += 1
+        return RoutePath(path, calculation_time, degraded=True)
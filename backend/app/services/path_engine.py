@@ -0,0 +1,249 @@
+from app.models.navigation import Coordinates
+from app.core.config import get_settings
+from app.core.telemetry import stage_metrics
+from app.services.isochrone import ISOCHRONE_MODES, expand_grid, road_cells
+from app.services.road_graph import get_road_graph, haversine_m
+from app.services.search_budget import SearchBudget, SearchBudgetExceeded
+from app.utils.geo import EARTH_RADIUS_M
+from app.utils.simplify import douglas_peucker
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import math
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MATRIX_MODES = ("auto", "haversine", "grid", "graph")
+
+class PathEngine:
+    """Computes raw paths between coordinate pairs.
+
+    Holds no request state, so it can run on the event loop, in a worker
+    thread, or be rebuilt inside each process of a process pool.
+    """
+
+    def __init__(self, wasm_pool_size: int = 0):
+        settings = get_settings()
+        self.wasm = None
+        self.use_wasm = False
+        self.graph = None
+        self.grid_resolution = settings.ROUTE_GRID_RESOLUTION
+        try:
+            self.graph = get_road_graph()
+        except Exception as e:
+            logger.error("Error loading road graph, routing without it: %s", e)
+        if not settings.USE_WASM:
+            return
+        try:
+            from app.services.wasm_service import WasmService
+            self.wasm = WasmService(
+                wasm_path=settings.WASM_PATH or None,
+                pool_size=wasm_pool_size or settings.WASM_POOL_SIZE or os.cpu_count() or 1,
+                max_memory_bytes=settings.WASM_MAX_MEMORY_BYTES,
+                artifact_cache_dir=settings.WASM_ARTIFACT_CACHE_DIR or None,
+            )
+            self.use_wasm = self.wasm.available
+            if self.use_wasm:
+                logger.info("WASM module loaded successfully")
+            else:
+                logger.warning("WASM module not loaded from %s, falling back to Python implementation",
+                               self.wasm.wasm_path)
+        except ImportError as e:
+            logger.warning("wasmtime not available, falling back to Python implementation: %s", e)
+        except Exception as e:
+            logger.error("Error initializing WASM: %s", e)
+
+    @staticmethod
+    def interpolate_paths(starts: np.ndarray, ends: np.ndarray, steps: int) -> np.ndarray:
+        """Linearly interpolate every (start, end) pair in one NumPy pass.
+
+        `starts` and `ends` are (N, 2) arrays of lat/lng; the result is an
+        (N, steps + 1, 2) array of path points.
+        """
+        t = np.linspace(0.0, 1.0, steps + 1)
+        return starts[:, None, :] + (ends - starts)[:, None, :] * t[None, :, None]
+
+    @staticmethod
+    def calculate_paths_python(pairs: List[Tuple[Coordinates, Coordinates]],
+                               steps: int = 50) -> List[np.ndarray]:
+        """Fallback Python implementation when WASM is not available"""
+        starts = np.array([(s.lat, s.lng) for s, _ in pairs], dtype=np.float64).reshape(-1, 2)
+        ends = np.array([(e.lat, e.lng) for _, e in pairs], dtype=np.float64).reshape(-1, 2)
+        # Copy each path out so a cached route does not pin the whole batch array
+        return [points.copy() for points in PathEngine.interpolate_paths(starts, ends, steps)]
+
+    def calculate_path_python(self, start: Coordinates, end: Coordinates, steps: int = 50) -> np.ndarray:
+        return self.calculate_paths_python([(start, end)], steps=steps)[0]
+
+    def calculate_path_wasm(self, start: Coordinates, end: Coordinates,
+                            budget: Optional[SearchBudget] = None) -> Tuple[np.ndarray, Optional[str]]:
+        """WASM path and the reason it is degraded, if the search ran out of budget"""
+        # Each call checks out its own pooled instance, so threads can search concurrently
+        if budget is not None and budget.max_expansions and self.wasm.supports_bounded_search:
+            # wasm32 has no clock, so only the expansion budget is enforced inside the module
+            result = self.wasm.find_path_bounded(start.lat, start.lng, end.lat, end.lng,
+                                                 budget.max_expansions)
+            if result is None:
+                # The call failed; an unbounded retry would drop the budget just when something is wrong
+                return self.calculate_path_python(start, end, steps=10), "error"
+            points, degraded = result
+            return points, "expansions" if degraded else None
+        points = self.wasm.find_path_packed(start.lat, start.lng, end.lat, end.lng)
+        if points is not None:
+            return points, None
+        # Modules built before the packed ABI only export the JSON-returning find_path
+        result = self.wasm.find_path(start.lat, start.lng, end.lat, end.lng)
+        if result is None:
+            raise RuntimeError("WASM find_path returned no result")
+        with stage_metrics.stage("result_parsing"):
+            return np.array([(point["lat"], point["lng"]) for point in json.loads(result)],
+                            dtype=np.float64).reshape(-1, 2), None
+
+    def calculate_paths(self, pairs: List[Tuple[Coordinates, Coordinates]]) -> List[np.ndarray]:
+        """Compute (n, 2) lat/lng arrays.
+
+        The road graph is tried first when one is loaded; pairs it cannot
+        route (off the network or disconnected) go to WASM, then to the
+        Python fallback.
+        """
+        return [path for path, _ in self.calculate_paths_bounded(pairs)]
+
+    def calculate_paths_bounded(self, pairs: List[Tuple[Coordinates, Coordinates]],
+                                budget: Optional[SearchBudget] = None) -> List[Tuple[np.ndarray, Optional[str]]]:
+        """`calculate_paths` under a search budget.
+
+        Each result is the path and the reason it is degraded ("expansions",
+        "time", "cancelled", or "error" when a WASM call failed), or
+        None for a complete search. A search that runs out of budget returns
+        its best partial route; pairs not yet started once the budget is
+        gone get a straight line.
+        """
+        results: List = [None] * len(pairs)
+        if self.graph is not None:
+            for i, (start, end) in enumerate(pairs):
+                reason = budget.check() if budget is not None else None
+                if reason is not None:
+                    results[i] = (self.calculate_path_python(start, end, steps=10), reason)
+                    continue
+                try:
+                    with stage_metrics.stage("engine_graph"):
+                        path = self.graph.route(start.lat, start.lng, end.lat, end.lng, budget=budget)
+                except SearchBudgetExceeded as e:
+                    results[i] = (e.points, e.reason)
+                    continue
+                if path is not None:
+                    results[i] = (path, None)
+        remaining = [i for i, result in enumerate(results) if result is None]
+        if not remaining:
+            return results
+
+        if not self.use_wasm:
+            with stage_metrics.stage("engine_python"):
+                paths = self.calculate_paths_python([pairs[i] for i in remaining])
+            for i, path in zip(remaining, paths):
+                results[i] = (path, None)
+            return results
+        for i in remaining:
+            start, end = pairs[i]
+            reason = budget.check() if budget is not None else None
+            if reason is not None:
+                results[i] = (self.calculate_path_python(start, end, steps=10), reason)
+                continue
+            try:
+                with stage_metrics.stage("engine_wasm"):
+                    results[i] = self.calculate_path_wasm(start, end, budget)
+            except Exception as e:
+                logger.error("WASM execution error: %s", e)
+                results[i] = (self.calculate_path_python(start, end, steps=10), "error")
+        return results
+
+    def matrix_mode(self, mode: str = "auto") -> str:
+        """Resolve "auto" the way routes pick an engine: graph, then the WASM grid, then straight lines"""
+        if mode == "auto":
+            if self.graph is not None:
+                return "graph"
+            return "grid" if self.use_wasm else "haversine"
+        if mode not in MATRIX_MODES:
+            raise ValueError(f"Unknown matrix mode: {mode}")
+        if mode == "graph" and self.graph is None:
+            raise ValueError("No road graph is loaded")
+        return mode
+
+    @staticmethod
+    def haversine_matrix(sources: np.ndarray, destinations: np.ndarray) -> np.ndarray:
+        return haversine_m(sources[:, None, 0], sources[:, None, 1],
+                           destinations[None, :, 0], destinations[None, :, 1])
+
+    @staticmethod
+    def grid_matrix(sources: np.ndarray, destinations: np.ndarray, resolution: float = 0.01) -> np.ndarray:
+        """Length of the grid A* path in lib.rs, which on its obstacle-free grid is the Manhattan distance.
+
+        Cells are truncated the same way lib.rs converts coordinates; east-west
+        steps are scaled by the cosine of the pair's mean latitude.
+        """
+        source_cells = np.trunc(sources / resolution)
+        destination_cells = np.trunc(destinations / resolution)
+        lat_steps = np.abs(source_cells[:, None, 0] - destination_cells[None, :, 0])
+        lng_steps = np.abs(source_cells[:, None, 1] - destination_cells[None, :, 1])
+        mean_lat = np.radians((sources[:, None, 0] + destinations[None, :, 0]) / 2)
+        step_m = EARTH_RADIUS_M * math.radians(resolution)
+        return (lat_steps + lng_steps * np.cos(mean_lat)) * step_m
+
+    def calculate_matrix(self, sources: np.ndarray, destinations: np.ndarray, mode: str = "auto",
+                         budget: Optional[SearchBudget] = None) -> Tuple[np.ndarray, str, Optional[str]]:
+        """Distance matrix in meters between (n, 2) and (m, 2) lat/lng arrays.
+
+        Returns the (n, m) matrix (NaN where there is no route), the mode
+        used, and why it is incomplete if the budget ran out. Only costs
+        are computed; no paths are built.
+        """
+        mode = self.matrix_mode(mode)
+        if mode == "haversine":
+            with stage_metrics.stage("matrix_haversine"):
+                return self.haversine_matrix(sources, destinations), mode, None
+        if mode == "grid":
+            with stage_metrics.stage("matrix_grid"):
+                return self.grid_matrix(sources, destinations, self.grid_resolution), mode, None
+        with stage_metrics.stage("matrix_graph"):
+            distances, reason = self.graph.matrix(sources, destinations, budget)
+        return distances, mode, reason
+
+    def calculate_isochrone(self, lat: float, lng: float, max_cost: float, mode: str = "auto",
+                            resolution: Optional[float] = None, budget: Optional[SearchBudget] = None
+                            ) -> Tuple[np.ndarray, np.ndarray, str, int, float, Optional[str]]:
+        """Cells reachable from one origin within `max_cost`, from a single bounded expansion.
+
+        Grid costs are steps on lib.rs's grid (always at the route grid
+        resolution); graph costs are meters, rasterized at `resolution`.
+        Returns (cells, costs, mode, expanded, reached cost, stop reason).
+        """
+        if mode == "auto":
+            mode = "graph" if self.graph is not None else "grid"
+        if mode not in ISOCHRONE_MODES:
+            raise ValueError(f"Unknown isochrone mode: {mode}")
+        if mode == "graph":
+            if self.graph is None:
+                raise ValueError("No road graph is loaded")
+            with stage_metrics.stage("isochrone_graph"):
+                cells, costs, expanded, reached_cost, reason = road_cells(
+                    self.graph, lat, lng, max_cost, resolution or self.grid_resolution, budget)
+            return cells, costs, mode, expanded, reached_cost, reason
+        origin = (int(lng / self.grid_resolution), int(lat / self.grid_resolution))
+        with stage_metrics.stage("isochrone_grid"):
+            cells, costs, reached_cost, reason = expand_grid(origin, int(max_cost), budget)
+        return cells, costs, mode, len(cells), reached_cost, reason
+
+    @staticmethod
+    def simplify_paths(paths: List[np.ndarray], tolerance_m: float) -> List[np.ndarray]:
+        """Douglas-Peucker level-of-detail variants, computed on a route worker like the paths themselves"""
+        with stage_metrics.stage("simplify"):
+            return [douglas_peucker(path, tolerance_m) for path in paths]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "using_wasm": self.use_wasm,
+            "road_graph": self.graph.stats() if self.graph is not None else None,
+            "wasm_pool": self.wasm.stats() if self.wasm else None,
+        }
@@ -0,0 +1,650 @@
+"""Road-network graph engine.
+
+The network is read from two CSV files, typically exported from OSM:
+
+- nodes: ``id,lat,lng``
+- edges: ``source,target`` with an optional third ``length_m`` column;
+  missing lengths are filled in with the great-circle distance
+
+and held as CSR arrays: ``offsets[u]:offsets[u + 1]`` indexes the
+``targets``/``weights`` of node ``u``. Parsing CSV is slow for millions of
+edges, so the arrays (and the spatial index) can be written to a cache
+directory of ``.npy`` files. Later loads memory-map them, which makes start-up
+close to instant and lets every worker process share one copy in the page
+cache.
+
+Query coordinates are snapped to the nearest node through a uniform grid
+index, then routed with A* under a haversine heuristic, or under the much
+tighter ALT landmark bound when landmark data has been precomputed into the
+cache directory (see app.services.landmarks).
+"""
+import heapq
+import json
+import logging
+import math
+import os
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.services.landmarks import Landmarks, reverse_csr
+from app.services.search_budget import SearchBudget, SearchBudgetExceeded
+from app.utils.geo import EARTH_RADIUS_M
+
+logger = logging.getLogger(__name__)
+
+_METERS_PER_DEGREE = EARTH_RADIUS_M * math.pi / 180
+_CACHE_FORMAT = 1
+_ARRAYS = ("node_ids", "lat", "lng", "offsets", "targets", "weights",
+           "cell_keys", "cell_starts", "cell_nodes")
+# Shaves float32 rounding off the heuristic so it never overestimates an edge length
+_HEURISTIC_SCALE = 1 - 1e-6
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in meters; works on scalars and NumPy arrays (degrees)"""
+    lat1, lng1, lat2, lng2 = (np.radians(v) for v in (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """Uniform lat/lng grid over the nodes for nearest-node lookups.
+
+    Node indices are sorted by cell; `cell_keys` holds each occupied cell
+    once and `cell_starts` where its nodes begin in `cell_nodes`.
+    """
+
+    # Enough columns for every longitude cell at any resolution down to 1e-6 degrees
+    _COLUMNS = 1 << 30
+
+    def __init__(self, lat: np.ndarray, lng: np.ndarray, cell_degrees: float,
+                 cell_keys: np.ndarray, cell_starts: np.ndarray, cell_nodes: np.ndarray):
+        self.lat = lat
+        self.lng = lng
+        self.cell_degrees = cell_degrees
+        self.cell_keys = cell_keys
+        self.cell_starts = cell_starts
+        self.cell_nodes = cell_nodes
+
+    @classmethod
+    def key(cls, row, col):
+        return row * cls._COLUMNS + col
+
+    @classmethod
+    def build(cls, lat: np.ndarray, lng: np.ndarray, cell_degrees: float) -> "GridIndex":
+        rows = np.floor(lat / cell_degrees).astype(np.int64)
+        cols = np.floor(lng / cell_degrees).astype(np.int64)
+        keys = cls.key(rows, cols)
+        order = np.argsort(keys, kind="stable")
+        cell_keys, starts = np.unique(keys[order], return_index=True)
+        cell_starts = np.append(starts, len(keys)).astype(np.int64)
+        return cls(lat, lng, cell_degrees, cell_keys, cell_starts, order.astype(np.int32))
+
+    def _row_nodes(self, row: int, first_col: int, last_col: int) -> np.ndarray:
+        # Keys of one row are contiguous, so a column span is a single slice
+        lo = int(np.searchsorted(self.cell_keys, self.key(row, first_col)))
+        hi = int(np.searchsorted(self.cell_keys, self.key(row, last_col), side="right"))
+        return self.cell_nodes[self.cell_starts[lo]:self.cell_starts[hi]]
+
+    def nearest(self, lat: float, lng: float, max_distance_m: float) -> Optional[Tuple[int, float]]:
+        """Closest node within `max_distance_m`, searched ring by ring outward.
+
+        Rings are as many meters wide on each axis, so they span more
+        columns than rows away from the equator, up to every column near
+        the poles.
+        """
+        row = math.floor(lat / self.cell_degrees)
+        col = math.floor(lng / self.cell_degrees)
+        first_col = math.floor(-180 / self.cell_degrees)
+        last_col = math.floor(180 / self.cell_degrees)
+        # Meters per cell along each axis; longitude cells narrow toward the poles, so take
+        # the narrowest one within reach
+        lat_step = self.cell_degrees * _METERS_PER_DEGREE
+        reach = max_distance_m / _METERS_PER_DEGREE + self.cell_degrees
+        lng_step = lat_step * math.cos(math.radians(min(90.0, abs(lat) + reach)))
+        max_rows = int(max_distance_m / lat_step) + 1
+        # Capped at the full longitude range, which every column ring reaches past there
+        max_cols = last_col - first_col
+        if lng_step * max_cols > max_distance_m:
+            max_cols = int(max_distance_m / lng_step) + 1
+
+        best_node, best_distance = None, math.inf
+        rows, cols = -1, -1
+        while True:
+            rows_done = rows >= max_rows
+            cols_done = cols >= max_cols
+            if rows_done and cols_done:
+                break
+            # Nothing outside the rows (columns) searched so far is closer than that many rows (columns)
+            if best_node is not None and min(math.inf if rows_done else rows * lat_step,
+                                             math.inf if cols_done else cols * lng_step) > best_distance:
+                break
+            previous_rows, previous_cols = rows, cols
+            rows = rows if rows_done else rows + 1
+            if not cols_done:
+                cols = max_cols if lng_step * max_cols <= rows * lat_step else \
+                    max(cols + 1, math.ceil(rows * lat_step / lng_step))
+            lo, hi = max(col - cols, first_col), min(col + cols, last_col)
+            candidates = []
+            for r in range(row - rows, row + rows + 1):
+                if abs(r - row) > previous_rows:
+                    candidates.append(self._row_nodes(r, lo, hi))
+                else:
+                    # Rows already searched only gain the columns on either side
+                    if lo < col - previous_cols:
+                        candidates.append(self._row_nodes(r, lo, col - previous_cols - 1))
+                    if hi > col + previous_cols:
+                        candidates.append(self._row_nodes(r, col + previous_cols + 1, hi))
+            candidates = [nodes for nodes in candidates if len(nodes)]
+            if not candidates:
+                continue
+            nodes = np.concatenate(candidates)
+            distances = haversine_m(lat, lng, self.lat[nodes], self.lng[nodes])
+            i = int(np.argmin(distances))
+            if distances[i] < best_distance:
+                best_node, best_distance = int(nodes[i]), float(distances[i])
+        if best_node is None or best_distance > max_distance_m:
+            return None
+        return best_node, best_distance
+
+
+class RoadGraph:
+    """CSR road network with snapping and A* search.
+
+    `search` picks the A* heuristic: "astar" (haversine), "alt" (landmarks,
+    which must be loaded) or "auto" (landmarks whenever they are available).
+    """
+
+    def __init__(self, node_ids: np.ndarray, lat: np.ndarray, lng: np.ndarray,
+                 offsets: np.ndarray, targets: np.ndarray, weights: np.ndarray,
+                 index: GridIndex, snap_max_distance_m: float = 5000.0,
+                 symmetric: bool = False, search: str = "auto"):
+        if search not in ("auto", "astar", "alt"):
+            raise ValueError(f"Unknown graph search mode: {search}")
+        self.node_ids = node_ids
+        self.lat = lat
+        self.lng = lng
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.index = index
+        self.snap_max_distance_m = snap_max_distance_m
+        # Every edge has a reverse twin of equal length
+        self.symmetric = symmetric
+        self.search = search
+        self.landmarks: Optional[Landmarks] = None
+        self.source: Optional[Dict[str, Any]] = None
+        self._lat_rad = np.radians(lat)
+        self._lng_rad = np.radians(lng)
+        self._cos_lat = np.cos(self._lat_rad)
+        self._reverse: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self.load_seconds = 0.0
+        self.loaded_from = "memory"
+        self.queries = 0
+        self.failed_queries = 0
+        self.budget_exceeded = 0
+        self.expanded_nodes = 0
+        self.snap_seconds = 0.0
+        self.search_seconds = 0.0
+        self.max_query_seconds = 0.0
+
+    @property
+    def node_count(self) -> int:
+        return len(self.lat)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    @property
+    def search_mode(self) -> str:
+        """Heuristic in use once "auto" is resolved"""
+        if self.search == "auto":
+            return "alt" if self.landmarks is not None else "astar"
+        return self.search
+
+    def signature(self) -> Dict[str, Any]:
+        """Identifies this network so precomputed data is never applied to another one"""
+        return {"nodes": self.node_count, "edges": self.edge_count, "source": self.source}
+
+    # Loading
+
+    @classmethod
+    def from_arrays(cls, node_ids: np.ndarray, lat: np.ndarray, lng: np.ndarray,
+                    sources: np.ndarray, targets: np.ndarray, lengths: Optional[np.ndarray] = None,
+                    bidirectional: bool = True, cell_degrees: float = 0.01,
+                    snap_max_distance_m: float = 5000.0, search: str = "auto") -> "RoadGraph":
+        """Build CSR arrays from node and edge columns keyed by node id"""
+        order = np.argsort(node_ids, kind="stable")
+        node_ids = np.asarray(node_ids, dtype=np.int64)[order]
+        lat = np.asarray(lat, dtype=np.float64)[order]
+        lng = np.asarray(lng, dtype=np.float64)[order]
+
+        src = np.searchsorted(node_ids, sources)
+        dst = np.searchsorted(node_ids, targets)
+        known = ((src < len(node_ids)) & (dst < len(node_ids)))
+        known[known] &= (node_ids[src[known]] == sources[known]) & (node_ids[dst[known]] == targets[known])
+        if not known.all():
+            logger.warning(f"Dropping {int((~known).sum())} edges that reference unknown nodes")
+        src, dst = src[known], dst[known]
+        if lengths is None:
+            lengths = haversine_m(lat[src], lng[src], lat[dst], lng[dst])
+        else:
+            lengths = np.asarray(lengths, dtype=np.float64)[known]
+        if bidirectional:
+            src, dst = np.concatenate([src, dst]), np.concatenate([dst, src])
+            lengths = np.concatenate([lengths, lengths])
+
+        by_source = np.argsort(src, kind="stable")
+        offsets = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(node_ids)), out=offsets[1:])
+        return cls(
+            node_ids, lat, lng, offsets,
+            dst[by_source].astype(np.int32), lengths[by_source].astype(np.float32),
+            GridIndex.build(lat, lng, cell_degrees),
+            snap_max_distance_m=snap_max_distance_m,
+            symmetric=bidirectional,
+            search=search,
+        )
+
+    @classmethod
+    def from_csv(cls, nodes_path: str, edges_path: str, bidirectional: bool = True,
+                 cell_degrees: float = 0.01, snap_max_distance_m: float = 5000.0,
+                 search: str = "auto") -> "RoadGraph":
+        nodes = np.loadtxt(nodes_path, delimiter=",", skiprows=1, usecols=(1, 2), ndmin=2)
+        node_ids = np.loadtxt(nodes_path, delimiter=",", skiprows=1, usecols=0, dtype=np.int64, ndmin=1)
+        with open(edges_path) as f:
+            has_lengths = len(f.readline().split(",")) >= 3
+        edges = np.loadtxt(edges_path, delimiter=",", skiprows=1, usecols=(0, 1), dtype=np.int64, ndmin=2)
+        lengths = (np.loadtxt(edges_path, delimiter=",", skiprows=1, usecols=2, ndmin=1)
+                   if has_lengths else None)
+        return cls.from_arrays(node_ids, nodes[:, 0], nodes[:, 1], edges[:, 0], edges[:, 1], lengths,
+                               bidirectional=bidirectional, cell_degrees=cell_degrees,
+                               snap_max_distance_m=snap_max_distance_m, search=search)
+
+    def save(self, cache_dir: str, source: Dict[str, Any]) -> None:
+        """Write the arrays as .npy files so later loads can memory-map them"""
+        os.makedirs(cache_dir, exist_ok=True)
+        meta_path = os.path.join(cache_dir, "meta.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        arrays = {
+            "node_ids": self.node_ids, "lat": self.lat, "lng": self.lng,
+            "offsets": self.offsets, "targets": self.targets, "weights": self.weights,
+            "cell_keys": self.index.cell_keys, "cell_starts": self.index.cell_starts,
+            "cell_nodes": self.index.cell_nodes,
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(cache_dir, f"{name}.npy"), np.ascontiguousarray(array))
+        # meta.json goes last: its presence marks the cache as complete
+        with open(meta_path, "w") as f:
+            json.dump({"format": _CACHE_FORMAT, "cell_degrees": self.index.cell_degrees,
+                       "source": source}, f)
+
+    @classmethod
+    def load_cached(cls, cache_dir: str, source: Dict[str, Any],
+                    snap_max_distance_m: float = 5000.0, search: str = "auto") -> Optional["RoadGraph"]:
+        try:
+            with open(os.path.join(cache_dir, "meta.json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("format") != _CACHE_FORMAT or meta.get("source") != source:
+            return None
+        # Plain ndarray views of the maps: same shared pages, without np.memmap's per-index overhead
+        arrays = {name: np.asarray(np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode="r"))
+                  for name in _ARRAYS}
+        index = GridIndex(arrays["lat"], arrays["lng"], meta["cell_degrees"],
+                          arrays["cell_keys"], arrays["cell_starts"], arrays["cell_nodes"])
+        return cls(arrays["node_ids"], arrays["lat"], arrays["lng"], arrays["offsets"],
+                   arrays["targets"], arrays["weights"], index,
+                   snap_max_distance_m=snap_max_distance_m,
+                   symmetric=source["bidirectional"], search=search)
+
+    @classmethod
+    def load(cls, nodes_path: str, edges_path: str, cache_dir: Optional[str] = None,
+             bidirectional: bool = True, cell_degrees: float = 0.01,
+             snap_max_distance_m: float = 5000.0, search: str = "auto") -> "RoadGraph":
+        """Load from the array cache when it matches the CSV files, else parse and refresh it.
+
+        Landmark data in the cache directory is memory-mapped as well, if it
+        was built for this network.
+        """
+        started = time.perf_counter()
+        source = {
+            "nodes": _file_signature(nodes_path),
+            "edges": _file_signature(edges_path),
+            "bidirectional": bidirectional,
+            "cell_degrees": cell_degrees,
+        }
+        graph = cls.load_cached(cache_dir, source, snap_max_distance_m, search) if cache_dir else None
+        if graph is not None:
+            graph.loaded_from = "cache"
+        else:
+            graph = cls.from_csv(nodes_path, edges_path, bidirectional=bidirectional,
+                                 cell_degrees=cell_degrees, snap_max_distance_m=snap_max_distance_m,
+                                 search=search)
+            graph.loaded_from = "csv"
+            if cache_dir:
+                graph.save(cache_dir, source)
+        graph.source = source
+        if cache_dir:
+            graph.landmarks = Landmarks.load(cache_dir, graph.signature())
+        if search == "alt" and graph.landmarks is None:
+            raise ValueError("ALT search requires landmark data; build it with app.services.landmarks")
+        graph.load_seconds = time.perf_counter() - started
+        logger.info(f"Road graph loaded from {graph.loaded_from}: {graph.node_count} nodes, "
+                    f"{graph.edge_count} edges in {graph.load_seconds * 1000:.0f} ms")
+        return graph
+
+    # Queries
+
+    def snap(self, lat: float, lng: float) -> Optional[Tuple[int, float]]:
+        """Nearest node index and its distance in meters, or None if out of coverage"""
+        return self.index.nearest(lat, lng, self.snap_max_distance_m)
+
+    def _haversine_heuristic(self, target: int) -> Callable[[int], float]:
+        goal_lat = float(self._lat_rad[target])
+        goal_lng = float(self._lng_rad[target])
+        cos_goal = math.cos(goal_lat)
+        lat_rad, lng_rad, cos_lat = self._lat_rad, self._lng_rad, self._cos_lat
+
+        def distance(node: int) -> float:
+            a = (math.sin((goal_lat - lat_rad[node]) / 2) ** 2
+                 + cos_lat[node] * cos_goal * math.sin((goal_lng - lng_rad[node]) / 2) ** 2)
+            return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0))) * _HEURISTIC_SCALE
+        return distance
+
+    def lower_bound(self, a: int, b: int) -> float:
+        """Lower bound on the network distance between two nodes, for searches with a moving source"""
+        lat_a, lat_b = float(self._lat_rad[a]), float(self._lat_rad[b])
+        h = (math.sin((lat_b - lat_a) / 2) ** 2
+             + float(self._cos_lat[a]) * float(self._cos_lat[b])
+             * math.sin((float(self._lng_rad[b]) - float(self._lng_rad[a])) / 2) ** 2)
+        return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(h, 1.0))) * _HEURISTIC_SCALE
+
+    def reverse_csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(offsets, sources, weights) of the transposed graph, built on first use"""
+        if self._reverse is None:
+            self._reverse = reverse_csr(self.offsets, self.targets, self.weights)
+        return self._reverse
+
+    def heuristic(self, target: int, mode: Optional[str] = None) -> Callable[[int], float]:
+        """Lower bound on the remaining distance to `target`, as a function of node"""
+        if (mode or self.search_mode) == "alt":
+            if self.landmarks is None:
+                raise ValueError("ALT search requires landmark data; build it with app.services.landmarks")
+            return self.landmarks.heuristic(target)
+        return self._haversine_heuristic(target)
+
+    def shortest_path(self, source: int, target: int, mode: Optional[str] = None,
+                      budget: Optional[SearchBudget] = None) -> Optional[Tuple[List[int], float, int]]:
+        """A* from node `source` to node `target`.
+
+        Returns the node sequence, its length in meters and the number of
+        expanded nodes, or None if `target` is unreachable. `mode` overrides
+        the graph's search mode ("astar" or "alt") for this query.
+
+        When `budget` runs out the search raises SearchBudgetExceeded
+        carrying the path to the expanded node closest to the target.
+        """
+        estimate = self.heuristic(target, mode)
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        max_expansions = budget.max_expansions if budget is not None and budget.max_expansions else math.inf
+
+        g = {source: 0.0}
+        parent = {source: -1}
+        closed = set()
+        bounds = {source: estimate(source)}
+        heap = [(bounds[source], source)]
+        expanded = 0
+        closest, closest_bound = source, bounds[source]
+        while heap:
+            _, node = heapq.heappop(heap)
+            if node == target:
+                return self._unwind(parent, node), g[target], expanded
+            if node in closed:
+                continue
+            closed.add(node)
+            expanded += 1
+            if bounds[node] < closest_bound:
+                closest, closest_bound = node, bounds[node]
+            # Time and cancellation are polled every 256 expansions to keep the loop cheap
+            if budget is not None and (expanded > max_expansions or not expanded & 0xFF):
+                reason = budget.check(expanded)
+                if reason is not None:
+                    raise SearchBudgetExceeded(reason, expanded, nodes=self._unwind(parent, closest))
+            g_node = g[node]
+            start, end = int(offsets[node]), int(offsets[node + 1])
+            for neighbor, weight in zip(targets[start:end].tolist(), weights[start:end].tolist()):
+                candidate = g_node + weight
+                if candidate < g.get(neighbor, math.inf):
+                    g[neighbor] = candidate
+                    parent[neighbor] = node
+                    # A node is often relaxed several times; its bound never changes
+                    bound = bounds.get(neighbor)
+                    if bound is None:
+                        bound = bounds[neighbor] = estimate(neighbor)
+                    heapq.heappush(heap, (candidate + bound, neighbor))
+        return None
+
+    @staticmethod
+    def _unwind(parent: Dict[int, int], node: int) -> List[int]:
+        path = [node]
+        while parent[path[-1]] != -1:
+            path.append(parent[path[-1]])
+        path.reverse()
+        return path
+
+    def route(self, start_lat: float, start_lng: float, end_lat: float, end_lng: float,
+              budget: Optional[SearchBudget] = None) -> Optional[np.ndarray]:
+        """(n, 2) lat/lng path along the network, from the exact start to the exact end.
+
+        Returns None when either endpoint is too far from the network or no
+        connection exists, so callers can fall back to another engine. If the
+        budget runs out, SearchBudgetExceeded carries an anytime path: the
+        partial route toward the end, then a straight segment to it.
+        """
+        started = time.perf_counter()
+        self.queries += 1
+        source = self.snap(start_lat, start_lng)
+        target = self.snap(end_lat, end_lng)
+        snapped = time.perf_counter()
+        self.snap_seconds += snapped - started
+        result = None
+        try:
+            if source is not None and target is not None:
+                result = self.shortest_path(source[0], target[0], budget=budget)
+        except SearchBudgetExceeded as e:
+            self.budget_exceeded += 1
+            self.expanded_nodes += e.expanded
+            e.points = self._points(e.nodes, start_lat, start_lng, end_lat, end_lng)
+            raise
+        finally:
+            finished = time.perf_counter()
+            self.search_seconds += finished - snapped
+            self.max_query_seconds = max(self.max_query_seconds, finished - started)
+        if result is None:
+            self.failed_queries += 1
+            return None
+
+        nodes, _, expanded = result
+        self.expanded_nodes += expanded
+        return self._points(nodes, start_lat, start_lng, end_lat, end_lng)
+
+    def distances_from(self, source: int, targets: Sequence[int],
+                       budget: Optional[SearchBudget] = None) -> np.ndarray:
+        """Network distance in meters from `source` to each of `targets` (inf if unreachable).
+
+        One Dijkstra search serves every target; it stops as soon as the
+        last of them is settled.
+        """
+        offsets, graph_targets, weights = self.offsets, self.targets, self.weights
+        max_expansions = budget.max_expansions if budget is not None and budget.max_expansions else math.inf
+        wanted = set(int(t) for t in targets)
+        settled: Dict[int, float] = {}
+        best = {source: 0.0}
+        heap = [(0.0, source)]
+        while heap and wanted:
+            distance, node = heapq.heappop(heap)
+            if node in settled:
+                continue
+            settled[node] = distance
+            wanted.discard(node)
+            if budget is not None and (len(settled) > max_expansions or not len(settled) & 0xFF):
+                reason = budget.check(len(settled))
+                if reason is not None:
+                    raise SearchBudgetExceeded(reason, len(settled))
+            start, end = int(offsets[node]), int(offsets[node + 1])
+            for neighbor, weight in zip(graph_targets[start:end].tolist(), weights[start:end].tolist()):
+                candidate = distance + weight
+                if candidate < best.get(neighbor, math.inf):
+                    best[neighbor] = candidate
+                    heapq.heappush(heap, (candidate, neighbor))
+        return np.array([settled.get(int(t), math.inf) for t in targets], dtype=np.float64)
+
+    def reachable(self, source: int, max_distance: float,
+                  budget: Optional[SearchBudget] = None) -> Tuple[np.ndarray, np.ndarray, Optional[str]]:
+        """Every node within `max_distance` meters of `source` and its distance, nearest first.
+
+        One Dijkstra search bounded by the distance instead of a target. If
+        the budget runs out the nodes settled so far are returned with the
+        reason; they are still exact, just for a smaller distance.
+        """
+        offsets, graph_targets, weights = self.offsets, self.targets, self.weights
+        max_expansions = budget.max_expansions if budget is not None and budget.max_expansions else math.inf
+        settled: Dict[int, float] = {}
+        best = {source: 0.0}
+        heap = [(0.0, source)]
+        reason = None
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if node in settled:
+                continue
+            if budget is not None and (len(settled) >= max_expansions or not len(settled) & 0xFF):
+                reason = budget.check(len(settled) + 1)
+                if reason is not None:
+                    break
+            settled[node] = distance
+            start, end = int(offsets[node]), int(offsets[node + 1])
+            for neighbor, weight in zip(graph_targets[start:end].tolist(), weights[start:end].tolist()):
+                candidate = distance + weight
+                if candidate <= max_distance and candidate < best.get(neighbor, math.inf):
+                    best[neighbor] = candidate
+                    heapq.heappush(heap, (candidate, neighbor))
+        nodes = np.fromiter(settled.keys(), dtype=np.int64, count=len(settled))
+        return nodes, np.fromiter(settled.values(), dtype=np.float64, count=len(settled)), reason
+
+    def matrix(self, sources: np.ndarray, destinations: np.ndarray,
+               budget: Optional[SearchBudget] = None) -> Tuple[np.ndarray, Optional[str]]:
+        """(len(sources), len(destinations)) network distances in meters between lat/lng points.
+
+        Distances include the straight legs from each point to its snapped
+        node, matching `route`. Points off the network and unreachable
+        pairs are NaN. One search runs per distinct snapped node on the
+        smaller side (searching from the destinations on symmetric
+        networks). If the budget runs out, the rows or columns not yet
+        searched stay NaN and the reason is returned alongside.
+        """
+        def snap_all(points):
+            nodes = np.full(len(points), -1, dtype=np.int64)
+            legs = np.full(len(points), np.nan)
+            for i, (lat, lng) in enumerate(points.tolist()):
+                snapped = self.snap(lat, lng)
+                if snapped is not None:
+                    nodes[i], legs[i] = snapped
+            return nodes, legs
+
+        source_nodes, source_legs = snap_all(sources)
+        destination_nodes, destination_legs = snap_all(destinations)
+        unique_sources = np.unique(source_nodes[source_nodes >= 0])
+        unique_destinations = np.unique(destination_nodes[destination_nodes >= 0])
+        reverse = self.symmetric and len(unique_destinations) < len(unique_sources)
+        origins, others = (unique_destinations, unique_sources) if reverse else (unique_sources, unique_destinations)
+
+        # node-to-node distances, one row per searched origin
+        network = np.full((len(origins), len(others)), np.nan)
+        reason = None
+        for row, origin in enumerate(origins.tolist()):
+            try:
+                network[row] = self.distances_from(origin, others, budget)
+            except SearchBudgetExceeded as e:
+                self.budget_exceeded += 1
+                reason = e.reason
+                break
+        network[np.isinf(network)] = np.nan
+        if reverse:
+            network = network.T
+            origins, others = others, origins
+
+        result = np.full((len(sources), len(destinations)), np.nan)
+        valid_sources, valid_destinations = source_nodes >= 0, destination_nodes >= 0
+        rows = np.searchsorted(origins, source_nodes[valid_sources])
+        cols = np.searchsorted(others, destination_nodes[valid_destinations])
+        result[np.ix_(valid_sources, valid_destinations)] = (
+            network[np.ix_(rows, cols)]
+            + source_legs[valid_sources][:, None] + destination_legs[valid_destinations][None, :])
+        return result, reason
+
+    def _points(self, nodes: List[int], start_lat: float, start_lng: float,
+                end_lat: float, end_lng: float) -> np.ndarray:
+        points = np.empty((len(nodes) + 2, 2), dtype=np.float64)
+        points[0] = (start_lat, start_lng)
+        points[1:-1, 0] = self.lat[nodes]
+        points[1:-1, 1] = self.lng[nodes]
+        points[-1] = (end_lat, end_lng)
+        return points
+
+    def memory_bytes(self) -> int:
+        arrays = (self.node_ids, self.lat, self.lng, self.offsets, self.targets, self.weights,
+                  self.index.cell_keys, self.index.cell_starts, self.index.cell_nodes)
+        if self._reverse is not None:
+            arrays += self._reverse
+        landmark_bytes = self.landmarks.memory_bytes() if self.landmarks is not None else 0
+        return int(sum(array.nbytes for array in arrays)) + landmark_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        queries = self.queries
+        return {
+            "nodes": self.node_count,
+            "edges": self.edge_count,
+            "loaded_from": self.loaded_from,
+            "search": self.search_mode,
+            "landmarks": self.landmarks.count if self.landmarks is not None else 0,
+            "load_ms": self.load_seconds * 1000,
+            "memory_bytes": self.memory_bytes(),
+            "queries": queries,
+            "failed_queries": self.failed_queries,
+            "budget_exceeded": self.budget_exceeded,
+            "avg_snap_ms": (self.snap_seconds / queries * 1000) if queries else 0.0,
+            "avg_search_ms": (self.search_seconds / queries * 1000) if queries else 0.0,
+            "max_query_ms": self.max_query_seconds * 1000,
+            "avg_expanded_nodes": (self.expanded_nodes / queries) if queries else 0.0,
+        }
+
+
+def _file_signature(path: str) -> List[float]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime]
+
+
+@lru_cache
+def get_road_graph() -> Optional[RoadGraph]:
+    """Per-process road graph, or None when no network is configured"""
+    settings = get_settings()
+    if not settings.GRAPH_NODES_PATH or not settings.GRAPH_EDGES_PATH:
+        return None
+    return RoadGraph.load(
+        settings.GRAPH_NODES_PATH,
+        settings.GRAPH_EDGES_PATH,
+        cache_dir=settings.GRAPH_CACHE_DIR or None,
+        bidirectional=settings.GRAPH_BIDIRECTIONAL,
+        cell_degrees=settings.GRAPH_INDEX_CELL_DEGREES,
+        snap_max_distance_m=settings.GRAPH_SNAP_MAX_DISTANCE_M,
+        search=settings.GRAPH_SEARCH,
+    )
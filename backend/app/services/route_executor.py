@@ -0,0 +1,174 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from app.core.errors import ServiceOverloadedError
+from app.core.startup import startup_timer
+
+# Engine used by process-pool workers; each worker process builds its own
+_worker_engine = None
+
+def _init_worker(engine_factory: Callable[[], Any]) -> None:
+    global _worker_engine
+    _worker_engine = engine_factory()
+
+def _ping() -> int:
+    # Submitting one per worker forces the pool to spawn and initialize its processes
+    return os.getpid()
+
+def _call_in_worker(method: str, args: tuple, submitted_at: float):
+    started_at = time.monotonic()
+    return getattr(_worker_engine, method)(*args), started_at - submitted_at
+
+def _call_on_engine(executor: "RouteExecutor", method: str, args: tuple, submitted_at: float):
+    started_at = time.monotonic()
+    # Resolved here, on the worker: building the engine, or waiting for warm-up to, must not block the loop
+    return getattr(executor.engine, method)(*args), started_at - submitted_at
+
+
+class RouteExecutor:
+    """Runs path engine calls off the event loop.
+
+    `mode` selects a thread pool, a process pool (one engine per process) or
+    "inline" execution on the caller. At most `workers + max_queue` calls are
+    admitted at once; anything beyond that is rejected with
+    ServiceOverloadedError so the API can answer 503 instead of queueing
+    without bound.
+    """
+
+    def __init__(self, engine_factory: Callable[[], Any], mode: str = "thread",
+                 workers: int = 0, max_queue: int = 256):
+        if mode not in ("thread", "process", "inline"):
+            raise ValueError(f"Unknown route executor mode: {mode}")
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._engine_factory = engine_factory
+        self._engine = None
+        self._engine_lock = threading.Lock()
+        self._pool: Optional[Executor] = None
+        self._pool_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._warm_up_started = False
+        self.warm_up_error: Optional[str] = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def engine(self) -> Any:
+        """Engine shared by inline and thread-pool calls, built on first use"""
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    self._engine = self._engine_factory()
+                    if self.mode != "process":
+                        self._ready.set()
+        return self._engine
+
+    @property
+    def ready(self) -> bool:
+        """Whether the engine(s) that serve requests have been built"""
+        return self._ready.is_set()
+
+    def warm_up(self, background: bool = True) -> None:
+        """Build the engine ahead of the first request.
+
+        In process mode this spawns every worker so each one initializes its
+        own engine; otherwise the shared engine is built. Runs at most once.
+        """
+        if self._warm_up_started:
+            return
+        self._warm_up_started = True
+        if background:
+            threading.Thread(target=self._run_warm_up, name="engine-warm-up", daemon=True).start()
+        else:
+            self._run_warm_up()
+
+    def _run_warm_up(self) -> None:
+        try:
+            with startup_timer.phase("engine_warm_up"):
+                if self.mode == "process":
+                    pool = self._get_pool()
+                    for future in [pool.submit(_ping) for _ in range(self.workers)]:
+                        future.result()
+                    self._ready.set()
+                else:
+                    self.engine
+        except Exception as e:
+            self.warm_up_error = str(e)
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.pending - self.workers)
+
+    def _get_pool(self) -> Executor:
+        # The warm-up thread and the event loop may both get here first
+        with self._pool_lock:
+            if self._pool is None:
+                if self.mode == "process":
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        initializer=_init_worker,
+                        initargs=(self._engine_factory,),
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix="route-worker",
+                    )
+            return self._pool
+
+    async def run(self, method: str, *args) -> Any:
+        """Call `engine.<method>(*args)` on a worker and await the result"""
+        if self.mode == "inline":
+            return getattr(self.engine, method)(*args)
+
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise ServiceOverloadedError("Route workers are saturated. Try again later.")
+
+        if self.mode == "process":
+            call = partial(_call_in_worker, method, args, time.monotonic())
+        else:
+            call = partial(_call_on_engine, self, method, args, time.monotonic())
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, waited = await loop.run_in_executor(self._get_pool(), call)
+        finally:
+            self.pending -= 1
+
+        self.completed += 1
+        if self.mode == "process":
+            self._ready.set()
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return result
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "ready": self.ready,
+            "warm_up_error": self.warm_up_error,
+            "workers": self.workers,
+            "pending": self.pending,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": (self.total_wait_seconds / self.completed * 1000) if self.completed else 0.0,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+        }
@@ -0,0 +1,254 @@
+import hashlib
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Set
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS routes (
+    key TEXT PRIMARY KEY,
+    points BLOB NOT NULL,
+    nbytes INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS routes_last_access ON routes (last_access);
+"""
+
+_STOP = object()
+
+
+def binary_version(path: str) -> str:
+    """Content hash of a build artifact, or "none" when it does not exist"""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+    except OSError:
+        return "none"
+
+
+def route_cache_version(settings) -> str:
+    """What cached routes depend on: the path engine, the road network and the key mapping.
+
+    Persistent caches are stamped with it and discarded when it changes.
+    """
+    if settings.USE_WASM:
+        from app.services.wasm_service import DEFAULT_WASM_PATH
+        engine = "wasm-" + binary_version(settings.WASM_PATH or DEFAULT_WASM_PATH)
+    else:
+        engine = "python"
+    if settings.GRAPH_NODES_PATH and settings.GRAPH_EDGES_PATH:
+        # Size and mtime are enough to notice a re-exported network without hashing it
+        for path in (settings.GRAPH_NODES_PATH, settings.GRAPH_EDGES_PATH):
+            stat = os.stat(path) if os.path.exists(path) else None
+            engine += f"+graph-{stat.st_size}-{int(stat.st_mtime)}" if stat else "+graph-none"
+    # Keys and cached paths also depend on how requests are mapped onto the grid
+    return f"{engine}:{settings.ROUTE_CACHE_KEY_MODE}:{settings.ROUTE_GRID_RESOLUTION}"
+
+
+class PersistentRouteStore:
+    """Disk tier behind the in-memory route cache, backed by SQLite.
+
+    Paths are stored as packed little-endian f64 blobs and read lazily, one
+    key at a time, on an in-memory miss. Writes and access-time updates are
+    queued to a background thread, which also trims the store back under
+    `max_bytes` (least recently used first). `get` blocks on SQLite, so
+    async callers run it off the event loop. The store is stamped with
+    `version`, normally a hash of the WASM binary, and wiped when it changes
+    so a new pathfinding build never serves stale routes.
+    """
+
+    def __init__(self, path: str, version: str, max_bytes: int = 1024 * 1024 * 1024,
+                 compact_interval_seconds: float = 300.0):
+        self.path = path
+        self.version = version
+        self.max_bytes = max_bytes
+        self.compact_interval_seconds = compact_interval_seconds
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.dropped_writes = 0
+        self.evictions = 0
+        self.compactions = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._check_version()
+
+        self._accessed: Set[str] = set()
+        self._writes: "queue.Queue" = queue.Queue(maxsize=10000)
+        # Writes queued or taken off the queue but not yet committed; flush() waits for zero
+        self._unwritten = 0
+        self._written = threading.Condition()
+        self._writer = threading.Thread(target=self._run_writer, name="route-store-writer", daemon=True)
+        self._writer.start()
+
+    def _check_version(self) -> None:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+            if row is None or row[0] != self.version:
+                if row is not None:
+                    logger.info(f"Route store version changed ({row[0]} -> {self.version}), clearing")
+                self._conn.execute("DELETE FROM routes")
+                self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)",
+                                   (self.version,))
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return repr(key)
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        db_key = self._key(key)
+        with self._lock:
+            row = self._conn.execute("SELECT points FROM routes WHERE key = ?", (db_key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._accessed.add(db_key)
+        return np.frombuffer(row[0], dtype="<f8").reshape(-1, 2)
+
+    def put(self, key: Hashable, points: np.ndarray) -> None:
+        """Queue a path for writing; drops it if the writer has fallen behind"""
+        blob = np.ascontiguousarray(points, dtype="<f8").tobytes()
+        with self._written:
+            self._unwritten += 1
+        try:
+            self._writes.put_nowait((self._key(key), blob))
+        except queue.Full:
+            self.dropped_writes += 1
+            self._done(1)
+
+    def _done(self, count: int) -> None:
+        with self._written:
+            self._unwritten -= count
+            self._written.notify_all()
+
+    def _run_writer(self) -> None:
+        next_compaction = time.monotonic() + self.compact_interval_seconds
+        while True:
+            timeout = max(0.0, next_compaction - time.monotonic())
+            try:
+                item = self._writes.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            stop = item is _STOP
+            batch = [item] if item is not None and not stop else []
+            # Drain whatever else is waiting so inserts share one transaction
+            while not stop and len(batch) < 500:
+                try:
+                    queued = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if queued is _STOP:
+                    stop = True
+                else:
+                    batch.append(queued)
+            try:
+                self._flush(batch)
+                if not stop and time.monotonic() >= next_compaction:
+                    self.compact()
+                    next_compaction = time.monotonic() + self.compact_interval_seconds
+            except sqlite3.Error as e:
+                logger.error("Route store write failed: %s", e)
+            finally:
+                self._done(len(batch))
+            if stop:
+                return
+
+    def _flush(self, batch) -> None:
+        now = time.time()
+        accessed, self._accessed = self._accessed, set()
+        if not batch and not accessed:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO routes (key, points, nbytes, last_access) VALUES (?, ?, ?, ?)",
+                    [(db_key, blob, len(blob), now) for db_key, blob in batch])
+                self._conn.executemany("UPDATE routes SET last_access = ? WHERE key = ?",
+                                       [(now, db_key) for db_key in accessed])
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.writes += len(batch)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM routes").fetchone()[0]
+
+    def compact(self, batch_size: int = 1000) -> int:
+        """Evict least recently used routes until the store is under its size limit.
+
+        Routes are deleted `batch_size` at a time, oldest first, and the lock
+        is released between batches so lookups are never held up for a
+        whole-table scan.
+        """
+        excess = self.total_bytes() - self.max_bytes
+        if excess <= 0:
+            return 0
+        # Trim an extra 10% so compaction does not rerun on every write
+        target = excess + self.max_bytes // 10
+        removed = freed = 0
+        while freed < target:
+            with self._lock:
+                rows = self._conn.execute("SELECT key, nbytes FROM routes ORDER BY last_access LIMIT ?",
+                                          (batch_size,)).fetchall()
+                doomed = []
+                for db_key, nbytes in rows:
+                    if freed >= target:
+                        break
+                    doomed.append((db_key,))
+                    freed += nbytes
+                self._conn.execute("BEGIN")
+                self._conn.executemany("DELETE FROM routes WHERE key = ?", doomed)
+                self._conn.execute("COMMIT")
+            removed += len(doomed)
+            if len(rows) < batch_size:
+                break
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.evictions += removed
+        self.compactions += 1
+        return removed
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until queued writes have been committed; False if `timeout` ran out first"""
+        with self._written:
+            return self._written.wait_for(lambda: self._unwritten == 0, timeout)
+
+    def close(self) -> None:
+        self._writes.put(_STOP)
+        self._writer.join(timeout=5)
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "pending_writes": self._unwritten,
+            "dropped_writes": self.dropped_writes,
+            "evictions": self.evictions,
+            "compactions": self.compactions,
+            "max_bytes": self.max_bytes,
+        }
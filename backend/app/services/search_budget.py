@@ -0,0 +1,81 @@
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+class SearchBudget:
+    """Work allowed for one route request, shared with the worker running it.
+
+    `max_expansions` caps each individual search; `deadline` (wall-clock, so
+    it also holds inside process-pool workers) and cancellation cover the
+    whole request. Searches poll `check()` and stop early with an
+    approximate, degraded result instead of running unbounded.
+    """
+
+    def __init__(self, max_expansions: int = 0, time_budget_ms: float = 0):
+        self.max_expansions = max_expansions
+        self.time_budget_ms = time_budget_ms
+        self.deadline: Optional[float] = time.time() + time_budget_ms / 1000 if time_budget_ms else None
+        self._cancelled = threading.Event()
+
+    def detached(self) -> "SearchBudget":
+        """Same limits and deadline, but not cancelled along with this budget"""
+        budget = SearchBudget(self.max_expansions)
+        budget.time_budget_ms = self.time_budget_ms
+        budget.deadline = self.deadline
+        return budget
+
+    @property
+    def limits(self) -> Tuple[int, float]:
+        """Expansion cap and time budget as requested; searches are only shared between equal limits"""
+        return self.max_expansions, self.time_budget_ms
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def remaining_seconds(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+    def check(self, expanded: int = 0) -> Optional[str]:
+        """Why the search must stop ("cancelled", "time" or "expansions"), or None"""
+        if self._cancelled.is_set():
+            return "cancelled"
+        if self.deadline is not None and time.time() >= self.deadline:
+            return "time"
+        if self.max_expansions and expanded > self.max_expansions:
+            return "expansions"
+        return None
+
+    def __getstate__(self):
+        # Events cannot cross into process workers; cancellation stays local
+        return self.max_expansions, self.time_budget_ms, self.deadline, self.cancelled
+
+    def __setstate__(self, state):
+        self.max_expansions, self.time_budget_ms, self.deadline, cancelled = state
+        self._cancelled = threading.Event()
+        if cancelled:
+            self._cancelled.set()
+
+
+class SearchBudgetExceeded(Exception):
+    """A search ran out of budget.
+
+    `nodes` is the partial path (graph node indices) toward the goal that was
+    found so far, and `points` the approximate lat/lng path built from it.
+    """
+
+    def __init__(self, reason: str, expanded: int, points: Optional[np.ndarray] = None,
+                 nodes: Optional[List[int]] = None):
+        super().__init__(f"Route search stopped early ({reason}) after {expanded} expansions")
+        self.reason = reason
+        self.expanded = expanded
+        self.points = points
+        self.nodes = nodes
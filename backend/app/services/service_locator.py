@@ -1,4 +1,9 @@
+from app.core.startup import startup_timer
+from app.services.live_routing import create_live_sessions
 from app.services.navigation_service import NavigationService
 
-# Create a single instance to be shared across the application
-navigation_service = NavigationService()
\ No newline at end of file
+# Create a single instance to be shared across the application.
+# Construction is cheap; the path engine is built later (see ENGINE_WARMUP).
+with startup_timer.phase("navigation_service"):
+    navigation_service = NavigationService()
+    live_sessions = create_live_sessions()
@@ -0,0 +1,283 @@
+"""Host-wide state shared by every worker process through a memory-mapped file.
+
+Rate-limit counters and a fixed-size route cache live in one file that
+each uvicorn/gunicorn worker maps, so limits are enforced globally and a
+route computed by one worker is reused by the others. No external service
+is involved.
+
+Layout (all little-endian):
+
+- header: magic, layout version, the table sizes it was created with and a
+  hash of the route cache version (see route_store.route_cache_version)
+- limiter table: buckets of `_LIMITER_BUCKET` slots, one client per slot
+- route table: direct-mapped slots holding a key and up to `cache_max_points`
+  lat/lng pairs
+
+Concurrency uses striped locks: each bucket/slot maps to one of `stripes`
+byte-range `fcntl` locks (across processes) paired with a threading lock
+(fcntl locks are per process, not per thread). This requires a POSIX host.
+
+A file created with another layout or cache version is never resized in place, since
+workers that still map it would fault (SIGBUS) on the pages cut off. A
+fresh file is renamed over it instead; those workers keep the old file
+until they exit.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Hashable, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.services.route_store import route_cache_version
+
+_MAGIC = b"NAVISHM1"
+# magic, layout version, limiter slots, cache slots, max points, stripes, cache version hash
+_HEADER = struct.Struct("<8sIIIIIQ")
+_HEADER_SIZE = 64
+_LAYOUT_VERSION = 2
+
+# hash, window_start, last_seen, current, previous
+_LIMITER_SLOT = struct.Struct("<QddII")
+_LIMITER_BUCKET = 4
+
+# hash, key (4 x f64), point count, stored_at
+_CACHE_SLOT_HEADER = struct.Struct("<Q4dId")
+_CACHE_SLOT_HEADER_SIZE = 64
+_POINT_SIZE = 16
+
+
+def _hash64(data: bytes) -> int:
+    value = int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+    return value or 1  # zero marks an empty slot
+
+
+class SharedState:
+    def __init__(self, path: str, limiter_slots: int = 65536, cache_slots: int = 4096,
+                 cache_max_points: int = 2048, stripes: int = 64, cache_ttl_seconds: float = 0, version: str = ""):
+        self.path = path
+        # Routes cached under another engine, network or key mode must not be served
+        self.version = version
+        self.limiter_buckets = max(1, limiter_slots // _LIMITER_BUCKET)
+        self.limiter_slots = self.limiter_buckets * _LIMITER_BUCKET
+        self.cache_slots = cache_slots
+        self.cache_max_points = cache_max_points
+        self.stripes = stripes
+        self.cache_ttl_seconds = cache_ttl_seconds
+
+        self.cache_slot_size = _CACHE_SLOT_HEADER_SIZE + cache_max_points * _POINT_SIZE
+        self.limiter_offset = _HEADER_SIZE
+        self.cache_offset = self.limiter_offset + self.limiter_slots * _LIMITER_SLOT.size
+        self.size = self.cache_offset + self.cache_slots * self.cache_slot_size
+        # fcntl lock ranges sit past the data so they never overlap the header lock
+        self._lock_offset = self.size
+
+        self._thread_locks = [threading.Lock() for _ in range(stripes)]
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_stores = 0
+        self.limiter_collisions = 0
+
+        self._fd = self._open_file()
+        self._mm = mmap.mmap(self._fd, self.size)
+
+    def _open_file(self) -> int:
+        """Open the file with this layout and version, creating or replacing it under an exclusive lock"""
+        expected = _HEADER.pack(_MAGIC, _LAYOUT_VERSION, self.limiter_slots, self.cache_slots,
+                                self.cache_max_points, self.stripes, _hash64(self.version.encode()))
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.lockf(fd, fcntl.LOCK_EX, _HEADER_SIZE, 0)
+            try:
+                size = os.fstat(fd).st_size
+                try:
+                    # Another worker may have replaced the file while this one waited for the lock
+                    stale = os.stat(self.path).st_ino != os.fstat(fd).st_ino
+                except FileNotFoundError:
+                    stale = True
+                if stale:
+                    pass
+                elif size == 0:
+                    # Nobody can have mapped an empty file, so growing it in place is safe
+                    os.ftruncate(fd, self.size)
+                    os.pwrite(fd, expected, 0)
+                elif size != self.size or os.pread(fd, _HEADER.size, 0) != expected:
+                    self._replace_file(expected)
+                    stale = True
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, _HEADER_SIZE, 0)
+            if not stale:
+                return fd
+            os.close(fd)
+
+    def _replace_file(self, header: bytes) -> None:
+        # Built under a temporary name, so other workers only ever see a complete file at `path`
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(temporary, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, self.size)
+            os.pwrite(fd, header, 0)
+        finally:
+            os.close(fd)
+        os.replace(temporary, self.path)
+
+    @contextmanager
+    def _locked(self, stripes: Iterable[int]):
+        # Sorted acquisition keeps multi-stripe callers deadlock free
+        ordered = sorted(set(stripes))
+        acquired = []
+        try:
+            for stripe in ordered:
+                self._thread_locks[stripe].acquire()
+                try:
+                    fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, self._lock_offset + stripe)
+                except BaseException:
+                    self._thread_locks[stripe].release()
+                    raise
+                acquired.append(stripe)
+            yield
+        finally:
+            for stripe in reversed(acquired):
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, self._lock_offset + stripe)
+                self._thread_locks[stripe].release()
+
+    # Rate limiting
+
+    def _find_limiter_slot(self, key_hash: int) -> Tuple[int, bool]:
+        """Offset of the slot for `key_hash` within its bucket and whether it is new"""
+        bucket = key_hash % self.limiter_buckets
+        first = self.limiter_offset + bucket * _LIMITER_BUCKET * _LIMITER_SLOT.size
+        empty = None
+        oldest, oldest_seen = first, float("inf")
+        for index in range(_LIMITER_BUCKET):
+            offset = first + index * _LIMITER_SLOT.size
+            slot_hash, _, last_seen, _, _ = _LIMITER_SLOT.unpack_from(self._mm, offset)
+            if slot_hash == key_hash:
+                return offset, False
+            if slot_hash == 0 and empty is None:
+                empty = offset
+            if last_seen < oldest_seen:
+                oldest, oldest_seen = offset, last_seen
+        if empty is not None:
+            return empty, True
+        # Bucket full: take over the least recently seen client's slot
+        self.limiter_collisions += 1
+        return oldest, True
+
+    def limiter_admit(self, clients: Sequence[Tuple[Hashable, int]], now: float,
+                      window_seconds: float) -> bool:
+        """Sliding-window-counter check over all `(identity, limit)` pairs at once.
+
+        The request is charged to every identity only if all of them are
+        under their limit; the decision is atomic across workers.
+        """
+        hashes = [_hash64(repr(identity).encode()) for identity, _ in clients]
+        stripes = [(h % self.limiter_buckets) % self.stripes for h in hashes]
+        with self._locked(stripes):
+            records = []
+            allowed = True
+            for key_hash, (_, limit) in zip(hashes, clients):
+                offset, is_new = self._find_limiter_slot(key_hash)
+                if is_new:
+                    window_start, current, previous = now, 0, 0
+                else:
+                    _, window_start, _, current, previous = _LIMITER_SLOT.unpack_from(self._mm, offset)
+                    elapsed = now - window_start
+                    if elapsed >= window_seconds:
+                        windows_passed = int(elapsed // window_seconds)
+                        previous = current if windows_passed == 1 else 0
+                        current = 0
+                        window_start += windows_passed * window_seconds
+                overlap = 1.0 - (now - window_start) / window_seconds
+                if previous * overlap + current >= limit:
+                    allowed = False
+                # Claim the slot right away so a second identity in this call cannot take it
+                _LIMITER_SLOT.pack_into(self._mm, offset, key_hash, window_start, now, current, previous)
+                records.append((offset, key_hash, window_start, current, previous))
+            if allowed:
+                for offset, key_hash, window_start, current, previous in records:
+                    _LIMITER_SLOT.pack_into(self._mm, offset, key_hash, window_start, now,
+                                            current + 1, previous)
+        return allowed
+
+    # Route cache
+
+    def _cache_slot(self, key: Tuple) -> Tuple[int, int, Tuple[float, ...]]:
+        key_floats = tuple(float(part) for part in key)
+        key_hash = _hash64(repr(key).encode())
+        return key_hash, self.cache_offset + (key_hash % self.cache_slots) * self.cache_slot_size, key_floats
+
+    def cache_get(self, key: Tuple) -> Optional[np.ndarray]:
+        key_hash, offset, key_floats = self._cache_slot(key)
+        with self._locked([(key_hash % self.cache_slots) % self.stripes]):
+            slot_hash, k0, k1, k2, k3, count, stored_at = _CACHE_SLOT_HEADER.unpack_from(self._mm, offset)
+            fresh = not self.cache_ttl_seconds or time.time() - stored_at < self.cache_ttl_seconds
+            if slot_hash != key_hash or (k0, k1, k2, k3) != key_floats or not fresh:
+                self.cache_misses += 1
+                return None
+            start = offset + _CACHE_SLOT_HEADER_SIZE
+            points = np.frombuffer(self._mm, dtype="<f8", count=2 * count, offset=start).reshape(count, 2).copy()
+        self.cache_hits += 1
+        return points
+
+    def cache_put(self, key: Tuple, points: np.ndarray) -> bool:
+        """Store a path; paths longer than the slot capacity are not shared"""
+        if len(points) > self.cache_max_points:
+            return False
+        key_hash, offset, key_floats = self._cache_slot(key)
+        payload = np.ascontiguousarray(points, dtype="<f8").tobytes()
+        with self._locked([(key_hash % self.cache_slots) % self.stripes]):
+            start = offset + _CACHE_SLOT_HEADER_SIZE
+            self._mm[start:start + len(payload)] = payload
+            _CACHE_SLOT_HEADER.pack_into(self._mm, offset, key_hash, *key_floats, len(points), time.time())
+        self.cache_stores += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        limiter_hashes = np.frombuffer(self._mm, dtype=np.dtype([("hash", "<u8"), ("rest", "V24")]),
+                                       count=self.limiter_slots, offset=self.limiter_offset)["hash"]
+        cache_hashes = np.frombuffer(self._mm, dtype=np.dtype([("hash", "<u8"),
+                                                               ("rest", f"V{self.cache_slot_size - 8}")]),
+                                     count=self.cache_slots, offset=self.cache_offset)["hash"]
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "path": self.path,
+            "size_bytes": self.size,
+            "limiter_slots": self.limiter_slots,
+            "limiter_slots_used": int(np.count_nonzero(limiter_hashes)),
+            "limiter_collisions": self.limiter_collisions,
+            "cache_slots": self.cache_slots,
+            "cache_slots_used": int(np.count_nonzero(cache_hashes)),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "cache_stores": self.cache_stores,
+        }
+
+    def close(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
+
+
+@lru_cache
+def get_shared_state() -> Optional[SharedState]:
+    """Per-process handle on the shared state file, or None when it is disabled"""
+    settings = get_settings()
+    if not settings.SHARED_STATE_PATH:
+        return None
+    return SharedState(
+        settings.SHARED_STATE_PATH,
+        limiter_slots=settings.SHARED_STATE_LIMITER_SLOTS,
+        cache_slots=settings.SHARED_STATE_CACHE_SLOTS,
+        cache_max_points=settings.SHARED_STATE_CACHE_MAX_POINTS,
+        stripes=settings.SHARED_STATE_LOCK_STRIPES,
+        cache_ttl_seconds=settings.ROUTE_CACHE_TTL_SECONDS,
+        version=route_cache_version(settings),
+    )
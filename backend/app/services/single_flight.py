@@ -0,0 +1,89 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Sequence
+
+
+class _Flight:
+    """One in-flight computation shared by every caller awaiting any of its keys"""
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[List[Any]]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent computations of the same keys.
+
+    The first caller for a key starts the computation as a task; callers
+    arriving while it runs await that same task instead of starting their
+    own. The task is shielded from its callers: one of them disconnecting
+    does not stop it for the rest, but once every caller has gone it is
+    cancelled. Its result, exception or cancellation reaches all callers
+    still waiting.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, tuple] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.abandoned = 0
+        self.errors = 0
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def run(self, keys: Sequence[Hashable],
+                  compute: Callable[[List[Hashable]], Awaitable[List[Any]]]) -> List[Any]:
+        """Results for `keys`, starting `compute(new_keys)` only for keys not already in flight.
+
+        `compute` must return one result per key it is given, in order.
+        """
+        loop = asyncio.get_running_loop()
+        joined = {}
+        for key in keys:
+            entry = self._flights.get(key)
+            # A flight left behind by an event loop that has since closed can never finish
+            if entry is not None and entry[0].task.get_loop() is loop and key not in joined:
+                joined[key] = entry
+        new_keys = [key for key in dict.fromkeys(keys) if key not in joined]
+        self.coalesced += sum(1 for key in keys if key in joined)
+
+        entries = dict(joined)
+        if new_keys:
+            flight = _Flight(loop.create_task(compute(new_keys)))
+            for index, key in enumerate(new_keys):
+                self._flights[key] = entries[key] = (flight, index)
+            flight.task.add_done_callback(lambda task, keys=new_keys, flight=flight: self._land(flight, keys))
+            self.leaders += len(new_keys)
+
+        flights = list({id(flight): flight for flight, _ in entries.values()}.values())
+        for flight in flights:
+            flight.waiters += 1
+        try:
+            await asyncio.gather(*(asyncio.shield(flight.task) for flight in flights))
+        finally:
+            for flight in flights:
+                flight.waiters -= 1
+                if flight.waiters == 0 and not flight.task.done():
+                    flight.task.cancel()
+                    self.abandoned += 1
+        return [entries[key][0].task.result()[entries[key][1]] for key in keys]
+
+    def _land(self, flight: _Flight, keys: List[Hashable]) -> None:
+        for key in keys:
+            entry = self._flights.get(key)
+            if entry is not None and entry[0] is flight:
+                del self._flights[key]
+        if not flight.task.cancelled() and flight.task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        requested = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": self.coalesced / requested if requested else 0.0,
+            "abandoned": self.abandoned,
+            "errors": self.errors,
+        }
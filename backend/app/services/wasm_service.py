@@ -1,74 +1,334 @@
 import wasmtime
 import os
+import hashlib
 import logging
+import platform
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from importlib import metadata
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from app.core.startup import startup_timer
+from app.core.telemetry import stage_metrics
 
 logger = logging.getLogger(__name__)
 
+_F64_SIZE = 8
+_STRING_CHUNK_SIZE = 4096
+
+DEFAULT_WASM_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+                                 "wasm", "pkg", "wasm_bg.wasm")
+
+class WasmInstance:
+    """One store + instance; a store must only be used by one thread at a time"""
+    __slots__ = ("store", "instance", "memory", "find_path_func",
+                 "find_path_packed_func", "free_path_func", "find_path_bounded_func",
+                 "last_search_degraded_func", "calls")
+
+    def __init__(self, store, instance, memory, find_path_func,
+                 find_path_packed_func=None, free_path_func=None,
+                 find_path_bounded_func=None, last_search_degraded_func=None):
+        self.store = store
+        self.instance = instance
+        self.memory = memory
+        self.find_path_func = find_path_func
+        self.find_path_packed_func = find_path_packed_func
+        self.free_path_func = free_path_func
+        self.find_path_bounded_func = find_path_bounded_func
+        self.last_search_degraded_func = last_search_degraded_func
+        self.calls = 0
+
+    def memory_bytes(self) -> int:
+        return self.memory.data_len(self.store) if self.memory else 0
+
+
+class WasmInstancePool:
+    """Fixed-size pool of instances sharing one compiled module.
+
+    Callers check an instance out for the duration of a call. Instances whose
+    linear memory has grown past `max_memory_bytes` are replaced with a fresh
+    instance on return, since WASM memory never shrinks.
+    """
+
+    def __init__(self, engine: wasmtime.Engine, module: wasmtime.Module, size: int,
+                 max_memory_bytes: int = 64 * 1024 * 1024, checkout_timeout: float = 5.0):
+        self.engine = engine
+        self.module = module
+        self.size = size
+        self.max_memory_bytes = max_memory_bytes
+        self.checkout_timeout = checkout_timeout
+        self.linker = wasmtime.Linker(engine)
+        self.linker.define_wasi()
+        self._idle: "queue.Queue[WasmInstance]" = queue.Queue()
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.recycled = 0
+        self.total_wait_seconds = 0.0
+        for _ in range(size):
+            self._idle.put(self._instantiate())
+
+    def _instantiate(self) -> WasmInstance:
+        wasi = wasmtime.WasiConfig()
+        wasi.inherit_stdout()
+        wasi.inherit_stderr()
+        store = wasmtime.Store(self.engine)
+        store.set_wasi(wasi)
+        instance = self.linker.instantiate(store, self.module)
+        exports = instance.exports(store)
+        return WasmInstance(store, instance, exports.get("memory"), exports.get("find_path"),
+                            exports.get("find_path_packed"), exports.get("free_path"),
+                            exports.get("find_path_bounded"), exports.get("last_search_degraded"))
+
+    @contextmanager
+    def checkout(self):
+        waited_from = time.perf_counter()
+        try:
+            item = self._idle.get(timeout=self.checkout_timeout)
+        except queue.Empty:
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError("No WASM instance became available")
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.total_wait_seconds += time.perf_counter() - waited_from
+        try:
+            yield item
+        finally:
+            item.calls += 1
+            if item.memory_bytes() > self.max_memory_bytes:
+                try:
+                    item = self._instantiate()
+                    with self._lock:
+                        self.recycled += 1
+                except Exception as e:
+                    logger.error("Failed to recycle WASM instance: %s", e)
+            with self._lock:
+                self.in_use -= 1
+            self._idle.put(item)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "in_use": self.in_use,
+            "utilization": self.in_use / self.size if self.size else 0.0,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "recycled": self.recycled,
+            "avg_wait_ms": (self.total_wait_seconds / self.checkouts * 1000) if self.checkouts else 0.0,
+            "max_memory_bytes": self.max_memory_bytes,
+        }
+
+
+def _artifact_key(wasm_bytes: bytes) -> str:
+    """Name for a precompiled module: serialized code is only valid for the
+    exact binary, wasmtime release and host architecture that produced it"""
+    try:
+        runtime = metadata.version("wasmtime")
+    except metadata.PackageNotFoundError:
+        runtime = "unknown"
+    digest = hashlib.sha256(wasm_bytes)
+    digest.update(f"{runtime}:{platform.machine()}".encode())
+    return digest.hexdigest()
+
+
 class WasmService:
-    def __init__(self):
-        self.store = None
-        self.instance = None
-        self.memory = None
-        self.find_path_func = None
+    def __init__(self, wasm_path: Optional[str] = None, pool_size: int = 1,
+                 max_memory_bytes: int = 64 * 1024 * 1024, checkout_timeout: float = 5.0,
+                 artifact_cache_dir: Optional[str] = None):
+        self.wasm_path = wasm_path or DEFAULT_WASM_PATH
+        self.pool_size = max(1, pool_size)
+        self.max_memory_bytes = max_memory_bytes
+        self.checkout_timeout = checkout_timeout
+        self.artifact_cache_dir = artifact_cache_dir
+        # "hit", "miss", "error" or "disabled" for the last initialize()
+        self.artifact_cache = "disabled"
+        self.startup_ms: Dict[str, float] = {}
+        self.pool: Optional[WasmInstancePool] = None
         self.initialize()
-    
+
+    @property
+    def available(self) -> bool:
+        return self.pool is not None
+
+    @property
+    def supports_bounded_search(self) -> bool:
+        """Whether the module exports the expansion-bounded search (older builds do not)"""
+        if self.pool is None:
+            return False
+        exports = {export.name for export in self.pool.module.exports}
+        return {"find_path_bounded", "last_search_degraded"} <= exports
+
     def initialize(self):
         try:
-            # Get the path to the WASM file
-            wasm_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
-                                    "wasm", "pkg", "naviwasm_bg.wasm")
-            
-            if not os.path.exists(wasm_path):
-                logger.warning(f"WASM file not found at: {wasm_path}")
+            if not os.path.exists(self.wasm_path):
+                logger.warning(f"WASM file not found at: {self.wasm_path}")
                 return False
-                
-            # Initialize the WASM runtime
+
+            # Compile once; every pooled instance shares the module
             engine = wasmtime.Engine()
-            module = wasmtime.Module(engine, open(wasm_path, 'rb').read())
-            linker = wasmtime.Linker(engine)
-            linker.define_wasi()
-            wasi = wasmtime.WasiConfig()
-            wasi.inherit_stdout()
-            wasi.inherit_stderr()
-            self.store = wasmtime.Store(engine)
-            self.store.set_wasi(wasi)
-            
-            # Instantiate the module
-            self.instance = linker.instantiate(self.store, module)
-            
-            # Get exports
-            self.memory = self.instance.exports(self.store).get("memory")
-            self.find_path_func = self.instance.exports(self.store).get("find_path")
-            
-            logger.info("WASM module initialized successfully")
+            with self._phase("wasm_read"):
+                with open(self.wasm_path, 'rb') as wasm_file:
+                    wasm_bytes = wasm_file.read()
+            module = self._load_module(engine, wasm_bytes)
+            with self._phase("wasm_instantiate"):
+                self.pool = WasmInstancePool(
+                    engine, module, self.pool_size,
+                    max_memory_bytes=self.max_memory_bytes,
+                    checkout_timeout=self.checkout_timeout,
+                )
+
+            logger.info(f"WASM module initialized with {self.pool_size} instances")
             return True
         except Exception as e:
             logger.error(f"Failed to initialize WASM: {str(e)}")
             return False
-    
+
+    @contextmanager
+    def _phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            self.startup_ms[name] = seconds * 1000
+            startup_timer.record(name, seconds)
+
+    def _load_module(self, engine: wasmtime.Engine, wasm_bytes: bytes) -> wasmtime.Module:
+        """Compile the module, reusing a precompiled artifact from disk when one matches.
+
+        Deserializing runs no validation, so the artifact directory must only
+        be writable by this service.
+        """
+        if not self.artifact_cache_dir:
+            self.artifact_cache = "disabled"
+            with self._phase("wasm_compile"):
+                return wasmtime.Module(engine, wasm_bytes)
+
+        artifact_path = os.path.join(self.artifact_cache_dir, _artifact_key(wasm_bytes) + ".cwasm")
+        if os.path.exists(artifact_path):
+            try:
+                with self._phase("wasm_deserialize"):
+                    module = wasmtime.Module.deserialize_file(engine, artifact_path)
+                self.artifact_cache = "hit"
+                return module
+            except Exception as e:
+                logger.warning(f"Discarding unusable WASM artifact {artifact_path}: {str(e)}")
+
+        with self._phase("wasm_compile"):
+            module = wasmtime.Module(engine, wasm_bytes)
+        try:
+            os.makedirs(self.artifact_cache_dir, exist_ok=True)
+            # Write then rename so concurrent workers never load a partial artifact
+            temp_path = f"{artifact_path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as artifact_file:
+                artifact_file.write(module.serialize())
+            os.replace(temp_path, artifact_path)
+            self.artifact_cache = "miss"
+        except OSError as e:
+            logger.warning(f"Could not store WASM artifact in {self.artifact_cache_dir}: {str(e)}")
+            self.artifact_cache = "error"
+        return module
+
+    def find_path_packed(self, start_lat, start_lng, end_lat, end_lng) -> Optional[np.ndarray]:
+        """Run the search through the packed f64 ABI.
+
+        Returns an (n, 2) array of lat/lng copied out of linear memory in one
+        read, or None if the module lacks the packed exports or the call fails.
+        """
+        if not self.pool:
+            return None
+
+        try:
+            with self.pool.checkout() as wasm:
+                if wasm.find_path_packed_func is None:
+                    return None
+                ptr = wasm.find_path_packed_func(wasm.store,
+                                                 float(start_lat), float(start_lng),
+                                                 float(end_lat), float(end_lng))
+                return self._read_packed(wasm, ptr)
+        except Exception as e:
+            logger.error("Error calling WASM function: %s", e)
+            return None
+
+    def find_path_bounded(self, start_lat, start_lng, end_lat, end_lng,
+                          max_expansions: int) -> Optional[Tuple[np.ndarray, bool]]:
+        """Packed search that gives up after `max_expansions` expanded nodes.
+
+        Returns the path and whether it is degraded (the search ran out of
+        budget and the path finishes with a straight segment to the goal),
+        or None if the module lacks the bounded exports or the call fails.
+        """
+        if not self.pool:
+            return None
+
+        try:
+            with self.pool.checkout() as wasm:
+                if wasm.find_path_bounded_func is None or wasm.last_search_degraded_func is None:
+                    return None
+                ptr = wasm.find_path_bounded_func(wasm.store,
+                                                  float(start_lat), float(start_lng),
+                                                  float(end_lat), float(end_lng),
+                                                  int(min(max_expansions, 0xFFFFFFFF)))
+                degraded = bool(wasm.last_search_degraded_func(wasm.store))
+                return self._read_packed(wasm, ptr), degraded
+        except Exception as e:
+            logger.error("Error calling WASM function: %s", e)
+            return None
+
+    @staticmethod
+    def _read_packed(wasm: WasmInstance, ptr: int) -> np.ndarray:
+        """Copy a [count, lat0, lng0, ...] buffer out of linear memory and free it"""
+        started = time.perf_counter()
+        try:
+            count = int(np.frombuffer(
+                wasm.memory.read(wasm.store, ptr, ptr + _F64_SIZE), dtype="<f8")[0])
+            payload_start = ptr + _F64_SIZE
+            payload = wasm.memory.read(wasm.store, payload_start,
+                                       payload_start + 2 * count * _F64_SIZE)
+        finally:
+            wasm.free_path_func(wasm.store, ptr)
+        points = np.frombuffer(payload, dtype="<f8").reshape(count, 2)
+        stage_metrics.observe("result_parsing", time.perf_counter() - started)
+        return points
+
     def find_path(self, start_lat, start_lng, end_lat, end_lng):
-        if not self.find_path_func:
+        if not self.pool:
             return None
-            
+
         try:
-            # Call the WASM function
-            result_ptr = self.find_path_func(self.store, 
-                                           start_lat, start_lng, 
-                                           end_lat, end_lng)
-            
-            # Read the result from WASM memory
-            # This part depends on how your WASM module returns data
-            # For example, if it returns a pointer to a null-terminated string:
-            result = ""
-            i = result_ptr
-            while True:
-                byte = self.memory.read(self.store, i, 1)[0]
-                if byte == 0:
-                    break
-                result += chr(byte)
-                i += 1
-                
+            with self.pool.checkout() as wasm:
+                # Call the WASM function
+                result_ptr = wasm.find_path_func(wasm.store,
+                                                 float(start_lat), float(start_lng),
+                                                 float(end_lat), float(end_lng))
+
+                # Legacy ABI: a pointer to a null-terminated JSON string.
+                # Scan it in chunks rather than one byte per call.
+                end = wasm.memory.data_len(wasm.store)
+                chunks = []
+                i = result_ptr
+                while i < end:
+                    chunk = wasm.memory.read(wasm.store, i, min(i + _STRING_CHUNK_SIZE, end))
+                    terminator = chunk.find(0)
+                    if terminator >= 0:
+                        chunks.append(chunk[:terminator])
+                        break
+                    chunks.append(chunk)
+                    i += len(chunk)
+                result = b"".join(chunks).decode("utf-8")
+
             return result
         except Exception as e:
-            logger.error(f"Error calling WASM function: {str(e)}")
-            return None
\ No newline at end of file
+            logger.error("Error calling WASM function: %s", e)
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.pool.stats() if self.pool else {"size": 0}
+        stats["artifact_cache"] = self.artifact_cache
+        stats["startup_ms"] = dict(self.startup_ms)
+        return stats
@@ -0,0 +1,112 @@
+"""Outlines of sets of grid cells, as lat/lng polygons.
+
+Cells are lib.rs's: integer (x, y) = (lng, lat) / resolution truncated
+toward zero. Truncation makes cell 0 twice as wide as the others (it spans
+(-resolution, resolution)), so corner coordinates are mapped back with
+that in mind rather than by a plain multiply.
+
+The outline is traced along cell edges that separate a member cell from a
+non-member, keeping the cells on the left, so outer rings run
+counterclockwise and holes clockwise. Only outer rings are returned: an
+unreachable pocket inside an isochrone is filled in. Cells that touch only
+at a corner are joined into one ring.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.simplify import douglas_peucker
+
+_KEY_OFFSET = 1 << 31
+# For each side of a cell: the neighbor across it, and its start and end corner, counterclockwise
+_SIDES = (
+    ((0, -1), (0, 0), (1, 0)),   # south
+    ((1, 0), (1, 0), (1, 1)),    # east
+    ((0, 1), (1, 1), (0, 1)),    # north
+    ((-1, 0), (0, 1), (0, 0)),   # west
+)
+
+
+def cell_keys(cells: np.ndarray) -> np.ndarray:
+    """One int64 per (x, y) cell, for set operations on cell arrays"""
+    cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+    return ((cells[:, 0] + _KEY_OFFSET) << 32) | (cells[:, 1] + _KEY_OFFSET)
+
+
+def cell_centers(cells: np.ndarray, resolution: float) -> np.ndarray:
+    """(n, 2) lat/lng of points that truncate back into each (x, y) cell"""
+    cells = np.asarray(cells, dtype=np.float64).reshape(-1, 2)
+    return (cells + 0.5 * np.sign(cells))[:, ::-1] * resolution
+
+
+def _corner_coordinates(corners: np.ndarray, resolution: float) -> np.ndarray:
+    # Corner c sits between cells c - 1 and c; at and below zero that is (c - 1) * resolution
+    corners = np.asarray(corners, dtype=np.float64)
+    return np.where(corners >= 1, corners, corners - 1)[:, ::-1] * resolution
+
+
+def outline_rings(cells: np.ndarray) -> List[np.ndarray]:
+    """Outer boundary rings of the cells, as closed (n, 2) arrays of integer (x, y) corners.
+
+    Only corners where the boundary turns are kept. Rings are ordered by
+    area, largest first.
+    """
+    cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+    if len(cells) == 0:
+        return []
+    # One sort, then a binary search per side; cheaper than np.isin, which sorts every call
+    keys = np.sort(cell_keys(cells))
+    outgoing: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+    for (dx, dy), (sx, sy), (ex, ey) in _SIDES:
+        neighbors = cell_keys(cells + (dx, dy))
+        found = keys[np.minimum(np.searchsorted(keys, neighbors), len(keys) - 1)] == neighbors
+        exposed = cells[~found]
+        starts = (exposed + (sx, sy)).tolist()
+        ends = (exposed + (ex, ey)).tolist()
+        for start, end in zip(starts, ends):
+            outgoing.setdefault(tuple(start), []).append(tuple(end))
+
+    rings = []
+    while outgoing:
+        # Start where the boundary does not touch itself, so no choice is made on the first step
+        first = next((corner for corner, options in outgoing.items() if len(options) == 1), next(iter(outgoing)))
+        corner, corners = first, []
+        direction = None
+        while True:
+            options = outgoing[corner]
+            if len(options) == 1 or direction is None:
+                following = options.pop()
+            else:
+                # Two cells meet only at this corner: turning right keeps them in one ring
+                dx, dy = direction
+                preference = [(dy, -dx), (dx, dy), (-dy, dx)]
+                following = min(options, key=lambda end: preference.index(
+                    (end[0] - corner[0], end[1] - corner[1])))
+                options.remove(following)
+            if not options:
+                del outgoing[corner]
+            step = (following[0] - corner[0], following[1] - corner[1])
+            if step != direction:
+                corners.append(corner)
+                direction = step
+            corner = following
+            if corner == first and first not in outgoing:
+                break
+        ring = np.array(corners + corners[:1], dtype=np.int64)
+        # Shoelace; outer rings are counterclockwise, holes clockwise
+        area = float(np.dot(ring[:-1, 0], ring[1:, 1]) - np.dot(ring[1:, 0], ring[:-1, 1])) / 2
+        if area > 0:
+            rings.append((area, ring))
+    rings.sort(key=lambda item: -item[0])
+    return [ring for _, ring in rings]
+
+
+def cell_polygons(cells: np.ndarray, resolution: float, tolerance_m: Optional[float] = None) -> List[np.ndarray]:
+    """Outer rings as closed (n, 2) lat/lng arrays, simplified to `tolerance_m` when given"""
+    polygons = []
+    for ring in outline_rings(cells):
+        points = _corner_coordinates(ring, resolution)
+        if tolerance_m:
+            points = douglas_peucker(points, tolerance_m)
+        polygons.append(points)
+    return polygons
@@ -0,0 +1,4 @@
+"""Geodesic constants shared by the routing engines and geometry utilities"""
+
+# Mean Earth radius (IUGG), for haversine distances and local projections
+EARTH_RADIUS_M = 6371008.8
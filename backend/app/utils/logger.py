@@ -1,34 +1,248 @@
+"""Queue-based logging that keeps disk and console writes off the caller's thread.
+
+Loggers on the event loop and in route workers only hand records to a
+bounded in-memory queue (`QueueHandler`); a `QueueListener` thread formats
+them as JSON lines and writes them to the console and the rotating log
+file. Two things keep an error storm from turning into a backlog:
+
+- Each message type (logger, level and unformatted message) has a token
+  bucket. Records over the rate are dropped before they are queued, and
+  the next record of that type that gets through carries a `suppressed`
+  count.
+- When the queue is full, records are dropped instead of blocking the
+  caller.
+
+Both kinds of drop are counted and reported under "logging" in /metrics.
+
+Forked route workers get a writer of their own. Only the parent rotates
+LOG_FILE; workers append to it through a `WatchedFileHandler`, which
+reopens the file after the parent has rotated it.
+"""
+import copy
+import datetime
+import json
 import logging
-import sys
 import os
-from logging.handlers import RotatingFileHandler
-
-def setup_logger():
-    # Create logs directory if it doesn't exist
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    
-    # Configure logging
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    
-    # Console handler
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+# Attributes every LogRecord has; anything else was passed in `extra=` and is emitted as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+# Rate-limiting keys kept before the least recently seen are forgotten
+_MAX_MESSAGE_TYPES = 4096
+_TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, extras and any traceback"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+                                      .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and not name.startswith("_"):
+                entry[name] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        elif record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per message type: `rate` records per second, bursts up to `burst`"""
+
+    def __init__(self, rate: float = 10.0, burst: int = 20):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        # key -> [tokens, last refill, suppressed since the last record let through]
+        self._buckets: Dict[Tuple, List[float]] = {}
+        self._lock = threading.Lock()
+        self.suppressed = 0
+        self.suppressed_by_type: Dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0:
+            return True
+        # The template, not the formatted message, so "failed: %s" is one type whatever the error
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            if bucket is None:
+                if len(self._buckets) >= _MAX_MESSAGE_TYPES:
+                    # Dicts keep insertion order and every hit re-inserts, so the first key is the stalest
+                    del self._buckets[next(iter(self._buckets))]
+                bucket = [float(self.burst), now, 0]
+            self._buckets[key] = bucket
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                self.suppressed += 1
+                label = f"{record.name}:{record.levelname}:{str(record.msg)[:80]}"
+                if label in self.suppressed_by_type or len(self.suppressed_by_type) < _MAX_MESSAGE_TYPES:
+                    self.suppressed_by_type[label] = self.suppressed_by_type.get(label, 0) + 1
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed = int(bucket[2])
+                bucket[2] = 0
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: a full queue drops the record and counts it"""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.enqueued = 0
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike the default, keeps the message and traceback apart so the JSON
+        # formatter can emit them as separate fields; arguments are rendered now,
+        # while the objects they refer to are still in the state being logged
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The stock put_nowait fails on a full queue; the writer is draining it, so waiting is safe
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """Root-logger queue, its background writer and the drop counters"""
+
+    def __init__(self):
+        self.queue: Optional["queue.Queue[logging.LogRecord]"] = None
+        self.handler: Optional[DroppingQueueHandler] = None
+        self.listener: Optional[QueueListener] = None
+        self.rate_limit: Optional[RateLimitFilter] = None
+        self._targets: List[logging.Handler] = []
+
+    def start(self, targets: List[logging.Handler], queue_size: int = 10000,
+              rate: float = 10.0, burst: int = 20, level: int = logging.INFO) -> logging.Logger:
+        """Route the root logger through the queue to `targets`, replacing an earlier pipeline"""
+        self.stop()
+        root = logging.getLogger()
+        root.setLevel(level)
+        self._targets = targets
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.rate_limit = RateLimitFilter(rate, burst)
+        self.handler.addFilter(self.rate_limit)
+        root.addHandler(self.handler)
+        self.listener = _Listener(self.queue, *targets, respect_handler_level=True)
+        self.listener.start()
+        return root
+
+    def stop(self) -> None:
+        """Write out everything queued and detach from the root logger"""
+        if self.handler is not None:
+            logging.getLogger().removeHandler(self.handler)
+        if self.listener is not None:
+            self.listener.stop()
+        for target in self._targets:
+            target.close()
+        self.queue = self.handler = self.listener = None
+        self._targets = []
+
+    def _restart_writer(self) -> None:
+        # A forked child (a process-pool route worker) inherits the queue but not the
+        # writer thread; without a new one its records would only fill the queue
+        if self.listener is not None:
+            # Locks held by other parent threads at fork time would never be released here
+            self.rate_limit._lock = threading.Lock()
+            self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self.handler.queue = self.queue
+            self._targets = [_append_only(target) for target in self._targets]
+            self.listener = _Listener(self.queue, *self._targets, respect_handler_level=True)
+            self.listener.start()
+
+    def stats(self) -> Dict[str, Any]:
+        rate_limit = self.rate_limit
+        top = sorted(rate_limit.suppressed_by_type.items(), key=lambda item: -item[1])[:10] if rate_limit else []
+        return {
+            "active": self.listener is not None,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "enqueued": self.handler.enqueued if self.handler else 0,
+            "dropped_queue_full": self.handler.dropped if self.handler else 0,
+            "dropped_rate_limited": rate_limit.suppressed if rate_limit else 0,
+            "top_rate_limited": dict(top),
+        }
+
+
+def _append_only(target: logging.Handler) -> logging.Handler:
+    """A forked child's replacement for a rotating file target: the same file, never rotated.
+
+    Processes rotating one file independently would lose or interleave
+    records at rollover.
+    """
+    if not isinstance(target, RotatingFileHandler):
+        return target
+    replacement = WatchedFileHandler(target.baseFilename, encoding=target.encoding)
+    replacement.setFormatter(target.formatter)
+    replacement.setLevel(target.level)
+    return replacement
+
+
+log_pipeline = LogPipeline()
+os.register_at_fork(after_in_child=log_pipeline._restart_writer)
+
+
+def setup_logger() -> logging.Logger:
+    """Configure the root logger from the LOG_* settings"""
+    settings = get_settings()
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(_TEXT_FORMAT)
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    ))
-    logger.addHandler(console_handler)
-    
-    # File handler with rotation
-    file_handler = RotatingFileHandler(
-        os.path.join(log_dir, 'api.log'),
-        maxBytes=10485760,  # 10MB
-        backupCount=10
+    console_handler.setFormatter(formatter)
+    targets: List[logging.Handler] = [console_handler]
+
+    if settings.LOG_FILE:
+        log_dir = os.path.dirname(settings.LOG_FILE)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        file_handler = RotatingFileHandler(
+            settings.LOG_FILE,
+            maxBytes=10485760,  # 10MB
+            backupCount=10
+        )
+        file_handler.setFormatter(formatter)
+        targets.append(file_handler)
+
+    return log_pipeline.start(
+        targets,
+        queue_size=settings.LOG_QUEUE_SIZE,
+        rate=settings.LOG_RATE_PER_SECOND,
+        burst=settings.LOG_RATE_BURST,
+        level=logging.getLevelName(settings.LOG_LEVEL),
     )
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    ))
-    logger.addHandler(file_handler)
-    
-    return logger
\ No newline at end of file
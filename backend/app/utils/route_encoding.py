@@ -0,0 +1,234 @@
+"""Compact wire formats for route paths.
+
+All encoders take array-backed RoutePath results straight from the
+navigation service, so none of them build per-point pydantic models.
+
+Formats (select with `?format=` or the Accept header):
+
+- ``json``: the default ``RouteResponse`` schema, written by a fast encoder
+- ``columnar``: ``{"lat": [...], "lng": [...], "calculation_time_ms": ..., "degraded": ...}``
+- ``polyline``: Google encoded polyline (precision 5) in a small JSON envelope
+- ``ndjson``: newline-delimited JSON written chunk by chunk: a ``header``
+  line with the point count and metadata, ``chunk`` lines of up to
+  ``chunk_points`` points as ``lat``/``lng`` columns, and an ``end`` line
+  so clients can tell a complete stream from a cut-off one. Batch streams
+  tag every line with its ``route`` index.
+- ``f32`` / ``f64``: little-endian lat/lng pairs as raw bytes. Batch bodies
+  start with a uint32 route count followed by one uint32 point count per route.
+  Binary bodies cannot carry the `degraded` flag; the endpoints report it in
+  headers instead.
+
+``iter_route_chunks`` and ``iter_routes_chunks`` produce the streaming
+(ndjson and binary) formats lazily, one bounded chunk at a time, so the
+encoded response is never held in memory as a whole.
+
+``encode_matrix`` writes distance matrices as ``json`` or ``f32``/``f64``.
+"""
+import json
+import struct
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.matrix import DistanceMatrix
+from app.models.route_path import RoutePath, routes_to_json
+
+FORMAT_MEDIA_TYPES = {
+    "json": "application/json",
+    "columnar": "application/vnd.naviwasm.columnar+json",
+    "polyline": "application/vnd.naviwasm.polyline+json",
+    "ndjson": "application/x-ndjson",
+    "f32": "application/vnd.naviwasm.path-f32",
+    "f64": "application/vnd.naviwasm.path-f64",
+}
+_MEDIA_TYPE_FORMATS = {media_type: fmt for fmt, media_type in FORMAT_MEDIA_TYPES.items()}
+_MEDIA_TYPE_FORMATS["*/*"] = "json"
+_MEDIA_TYPE_FORMATS["application/*"] = "json"
+
+BINARY_DTYPES = {"f32": np.dtype("<f4"), "f64": np.dtype("<f8")}
+STREAMING_FORMATS = ("ndjson", "f32", "f64")
+POLYLINE_PRECISION = 5
+STREAM_CHUNK_POINTS = 1024
+
+# A zigzagged 32-bit delta needs at most seven 5-bit chunks
+_POLYLINE_SHIFTS = np.arange(0, 35, 5, dtype=np.uint64)
+
+
+def negotiate_format(accept: Optional[str], requested: Optional[str] = None) -> str:
+    """Pick a response format from an explicit `format` value or the Accept header.
+
+    Raises ValueError for an unknown explicit format. An Accept header naming
+    only unsupported types falls back to JSON rather than failing.
+    """
+    if requested:
+        if requested not in FORMAT_MEDIA_TYPES:
+            raise ValueError(f"Unsupported format '{requested}'")
+        return requested
+    if not accept:
+        return "json"
+
+    candidates: List[Tuple[float, int, str]] = []
+    for position, item in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0 and media_type.lower() in _MEDIA_TYPE_FORMATS:
+            candidates.append((-quality, position, _MEDIA_TYPE_FORMATS[media_type.lower()]))
+    return min(candidates)[2] if candidates else "json"
+
+
+def encode_polyline(points: np.ndarray, precision: int = POLYLINE_PRECISION) -> str:
+    """Encode lat/lng points as a Google polyline string in one vectorized pass"""
+    if len(points) == 0:
+        return ""
+    scaled = np.round(np.asarray(points, dtype=np.float64) * 10 ** precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    zigzag = ((deltas << 1) ^ (deltas >> 63)).astype(np.uint64)
+
+    remaining = zigzag[:, None] >> _POLYLINE_SHIFTS
+    needed = remaining != 0
+    needed[:, 0] = True
+    chunk_counts = needed.sum(axis=1)
+
+    chunk_index = np.arange(len(_POLYLINE_SHIFTS))
+    continuation = np.where(chunk_index[None, :] < (chunk_counts[:, None] - 1),
+                            np.uint64(0x20), np.uint64(0))
+    chars = (remaining & np.uint64(0x1F)) + continuation + np.uint64(63)
+    return chars[chunk_index[None, :] < chunk_counts[:, None]].astype(np.uint8).tobytes().decode("ascii")
+
+
+def decode_polyline(encoded: str, precision: int = POLYLINE_PRECISION) -> np.ndarray:
+    """Inverse of encode_polyline, mainly for clients and tests"""
+    values = []
+    value = shift = 0
+    for char in encoded.encode("ascii"):
+        chunk = char - 63
+        value |= (chunk & 0x1F) << shift
+        shift += 5
+        if chunk < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    deltas = np.array(values, dtype=np.int64).reshape(-1, 2)
+    return np.cumsum(deltas, axis=0) / 10 ** precision
+
+
+def _columnar(route: RoutePath) -> dict:
+    return {
+        "lat": route.points[:, 0].tolist(),
+        "lng": route.points[:, 1].tolist(),
+        "calculation_time_ms": route.calculation_time_ms,
+        "degraded": route.degraded,
+    }
+
+
+def _polyline(route: RoutePath) -> dict:
+    return {
+        "polyline": encode_polyline(route.points),
+        "precision": POLYLINE_PRECISION,
+        "calculation_time_ms": route.calculation_time_ms,
+        "degraded": route.degraded,
+    }
+
+
+def _ndjson_line(record: dict) -> bytes:
+    return json.dumps(record, separators=(",", ":")).encode() + b"\n"
+
+
+def _ndjson_lines(route: RoutePath, chunk_points: int, **tags) -> Iterator[bytes]:
+    yield _ndjson_line({"type": "header", **tags, "point_count": len(route),
+                        "calculation_time_ms": route.calculation_time_ms, "degraded": route.degraded})
+    for offset in range(0, len(route), chunk_points):
+        chunk = route.points[offset:offset + chunk_points]
+        yield _ndjson_line({"type": "chunk", **tags, "lat": chunk[:, 0].tolist(), "lng": chunk[:, 1].tolist()})
+    yield _ndjson_line({"type": "end", **tags})
+
+
+def _binary_chunks(points: np.ndarray, dtype: np.dtype, chunk_points: int) -> Iterator[bytes]:
+    for offset in range(0, len(points), chunk_points):
+        yield np.ascontiguousarray(points[offset:offset + chunk_points], dtype=dtype).tobytes()
+
+
+def iter_route_chunks(route: RoutePath, fmt: str, chunk_points: int = STREAM_CHUNK_POINTS) -> Iterator[bytes]:
+    """Encode one route lazily, `chunk_points` points per piece.
+
+    Binary output is byte-for-byte the same as `encode_route`; only
+    streaming formats are accepted.
+    """
+    if fmt == "ndjson":
+        return _ndjson_lines(route, chunk_points)
+    if fmt in BINARY_DTYPES:
+        return _binary_chunks(route.points, BINARY_DTYPES[fmt], chunk_points)
+    raise ValueError(f"Format '{fmt}' cannot be streamed")
+
+
+def iter_routes_chunks(routes: Sequence[RoutePath], fmt: str,
+                       chunk_points: int = STREAM_CHUNK_POINTS) -> Iterator[bytes]:
+    """Batch counterpart of `iter_route_chunks`, matching `encode_routes`"""
+    if fmt == "ndjson":
+        for index, route in enumerate(routes):
+            yield from _ndjson_lines(route, chunk_points, route=index)
+    elif fmt in BINARY_DTYPES:
+        yield struct.pack(f"<I{len(routes)}I", len(routes), *(len(route) for route in routes))
+        for route in routes:
+            yield from _binary_chunks(route.points, BINARY_DTYPES[fmt], chunk_points)
+    else:
+        raise ValueError(f"Format '{fmt}' cannot be streamed")
+
+
+def encode_route(route: RoutePath, fmt: str) -> bytes:
+    """Encode one route in the given format"""
+    if fmt == "json":
+        return route.to_json().encode()
+    if fmt == "ndjson":
+        return b"".join(iter_route_chunks(route, fmt))
+    if fmt in BINARY_DTYPES:
+        return np.ascontiguousarray(route.points, dtype=BINARY_DTYPES[fmt]).tobytes()
+    if fmt == "columnar":
+        return json.dumps(_columnar(route)).encode()
+    if fmt == "polyline":
+        return json.dumps(_polyline(route)).encode()
+    raise ValueError(f"Unsupported format '{fmt}'")
+
+
+def encode_routes(routes: Sequence[RoutePath], fmt: str) -> bytes:
+    """Encode a batch of routes in the given format"""
+    if fmt == "json":
+        return routes_to_json(routes).encode()
+    if fmt == "ndjson":
+        return b"".join(iter_routes_chunks(routes, fmt))
+    if fmt in BINARY_DTYPES:
+        header = struct.pack(f"<I{len(routes)}I", len(routes), *(len(route) for route in routes))
+        body = (np.concatenate([route.points for route in routes])
+                if routes else np.empty((0, 2)))
+        return header + np.ascontiguousarray(body, dtype=BINARY_DTYPES[fmt]).tobytes()
+    if fmt == "columnar":
+        encoder = _columnar
+    elif fmt == "polyline":
+        encoder = _polyline
+    else:
+        raise ValueError(f"Unsupported format '{fmt}'")
+    return json.dumps({"routes": [encoder(route) for route in routes]}).encode()
+
+
+MATRIX_FORMATS = ("json", "f32", "f64")
+
+
+def encode_matrix(matrix: DistanceMatrix, fmt: str) -> bytes:
+    """Encode a distance matrix as JSON or as a compact binary block.
+
+    Binary layout: uint32 rows, uint32 columns, then the row-major
+    distance matrix followed by the duration matrix, NaN where there is no
+    route.
+    """
+    if fmt == "json":
+        return matrix.to_json().encode()
+    if fmt in BINARY_DTYPES:
+        rows, cols = matrix.shape
+        body = np.stack([matrix.distances_m, matrix.durations_s])
+        return struct.pack("<II", rows, cols) + np.ascontiguousarray(body, dtype=BINARY_DTYPES[fmt]).tobytes()
+    raise ValueError(f"Format '{fmt}' is not available for matrices; use one of {', '.join(MATRIX_FORMATS)}")
@@ -0,0 +1,79 @@
+"""Level-of-detail simplification for route paths.
+
+Paths are simplified with Douglas-Peucker in meters: points are projected
+onto a local equirectangular plane around the path, which is accurate to
+well under a percent over the distances a single route covers at the zoom
+levels where simplification matters.
+"""
+import math
+from typing import Optional
+
+import numpy as np
+
+from app.utils.geo import EARTH_RADIUS_M
+
+# Web Mercator ground resolution at the equator for zoom 0 and 256-pixel tiles
+# (Web Mercator uses the WGS84 equatorial radius, not the mean radius)
+_METERS_PER_PIXEL_ZOOM_0 = 2 * math.pi * 6378137.0 / 256
+MAX_ZOOM = 22
+
+
+def zoom_tolerance_m(zoom: int, lat: float, pixels: float = 1.0) -> float:
+    """Ground distance covered by `pixels` screen pixels at `zoom` around `lat`"""
+    return pixels * _METERS_PER_PIXEL_ZOOM_0 * math.cos(math.radians(lat)) / 2 ** zoom
+
+
+def _project(points: np.ndarray) -> np.ndarray:
+    lat0 = math.radians(float(points[:, 0].mean()))
+    xy = np.radians(points[:, ::-1] - points[0, ::-1]) * EARTH_RADIUS_M
+    xy[:, 0] *= math.cos(lat0)
+    return xy
+
+
+def douglas_peucker(points: np.ndarray, tolerance_m: float) -> np.ndarray:
+    """Drop points that deviate less than `tolerance_m` from the simplified line.
+
+    Every retained span is checked in one NumPy pass over its points; the
+    recursion is an explicit stack, so long paths cannot overflow it. The
+    first and last points are always kept.
+    """
+    count = len(points)
+    if count < 3 or tolerance_m <= 0:
+        return points
+    xy = _project(points)
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    spans = [(0, count - 1)]
+    while spans:
+        first, last = spans.pop()
+        if last - first < 2:
+            continue
+        origin, direction = xy[first], xy[last] - xy[first]
+        offsets = xy[first + 1:last] - origin
+        length_sq = float(direction @ direction)
+        if length_sq > 0:
+            # Distance to the segment itself, so points past either end are not under-measured
+            t = np.clip(offsets @ direction / length_sq, 0.0, 1.0)
+            offsets = offsets - t[:, None] * direction
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance_m:
+            split = first + 1 + farthest
+            keep[split] = True
+            spans.append((first, split))
+            spans.append((split, last))
+    return points[keep]
+
+
+def quantize_tolerance(tolerance_m: Optional[float]) -> Optional[float]:
+    """Round down to two significant digits so nearby tolerances share cached variants.
+
+    Rounding down keeps the served path at least as close to the full one
+    as requested.
+    """
+    if not tolerance_m or tolerance_m <= 0:
+        return None
+    exponent = math.floor(math.log10(tolerance_m)) - 1
+    # The epsilon absorbs float error in the division (0.12 / 0.01 is 11.999...)
+    digits = math.floor(tolerance_m / 10.0 ** exponent + 1e-9)
+    return float(f"{digits}e{exponent}")
@@ -0,0 +1,55 @@
+"""Route latency through NavigationService for cache hits against misses.
+
+Misses use a fresh random trip for every request, so each one pays for key
+computation, the tier lookups, the executor hop and the engine; hits repeat
+one trip that is already in the in-memory tier.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_cache --requests 500
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.models.navigation import Coordinates
+from app.services.navigation_service import NavigationService
+from benchmarks.common import latency_summary
+
+
+async def time_routes(service: NavigationService, pairs) -> list:
+    timings = []
+    for start, end in pairs:
+        started = time.perf_counter()
+        await service.compute_route(start, end)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def run(requests: int = 500, seed: int = 0) -> dict:
+    service = NavigationService()
+    rng = np.random.default_rng(seed)
+    coordinates = rng.uniform([30.0, -120.0], [45.0, -75.0], size=(requests, 2, 2))
+    misses = [(Coordinates(lat=a[0], lng=a[1]), Coordinates(lat=b[0], lng=b[1])) for a, b in coordinates]
+    hits = [misses[0]] * requests
+    try:
+        miss_timings = asyncio.run(time_routes(service, misses))
+        hit_timings = asyncio.run(time_routes(service, hits))
+    finally:
+        service.shutdown()
+    miss, hit = latency_summary(miss_timings), latency_summary(hit_timings)
+    return {"miss": miss, "hit": hit, "hit_speedup_p50": miss["p50_ms"] / hit["p50_ms"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    for name, value in run(args.requests).items():
+        print(f"{name:>16}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Path engine latency on its own: WASM against the Python fallback.
+
+Short (city-scale) and continental trips are routed directly through
+PathEngine, bypassing the service, cache and HTTP layers. The road graph
+is detached so each engine is measured in isolation. WASM is reported as
+unavailable when the module has not been built (`wasm-pack build` in
+wasm/).
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_engine --repeats 20
+"""
+import argparse
+import time
+
+from app.services.path_engine import PathEngine
+from benchmarks.common import CONTINENTAL_PAIRS, SHORT_PAIRS, latency_summary
+
+
+def time_pairs(engine: PathEngine, pairs, repeats: int) -> dict:
+    timings, points = [], 0
+    for _ in range(repeats):
+        for pair in pairs:
+            started = time.perf_counter()
+            path = engine.calculate_paths([pair])[0]
+            timings.append((time.perf_counter() - started) * 1000)
+            points = max(points, len(path))
+    return {**latency_summary(timings), "max_points": points}
+
+
+def run(repeats: int = 20) -> dict:
+    engine = PathEngine()
+    engine.graph = None
+    wasm_available = engine.use_wasm
+    results = {"wasm_available": wasm_available}
+    for label, pairs in (("short", SHORT_PAIRS), ("continental", CONTINENTAL_PAIRS)):
+        engine.use_wasm = False
+        results[f"python_{label}"] = time_pairs(engine, pairs, repeats)
+        if wasm_available:
+            # Continental grid searches take far longer, so they get fewer passes
+            engine.use_wasm = True
+            wasm_repeats = repeats if label == "short" else max(1, repeats // 4)
+            results[f"wasm_{label}"] = time_pairs(engine, pairs, wasm_repeats)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=20, help="passes over each trip list")
+    args = parser.parse_args()
+    for name, value in run(args.repeats).items():
+        print(f"{name:>18}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Load time, memory and query latency of the road graph engine.
+
+A synthetic road network (a jittered lattice with some streets removed) is
+written as node/edge CSV files, then loaded twice: once parsing the CSV and
+building the CSR arrays and spatial index, once from the memory-mapped array
+cache. Queries are timed for short (about 2 km) and long (corner to corner)
+trips.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_graph --size 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.road_graph import RoadGraph
+
+SPACING_DEGREES = 0.002  # roughly 200 m between intersections
+
+
+def synthetic_network(size: int, seed: int = 0, drop_fraction: float = 0.1):
+    """Node ids, lat, lng and undirected edge endpoints for a size x size street grid"""
+    rng = np.random.default_rng(seed)
+    rows, cols = np.divmod(np.arange(size * size), size)
+    lat = 40.0 + rows * SPACING_DEGREES + rng.normal(0, SPACING_DEGREES / 10, size * size)
+    lng = -100.0 + cols * SPACING_DEGREES + rng.normal(0, SPACING_DEGREES / 10, size * size)
+    # OSM ids are sparse and unordered
+    node_ids = rng.permutation(size * size).astype(np.int64) * 7 + 1_000_000
+
+    index = np.arange(size * size).reshape(size, size)
+    horizontal = np.stack([index[:, :-1].ravel(), index[:, 1:].ravel()], axis=1)
+    vertical = np.stack([index[:-1, :].ravel(), index[1:, :].ravel()], axis=1)
+    edges = np.concatenate([horizontal, vertical])
+    edges = edges[rng.random(len(edges)) >= drop_fraction]
+    return node_ids, lat, lng, node_ids[edges[:, 0]], node_ids[edges[:, 1]]
+
+
+def write_csv(directory: str, size: int, seed: int = 0):
+    node_ids, lat, lng, sources, targets = synthetic_network(size, seed)
+    nodes_path = os.path.join(directory, "nodes.csv")
+    edges_path = os.path.join(directory, "edges.csv")
+    np.savetxt(nodes_path, np.column_stack([node_ids, lat, lng]), delimiter=",",
+               fmt=["%d", "%.7f", "%.7f"], header="id,lat,lng", comments="")
+    np.savetxt(edges_path, np.column_stack([sources, targets]), delimiter=",",
+               fmt="%d", header="source,target", comments="")
+    return nodes_path, edges_path
+
+
+def time_queries(graph: RoadGraph, pairs) -> np.ndarray:
+    timings = []
+    for start_lat, start_lng, end_lat, end_lng in pairs:
+        started = time.perf_counter()
+        graph.route(start_lat, start_lng, end_lat, end_lng)
+        timings.append((time.perf_counter() - started) * 1000)
+    return np.array(timings)
+
+
+def query_pairs(size: int, count: int, span_cells: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    span = min(span_cells, size - 1)
+    start = rng.integers(0, size - span, size=(count, 2))
+    end = start + span
+    to_degrees = np.array([40.0, -100.0])
+    return np.column_stack([start * SPACING_DEGREES + to_degrees, end * SPACING_DEGREES + to_degrees])
+
+
+def run(size: int, queries: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        nodes_path, edges_path = write_csv(directory, size)
+        write_seconds = time.perf_counter() - started
+        cache_dir = os.path.join(directory, "graph-cache")
+
+        parsed = RoadGraph.load(nodes_path, edges_path, cache_dir=cache_dir)
+        cached = RoadGraph.load(nodes_path, edges_path, cache_dir=cache_dir)
+        assert cached.loaded_from == "cache"
+
+        results = {
+            "nodes": cached.node_count,
+            "directed_edges": cached.edge_count,
+            "csv_write_s": write_seconds,
+            "csv_load_s": parsed.load_seconds,
+            "cached_load_s": cached.load_seconds,
+            "memory_mb": cached.memory_bytes() / 1e6,
+        }
+        for label, span in (("short", 10), ("long", size - 1)):
+            count = queries if label == "short" else max(1, queries // 10)
+            timings = time_queries(cached, query_pairs(size, count, span))
+            results[f"{label}_p50_ms"] = float(np.percentile(timings, 50))
+            results[f"{label}_p95_ms"] = float(np.percentile(timings, 95))
+        results["avg_snap_ms"] = cached.stats()["avg_snap_ms"]
+        results["avg_expanded_nodes"] = cached.stats()["avg_expanded_nodes"]
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1000,
+                        help="lattice side; 1000 gives 1M nodes and about 3.6M directed edges")
+    parser.add_argument("--queries", type=int, default=100, help="short queries (long queries run a tenth)")
+    args = parser.parse_args()
+    for name, value in run(args.size, args.queries).items():
+        print(f"{name:>20}: {value:,.3f}" if isinstance(value, float) else f"{name:>20}: {value:,}")
+
+
+if __name__ == "__main__":
+    main()
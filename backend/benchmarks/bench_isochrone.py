@@ -0,0 +1,99 @@
+"""Isochrone latency against brute-force point-to-point routing.
+
+For each budget, one bounded expansion from the origin (grid and graph)
+is timed together with tracing its outline. The brute-force figure routes
+from the origin to a sample of the cells the isochrone covers, one search
+each, and scales that up to every cell. That is what clients did before
+the endpoint existed. Grid pairs use the Python search over lib.rs's grid
+(dstar_lite), since the WASM build is optional. Cache hits go through
+NavigationService.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_isochrone --graph-size 100
+"""
+import argparse
+import asyncio
+import math
+import time
+
+import numpy as np
+
+from app.models.navigation import Coordinates
+from app.services.dstar_lite import DStarLite, GridSpace
+from app.services.navigation_service import NavigationService
+from app.services.path_engine import PathEngine
+from app.services.road_graph import RoadGraph
+from app.services.route_executor import RouteExecutor
+from app.utils.cell_outline import cell_centers, cell_polygons
+from app.utils.geo import EARTH_RADIUS_M
+from benchmarks.bench_graph import synthetic_network
+
+GRID_STEPS = (10, 50, 200)
+GRAPH_METERS = (1000, 3000, 8000)
+BRUTE_FORCE_SAMPLE = 50
+
+
+def _timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def run(graph_size: int = 100, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    engine = PathEngine()
+    engine.graph = RoadGraph.from_arrays(*synthetic_network(graph_size, seed))
+    graph = engine.graph
+    origin = Coordinates(lat=float(np.median(graph.lat)), lng=float(np.median(graph.lng)))
+    source = graph.snap(origin.lat, origin.lng)[0]
+    results = {}
+    for mode, budgets in (("grid", GRID_STEPS), ("graph", GRAPH_METERS)):
+        for max_cost in budgets:
+            resolution = engine.grid_resolution if mode == "grid" else 0.001
+            (cells, _, _, expanded, _, _), expand_ms = _timed(
+                lambda: engine.calculate_isochrone(origin.lat, origin.lng, max_cost, mode, resolution))
+            tolerance_m = math.radians(resolution) * EARTH_RADIUS_M
+            _, outline_ms = _timed(lambda: cell_polygons(cells, resolution, tolerance_m))
+            sample = cells[rng.choice(len(cells), size=min(BRUTE_FORCE_SAMPLE, len(cells)), replace=False)]
+            if mode == "grid":
+                space = GridSpace(resolution)
+                start = space.node(origin.lat, origin.lng)
+                _, sample_ms = _timed(lambda: [DStarLite(space, start, tuple(cell)).compute()
+                                               for cell in sample.tolist()])
+            else:
+                targets = cell_centers(sample, resolution)
+                nodes = [graph.snap(lat, lng)[0] for lat, lng in targets.tolist()]
+                _, sample_ms = _timed(lambda: [graph.shortest_path(source, node) for node in nodes])
+            brute_force_ms = sample_ms / len(sample) * len(cells)
+            results[f"{mode}_{max_cost}"] = {
+                "cells": len(cells),
+                "expanded": expanded,
+                "expansion_ms": expand_ms,
+                "outline_ms": outline_ms,
+                "brute_force_ms": brute_force_ms,
+                "speedup": brute_force_ms / (expand_ms + outline_ms),
+            }
+
+    service = NavigationService()
+    service.executor = RouteExecutor(lambda: engine, mode="inline")
+    service.graph_configured = True
+    asyncio.run(service.compute_isochrone(origin, GRAPH_METERS[-1]))
+    hit = asyncio.run(service.compute_isochrone(origin, GRAPH_METERS[-1]))
+    results["cache_hit_ms"] = hit.calculation_time_ms
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--graph-size", type=int, default=100, help="street grid is graph-size x graph-size")
+    args = parser.parse_args()
+    for name, value in run(args.graph_size).items():
+        if isinstance(value, dict):
+            print(f"{name:>12}: " + ", ".join(f"{key}={value:.1f}" for key, value in value.items()))
+        else:
+            print(f"{name:>12}: {value:.3f}")
+
+
+if __name__ == "__main__":
+    main()
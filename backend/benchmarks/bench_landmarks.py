@@ -0,0 +1,97 @@
+"""Long-distance query latency: ALT landmarks against haversine A*.
+
+Builds the synthetic street lattice from bench_graph, precomputes landmark
+distances, and routes corner-to-corner and random long trips with both
+heuristics on the same memory-mapped data. Reports preprocessing cost,
+expanded nodes and latency percentiles.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_landmarks --size 1000 --landmarks 16
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.landmarks import Landmarks
+from app.services.road_graph import RoadGraph
+from benchmarks.bench_graph import write_csv
+
+
+def long_trips(graph: RoadGraph, count: int, seed: int = 2):
+    """Node pairs at least half the network's extent apart"""
+    rng = np.random.default_rng(seed)
+    extent = max(graph.lat.max() - graph.lat.min(), graph.lng.max() - graph.lng.min())
+    pairs = []
+    while len(pairs) < count:
+        a, b = rng.integers(0, graph.node_count, size=2)
+        if max(abs(graph.lat[a] - graph.lat[b]), abs(graph.lng[a] - graph.lng[b])) >= extent / 2:
+            pairs.append((int(a), int(b)))
+    return pairs
+
+
+def time_mode(graph: RoadGraph, pairs, mode: str):
+    timings, expanded, lengths = [], [], []
+    for source, target in pairs:
+        started = time.perf_counter()
+        result = graph.shortest_path(source, target, mode)
+        timings.append((time.perf_counter() - started) * 1000)
+        if result is not None:
+            expanded.append(result[2])
+            lengths.append(result[1])
+    return np.array(timings), np.mean(expanded), lengths
+
+
+def run(size: int, landmark_count: int, queries: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        nodes_path, edges_path = write_csv(directory, size)
+        cache_dir = os.path.join(directory, "graph-cache")
+        graph = RoadGraph.load(nodes_path, edges_path, cache_dir=cache_dir)
+
+        started = time.perf_counter()
+        Landmarks.build(graph.offsets, graph.targets, graph.weights,
+                        count=landmark_count, symmetric=graph.symmetric).save(cache_dir, graph.signature())
+        preprocess_seconds = time.perf_counter() - started
+        # Reload the way a worker would: graph and landmarks memory-mapped from the cache
+        started = time.perf_counter()
+        graph = RoadGraph.load(nodes_path, edges_path, cache_dir=cache_dir)
+        load_seconds = time.perf_counter() - started
+
+        pairs = long_trips(graph, queries)
+        results = {
+            "nodes": graph.node_count,
+            "directed_edges": graph.edge_count,
+            "landmarks": graph.landmarks.count,
+            "preprocess_s": preprocess_seconds,
+            "landmark_mb": graph.landmarks.memory_bytes() / 1e6,
+            "mmap_load_s": load_seconds,
+        }
+        baseline_lengths = None
+        for mode in ("astar", "alt"):
+            timings, expanded, lengths = time_mode(graph, pairs, mode)
+            if baseline_lengths is None:
+                baseline_lengths = lengths
+            else:
+                assert np.allclose(lengths, baseline_lengths), "ALT must return the same shortest paths"
+            results[f"{mode}_p50_ms"] = float(np.percentile(timings, 50))
+            results[f"{mode}_p95_ms"] = float(np.percentile(timings, 95))
+            results[f"{mode}_avg_expanded"] = float(expanded)
+        results["speedup_p50"] = results["astar_p50_ms"] / results["alt_p50_ms"]
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1000, help="lattice side (size * size nodes)")
+    parser.add_argument("--landmarks", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=10)
+    args = parser.parse_args()
+    for name, value in run(args.size, args.landmarks, args.queries).items():
+        print(f"{name:>18}: {value:,.3f}" if isinstance(value, float) else f"{name:>18}: {value:,}")
+
+
+if __name__ == "__main__":
+    main()
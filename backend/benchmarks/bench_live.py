@@ -0,0 +1,101 @@
+"""Live re-routing: incremental repair against a full replan after every update.
+
+A traveller walks along its route; before each step a few cells (grid) or
+edges (graph) on the route just ahead are closed. The incremental search
+(D* Lite, as used by /navigation/live) moves its start and repairs; the
+replan builds a fresh search over the same closures and solves it from
+scratch. Both must agree on the remaining distance.
+
+The grid is lib.rs's 4-connected grid at ROUTE_GRID_RESOLUTION; the graph
+is a synthetic street grid (see bench_graph).
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_live --steps 50 --graph-size 100
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from app.services.dstar_lite import DStarLite, GraphSpace, GridSpace
+from app.services.road_graph import RoadGraph
+from benchmarks.bench_graph import synthetic_network
+
+DEFAULT_STEPS = 50
+
+
+def _close_ahead(space, search, path, rng, count: int, lookahead: int = 10):
+    """Close `count` random cells or edges on the next `lookahead` steps of `path`.
+
+    The traveller's next cell stays open: a closed start is unreachable, and on
+    the unbounded grid an unreachable search never ends.
+    """
+    changes = []
+    candidates = list(range(2, min(lookahead, len(path) - 2) + 1))
+    for i in rng.choice(candidates, size=min(count, len(candidates)), replace=False):
+        if isinstance(space, GridSpace):
+            changes += space.set_blocked(path[i], True)
+        else:
+            changes += space.set_edge_blocked(path[i], path[i + 1], True)
+    search.update_edges(changes)
+
+
+def walk(space, start, goal, steps: int, closures: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    search = DStarLite(space, start, goal)
+    search.compute()
+    repair_ms, replan_ms, repair_expanded, replan_expanded = [], [], [], []
+    for _ in range(steps):
+        path = search.path()
+        if path is None or len(path) < 4:
+            break
+        started = time.perf_counter()
+        _close_ahead(space, search, path, rng, closures)
+        search.move_start(path[1])
+        repair_expanded.append(search.compute())
+        repair_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        replan = DStarLite(space, path[1], goal)
+        replan_expanded.append(replan.compute())
+        replan_ms.append((time.perf_counter() - started) * 1000)
+        # Both are inf once the closures cut the destination off
+        assert math.isclose(replan.distance, search.distance), "repair and replan disagree"
+    return {
+        "updates": len(repair_ms),
+        "repair_p50_ms": float(np.percentile(repair_ms, 50)),
+        "repair_p95_ms": float(np.percentile(repair_ms, 95)),
+        "replan_p50_ms": float(np.percentile(replan_ms, 50)),
+        "replan_p95_ms": float(np.percentile(replan_ms, 95)),
+        "repair_expanded_mean": float(np.mean(repair_expanded)),
+        "replan_expanded_mean": float(np.mean(replan_expanded)),
+        "speedup": float(np.sum(replan_ms) / np.sum(repair_ms)),
+    }
+
+
+def run(steps: int = DEFAULT_STEPS, graph_size: int = 100, closures: int = 2, resolution: float = 0.01,
+        seed: int = 0) -> dict:
+    grid = GridSpace(resolution)
+    results = {"grid": walk(grid, grid.node(40.0, -100.0), grid.node(40.6, -99.4), steps, closures, seed)}
+    graph = RoadGraph.from_arrays(*synthetic_network(graph_size, seed))
+    space = GraphSpace(graph)
+    start = space.node(float(graph.lat.min()), float(graph.lng.min()))
+    goal = space.node(float(graph.lat.max()), float(graph.lng.max()))
+    results["graph"] = walk(space, start, goal, steps, closures, seed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=DEFAULT_STEPS, help="position updates per walk")
+    parser.add_argument("--graph-size", type=int, default=100, help="street grid is graph-size x graph-size")
+    parser.add_argument("--closures", type=int, default=2, help="cells or edges closed per update")
+    args = parser.parse_args()
+    for name, value in run(args.steps, args.graph_size, args.closures).items():
+        print(f"{name:>5}: " + ", ".join(f"{key}={value:.2f}" for key, value in value.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""In-process HTTP load generator for POST /api/v1/navigation/route.
+
+Requests go through the whole ASGI app (middleware, rate limiter, auth,
+validation, service, encoding) over httpx's ASGI transport, so no network
+or server process is involved. A fixed number of concurrent clients send
+requests back to back for the given duration, drawing trips from a pool
+so both cache hits and misses occur. Reports throughput and latency
+percentiles.
+
+The rate limiter is lifted for the duration of the run, since one client
+address would otherwise be throttled at MAX_REQUESTS_PER_MINUTE.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_load --concurrency 16 --duration 10
+"""
+import argparse
+import asyncio
+import time
+from contextlib import contextmanager
+
+import httpx
+import numpy as np
+
+from benchmarks.common import latency_summary
+
+API_KEY_HEADERS = {"X-API-Key": "development_key"}
+
+
+@contextmanager
+def unlimited_rate():
+    from app.middleware.rate_limiter import rate_limiter
+    saved = rate_limiter.requests_per_minute, rate_limiter.api_key_requests_per_minute
+    rate_limiter.requests_per_minute, rate_limiter.api_key_requests_per_minute = 10 ** 12, 0
+    try:
+        yield
+    finally:
+        rate_limiter.requests_per_minute, rate_limiter.api_key_requests_per_minute = saved
+
+
+def trip_pool(size: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    starts = rng.uniform([30.0, -120.0], [45.0, -75.0], size=(size, 2))
+    ends = starts + rng.uniform(-0.5, 0.5, size=(size, 2))
+    return [{"start": {"lat": a[0], "lng": a[1]}, "end": {"lat": b[0], "lng": b[1]}}
+            for a, b in zip(starts.tolist(), ends.tolist())]
+
+
+async def client_loop(client: httpx.AsyncClient, trips: list, deadline: float, seed: int,
+                      timings: list, statuses: dict, path: str) -> None:
+    rng = np.random.default_rng(seed)
+    while time.perf_counter() < deadline:
+        trip = trips[int(rng.integers(len(trips)))]
+        started = time.perf_counter()
+        response = await client.post(path, json=trip, headers=API_KEY_HEADERS)
+        timings.append((time.perf_counter() - started) * 1000)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def generate_load(app, concurrency: int, duration: float, trips: list,
+                        path: str = "/api/v1/navigation/route") -> dict:
+    timings, statuses = [], {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # One warm-up request so engine construction is not counted
+        await client.post(path, json=trips[0], headers=API_KEY_HEADERS)
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(client_loop(client, trips, deadline, seed, timings, statuses, path)
+                               for seed in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "duration_s": elapsed,
+        "requests": len(timings),
+        "throughput_rps": len(timings) / elapsed,
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+        "latency": latency_summary(timings),
+    }
+
+
+def run(concurrency: int = 16, duration: float = 10.0, unique_trips: int = 200) -> dict:
+    from main import app
+    with unlimited_rate():
+        return asyncio.run(generate_load(app, concurrency, duration, trip_pool(unique_trips)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16, help="clients sending requests back to back")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--unique-trips", type=int, default=200,
+                        help="size of the trip pool; smaller pools mean more cache hits")
+    args = parser.parse_args()
+    for name, value in run(args.concurrency, args.duration, args.unique_trips).items():
+        print(f"{name:>15}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Many-to-many matrix latency for each mode, against a loop of single routes.
+
+Sources and destinations are scattered over a synthetic street grid (see
+bench_graph). The graph mode runs one one-to-many search per source; the
+"pairwise" figure routes every pair separately the way clients had to
+before the matrix endpoint, and is only measured at the smallest size.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_matrix --sizes 10 100 500 --graph-size 100
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.models.navigation import Coordinates
+from app.services.path_engine import PathEngine
+from app.services.road_graph import RoadGraph
+from benchmarks.bench_graph import SPACING_DEGREES, synthetic_network
+
+DEFAULT_SIZES = (10, 100, 500)
+
+
+def random_points(count: int, graph_size: int, rng: np.random.Generator) -> np.ndarray:
+    extent = (graph_size - 1) * SPACING_DEGREES
+    return np.column_stack([40.0 + rng.random(count) * extent, -100.0 + rng.random(count) * extent])
+
+
+def time_call(function, repeats: int) -> float:
+    """Best of `repeats` runs, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best
+
+
+def pairwise_ms(engine: PathEngine, points: np.ndarray) -> float:
+    coordinates = [Coordinates(lat=float(lat), lng=float(lng)) for lat, lng in points]
+    pairs = [(start, end) for start in coordinates for end in coordinates]
+    started = time.perf_counter()
+    engine.calculate_paths(pairs)
+    return (time.perf_counter() - started) * 1000
+
+
+def run(sizes=DEFAULT_SIZES, graph_size: int = 100, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    engine = PathEngine()
+    engine.graph = RoadGraph.from_arrays(*synthetic_network(graph_size, seed))
+    results = {}
+    for size in sizes:
+        points = random_points(size, graph_size, rng)
+        # The graph searches dominate large sizes; one pass is enough there
+        repeats = 5 if size <= 100 else 1
+        row = {}
+        for mode in ("haversine", "grid", "graph"):
+            row[f"{mode}_ms"] = time_call(lambda: engine.calculate_matrix(points, points, mode), repeats)
+        row["cells_per_second_graph"] = size * size / (row["graph_ms"] / 1000)
+        if size == min(sizes):
+            row["pairwise_graph_ms"] = pairwise_ms(engine, points)
+        results[f"{size}x{size}"] = row
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="square matrix sizes to measure")
+    parser.add_argument("--graph-size", type=int, default=100, help="street grid is graph-size x graph-size")
+    args = parser.parse_args()
+    for name, value in run(args.sizes, args.graph_size).items():
+        print(f"{name:>9}: " + ", ".join(f"{key}={value:.1f}" for key, value in value.items()))
+
+
+if __name__ == "__main__":
+    main()
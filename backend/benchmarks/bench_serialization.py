@@ -0,0 +1,100 @@
+"""Per-request CPU cost of route serialization, before and after RoutePath.
+
+"before" is the original pipeline: per-point Coordinates models in a
+RouteResponse returned through `response_model`, which FastAPI validates and
+re-serializes. "after" returns the array-backed RoutePath encoded by its
+fast JSON writer. Both go through a real FastAPI app via TestClient.
+
+`run_formats` times the encoders alone for every wire format.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_serialization
+"""
+import argparse
+import time
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+
+from app.models.navigation import RouteResponse
+from app.models.route_path import RoutePath
+from app.utils.route_encoding import FORMAT_MEDIA_TYPES, encode_route
+
+POINT_COUNTS = (50, 1000, 10000)
+
+
+def build_app(route: RoutePath) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/before", response_model=RouteResponse)
+    async def before():
+        return route.to_response()
+
+    @app.get("/after", response_model=RouteResponse)
+    async def after():
+        return Response(content=route.to_json(), media_type="application/json")
+
+    return app
+
+
+def cpu_per_request_ms(client: TestClient, path: str, iterations: int) -> float:
+    client.get(path)  # warm up
+    started = time.process_time()
+    for _ in range(iterations):
+        client.get(path)
+    return (time.process_time() - started) / iterations * 1000
+
+
+def run(iterations: int = 50) -> list:
+    results = []
+    rng = np.random.default_rng(0)
+    for count in POINT_COUNTS:
+        route = RoutePath(rng.uniform(-80, 80, size=(count, 2)), 1.0)
+        with TestClient(build_app(route)) as client:
+            assert client.get("/before").json() == client.get("/after").json()
+            repeats = max(5, iterations * 50 // count)
+            before = cpu_per_request_ms(client, "/before", repeats)
+            after = cpu_per_request_ms(client, "/after", repeats)
+        results.append({
+            "points": count,
+            "before_cpu_ms": before,
+            "after_cpu_ms": after,
+            "speedup": before / after if after else float("inf"),
+        })
+    return results
+
+
+def run_formats(point_counts=POINT_COUNTS + (100000,), min_seconds: float = 0.2) -> dict:
+    """Encode time in milliseconds per route, by format and path length"""
+    results = {}
+    rng = np.random.default_rng(0)
+    for count in point_counts:
+        route = RoutePath(rng.uniform(-80, 80, size=(count, 2)), 1.0)
+        row = {}
+        for fmt in FORMAT_MEDIA_TYPES:
+            encoded = encode_route(route, fmt)
+            iterations, started = 0, time.perf_counter()
+            while time.perf_counter() - started < min_seconds:
+                encode_route(route, fmt)
+                iterations += 1
+            row[fmt] = {"encode_ms": (time.perf_counter() - started) / iterations * 1000, "bytes": len(encoded)}
+        results[str(count)] = row
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50,
+                        help="requests per size for 50-point paths; scaled down for longer paths")
+    args = parser.parse_args()
+    print(f"{'points':>8} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for row in run(args.iterations):
+        print(f"{row['points']:>8} {row['before_cpu_ms']:>10.3f} {row['after_cpu_ms']:>10.3f} "
+              f"{row['speedup']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
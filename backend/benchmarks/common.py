@@ -0,0 +1,31 @@
+"""Helpers shared by the benchmark modules."""
+from typing import Dict, Sequence
+
+import numpy as np
+
+from app.models.navigation import Coordinates
+
+# Fixed trips so runs on different commits measure the same work
+SHORT_PAIRS = [
+    (Coordinates(lat=40.7128, lng=-74.0060), Coordinates(lat=40.7580, lng=-73.9855)),  # Manhattan
+    (Coordinates(lat=51.5074, lng=-0.1278), Coordinates(lat=51.5380, lng=-0.0810)),  # London
+    (Coordinates(lat=35.6762, lng=139.6503), Coordinates(lat=35.7100, lng=139.8107)),  # Tokyo
+]
+CONTINENTAL_PAIRS = [
+    (Coordinates(lat=40.7128, lng=-74.0060), Coordinates(lat=37.7749, lng=-122.4194)),  # NYC - SF
+    (Coordinates(lat=47.6062, lng=-122.3321), Coordinates(lat=25.7617, lng=-80.1918)),  # Seattle - Miami
+]
+
+
+def latency_summary(timings_ms: Sequence[float]) -> Dict[str, float]:
+    """Mean and p50/p95/p99 of a list of latencies in milliseconds"""
+    timings = np.asarray(timings_ms, dtype=np.float64)
+    if len(timings) == 0:
+        return {"count": 0}
+    return {
+        "count": len(timings),
+        "mean_ms": float(timings.mean()),
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "p99_ms": float(np.percentile(timings, 99)),
+    }
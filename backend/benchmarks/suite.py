@@ -0,0 +1,134 @@
+"""Run the benchmark suite and save the results as JSON for run-to-run comparison.
+
+Covers the path engine on its own (WASM and Python, short and continental
+trips), the route cache (hit and miss), serialization of every wire format
+at several path lengths, and in-process HTTP load on /navigation/route.
+The road-graph, ALT landmark, distance-matrix, live re-routing and
+isochrone benchmarks are included with --graph-size.
+
+Run from the backend directory:
+
+    python -m benchmarks.suite --output results/main.json
+    python -m benchmarks.suite --output results/branch.json --compare results/main.json
+
+With --compare, metrics that got worse by more than --threshold are listed
+and the exit status is 1, so the suite can gate CI.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+from typing import Dict, Iterator, List, Tuple
+
+from benchmarks import bench_cache, bench_engine, bench_load, bench_serialization
+
+FORMAT_VERSION = 1
+# Metrics where a larger value is an improvement; everything else timed is lower-is-better
+_HIGHER_IS_BETTER = ("throughput_rps", "speedup")
+_LOWER_IS_BETTER = ("_ms", "_s", "_mb")
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "format": FORMAT_VERSION,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(quick: bool = False, graph_size: int = 0) -> dict:
+    results = {
+        "engine": bench_engine.run(repeats=3 if quick else 20),
+        "cache": bench_cache.run(requests=50 if quick else 500),
+        "serialization": bench_serialization.run_formats(min_seconds=0.02 if quick else 0.2),
+        "load": bench_load.run(concurrency=4 if quick else 16, duration=1.0 if quick else 10.0),
+    }
+    if graph_size:
+        from benchmarks import bench_graph, bench_isochrone, bench_landmarks, bench_live, bench_matrix
+        results["graph"] = bench_graph.run(graph_size, queries=20 if quick else 100)
+        results["landmarks"] = bench_landmarks.run(graph_size, landmark_count=4 if quick else 16,
+                                                   queries=5 if quick else 10)
+        results["matrix"] = bench_matrix.run((10, 100) if quick else bench_matrix.DEFAULT_SIZES, graph_size)
+        results["live"] = bench_live.run(steps=10 if quick else bench_live.DEFAULT_STEPS, graph_size=graph_size)
+        results["isochrone"] = bench_isochrone.run(graph_size)
+    return {"environment": environment(), "results": results}
+
+
+def flatten(value, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, float(value)
+
+
+def direction(metric: str) -> int:
+    """+1 if larger is better, -1 if smaller is better, 0 if the metric is not a performance figure"""
+    name = metric.rsplit(".", 1)[-1]
+    if any(marker in name for marker in _HIGHER_IS_BETTER):
+        return 1
+    if name.endswith(_LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> List[Dict[str, float]]:
+    """Metrics present in both runs whose change exceeds `threshold` in the bad direction"""
+    before = dict(flatten(baseline["results"]))
+    regressions = []
+    for metric, value in flatten(current["results"]):
+        sign = direction(metric)
+        old = before.get(metric)
+        if not sign or not old:
+            continue
+        change = (value - old) / old
+        if -sign * change > threshold:
+            regressions.append({"metric": metric, "baseline": old, "current": value, "change": change})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change counted as a regression")
+    parser.add_argument("--quick", action="store_true", help="short runs, for smoke-testing the suite")
+    parser.add_argument("--graph-size", type=int, default=0, help="also benchmark a size x size road graph")
+    args = parser.parse_args()
+
+    report = run(quick=args.quick, graph_size=args.graph_size)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Results written to {args.output}")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        for row in regressions:
+            print(f"REGRESSION {row['metric']}: {row['baseline']:.4g} -> {row['current']:.4g} "
+                  f"({row['change']:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from app.core.startup import startup_timer
 from fastapi import FastAPI, Request, status, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -11,17 +12,19 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.core.errors import (
     http_exception_handler,
     validation_exception_handler,
-    generic_exception_handler
+    generic_exception_handler,
+    service_overloaded_handler,
+    ServiceOverloadedError
 )
 from fastapi.security import APIKeyHeader
-from starlette.status import HTTP_429_TOO_MANY_REQUESTS
-import time
-from datetime import datetime, timedelta
-import asyncio
 from app.middleware.rate_limiter import rate_limiter as rate_limiter_middleware
 from app.middleware.error_handler import setup_error_handlers
+from app.middleware.telemetry import TelemetryMiddleware
+from app.services.service_locator import navigation_service
+from app.utils.logger import log_pipeline, setup_logger
 
 settings = get_settings()
+setup_logger()
 
 app = FastAPI(
     title="NaviWasm API",
@@ -56,56 +59,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(TelemetryMiddleware)
 
 # Add a root endpoint
 @app.get("/")
 async def root():
     return {"message": "Welcome to NaviWasm API", "docs": "/api/docs"}
 
-# Simple in-memory rate limiter store
-rate_limit_store = {}
-RATE_LIMIT = 100  # requests per minute
-
-async def rate_limiter(request: Request):
-    client_ip = request.client.host
-    now = datetime.now()
-    
-    # Initialize or clean up old entries
-    if client_ip not in rate_limit_store:
-        rate_limit_store[client_ip] = []
-    
-    # Remove entries older than 1 minute
-    rate_limit_store[client_ip] = [
-        timestamp for timestamp in rate_limit_store[client_ip] 
-        if timestamp > now - timedelta(minutes=1)
-    ]
-    
-    # Check if rate limit is exceeded
-    if len(rate_limit_store[client_ip]) >= RATE_LIMIT:
-        raise HTTPException(
-            status_code=HTTP_429_TOO_MANY_REQUESTS,
-            detail="Rate limit exceeded"
-        )
-    
-    # Add current request timestamp
-    rate_limit_store[client_ip].append(now)
-    
-    # Schedule cleanup for old entries
-    asyncio.create_task(cleanup_old_rate_limits())
-    
-    return True
-
-async def cleanup_old_rate_limits():
-    await asyncio.sleep(60)  # Wait 1 minute
-    now = datetime.now()
-    for ip in list(rate_limit_store.keys()):
-        rate_limit_store[ip] = [
-            timestamp for timestamp in rate_limit_store[ip] 
-            if timestamp > now - timedelta(minutes=1)
-        ]
-        if not rate_limit_store[ip]:
-            del rate_limit_store[ip]
-
 # Include API router with rate limiter
 app.include_router(
     api_router, 
@@ -113,10 +73,25 @@ app.include_router(
     dependencies=[Depends(rate_limiter_middleware.check_rate_limit)]
 )
 
+@app.on_event("startup")
+async def start_route_engine():
+    navigation_service.start(settings.ENGINE_WARMUP)
+    startup_timer.mark("app_startup")
+
+@app.on_event("shutdown")
+async def shutdown_route_workers():
+    navigation_service.shutdown()
+    # Last, so records logged while shutting down are still written
+    log_pipeline.stop()
+
 # Setup error handlers
 setup_error_handlers(app)
 
 # Add exception handlers
 app.add_exception_handler(StarletteHTTPException, http_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
-app.add_exception_handler(Exception, generic_exception_handler)
\ No newline at end of file
+app.add_exception_handler(ServiceOverloadedError, service_overloaded_handler)
+app.add_exception_handler(Exception, generic_exception_handler)
+
+# Time from the first app import until the module finished loading
+startup_timer.mark("app_import")
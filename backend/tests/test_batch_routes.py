@@ -0,0 +1,32 @@
+from fastapi.testclient import TestClient
+from main import app
+from app.core.config import get_settings
+from app.services.service_locator import navigation_service
+
+client = TestClient(app)
+HEADERS = {"X-API-Key": "development_key"}
+
+def test_batch_routes_match_single_routes():
+    pairs = [
+        {"start": {"lat": 40.7128, "lng": -74.0060}, "end": {"lat": 37.7749, "lng": -122.4194}},
+        {"start": {"lat": 51.5074, "lng": -0.1278}, "end": {"lat": 48.8566, "lng": 2.3522}},
+        {"start": {"lat": 40.7128, "lng": -74.0060}, "end": {"lat": 37.7749, "lng": -122.4194}},
+    ]
+    navigation_service.cache.clear()
+    response = client.post("/api/v1/navigation/routes", json={"routes": pairs}, headers=HEADERS)
+    assert response.status_code == 200
+    routes = response.json()["routes"]
+    assert len(routes) == 3
+    assert len(navigation_service.cache) == 2
+
+    single = client.post("/api/v1/navigation/route", json=pairs[1], headers=HEADERS).json()
+    assert single["path"] == routes[1]["path"]
+    assert routes[0]["path"] == routes[2]["path"]
+    assert routes[0]["path"][0] == pairs[0]["start"]
+    assert routes[0]["path"][-1] == pairs[0]["end"]
+
+def test_batch_routes_rejects_oversized_batch(monkeypatch):
+    monkeypatch.setattr(get_settings(), "MAX_BATCH_ROUTES", 1)
+    pair = {"start": {"lat": 0, "lng": 0}, "end": {"lat": 1, "lng": 1}}
+    response = client.post("/api/v1/navigation/routes", json={"routes": [pair, pair]}, headers=HEADERS)
+    assert response.status_code == 400
@@ -0,0 +1,24 @@
+import asyncio
+from main import app
+from benchmarks.bench_load import generate_load, trip_pool, unlimited_rate
+from benchmarks.suite import compare, direction
+
+def report(**results):
+    return {"environment": {}, "results": results}
+
+def test_compare_flags_only_regressions_past_threshold():
+    baseline = report(load={"throughput_rps": 1000.0, "latency": {"p99_ms": 10.0, "count": 500}},
+                      engine={"python_short": {"p50_ms": 1.0}})
+    current = report(load={"throughput_rps": 850.0, "latency": {"p99_ms": 10.5, "count": 9000}},
+                     engine={"python_short": {"p50_ms": 0.5}})
+    regressions = compare(baseline, current, threshold=0.1)
+    assert [row["metric"] for row in regressions] == ["load.throughput_rps"]
+    assert direction("load.latency.count") == 0
+    assert direction("landmarks.speedup_p50") == 1 and direction("landmarks.alt_p50_ms") == -1
+
+def test_load_generator_reports_percentiles():
+    with unlimited_rate():
+        result = asyncio.run(generate_load(app, concurrency=2, duration=0.2, trips=trip_pool(5)))
+    assert result["requests"] > 0 and result["status_codes"] == {"200": result["requests"]}
+    assert result["latency"]["p50_ms"] <= result["latency"]["p99_ms"]
+    assert result["throughput_rps"] > 0
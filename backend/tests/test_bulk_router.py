@@ -0,0 +1,128 @@
+import asyncio
+import importlib.util
+import io
+import json
+import os
+import numpy as np
+import pytest
+from app.services.bulk_router import (RECORD_HEADER, FLAG_INVALID, BulkRouter, read_rows, resume_point,
+                                      run_state)
+from app.services.navigation_service import NavigationService
+from app.services.path_engine import PathEngine
+from app.services.route_executor import RouteExecutor
+
+CLI_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "cli", "cli.py")
+CSV = "id,start_lat,start_lng,end_lat,end_lng\n" + "".join(
+    f"trip-{i},40.{i:03d},-74.0,41.0,-73.{i:03d}\n" for i in range(10)) + "broken,x,1,2,3\n"
+
+def bulk_router(batch_size=3):
+    engine = PathEngine()
+    engine.graph = None
+    service = NavigationService(RouteExecutor(lambda: engine, mode="inline"))
+    return BulkRouter(service, batch_size=batch_size, max_in_flight=2)
+
+def run(router, text, fmt="ndjson", **kwargs):
+    output = io.BytesIO()
+    stats = asyncio.run(router.run(read_rows(io.StringIO(text), "csv"), output, fmt, **kwargs))
+    return output, stats
+
+def test_csv_and_ndjson_inputs():
+    rows = list(read_rows(io.StringIO(CSV), "csv"))
+    assert [row.row for row in rows] == list(range(11))
+    assert rows[0].id == "trip-0" and rows[0].start.lat == 40.0 and rows[-1].error
+    bare = list(read_rows(io.StringIO("1,2,3,4\n"), "csv"))
+    assert bare[0].end.lng == 4.0
+    lines = '{"start": {"lat": 1, "lng": 2}, "end": {"lat": 3, "lng": 4}, "id": 7}\n\n{"start_lat": 1}\n'
+    parsed = list(read_rows(io.StringIO(lines), "ndjson"))
+    assert parsed[0].id == "7" and parsed[0].end.lat == 3 and parsed[1].error
+    # A bad first row of a headerless file is an invalid row, not a header
+    headerless = list(read_rows(io.StringIO("abc,1,2,3\n1,2,3,4\n"), "csv"))
+    assert headerless[0].error and headerless[1].row == 1 and headerless[1].start.lat == 1.0
+    with pytest.raises(ValueError):
+        list(read_rows(io.StringIO("start_lat,start_lng,end_lat,lng\n"), "csv"))
+
+def test_records_are_written_in_input_order():
+    output, stats = run(bulk_router(), CSV)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record["row"] for record in records] == list(range(11))
+    assert records[3]["id"] == "trip-3" and records[3]["lat"][0] == pytest.approx(40.003)
+    assert "error" in records[-1]
+    assert (stats.rows, stats.routed, stats.invalid) == (11, 10, 1)
+
+def test_binary_records():
+    output, _ = run(bulk_router(), CSV, fmt="f32")
+    data, offset, rows = output.getvalue(), 0, []
+    while offset < len(data):
+        row, count, flags = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        points = np.frombuffer(data, dtype="<f4", count=count * 2, offset=offset).reshape(-1, 2)
+        offset += points.nbytes
+        rows.append((row, flags))
+    assert rows[-1] == (10, FLAG_INVALID) and [row for row, _ in rows] == list(range(11))
+
+def test_resumed_run_matches_an_uninterrupted_one():
+    full, _ = run(bulk_router(), CSV)
+    checkpoints = []
+    first, _ = run(bulk_router(), CSV, checkpoint=lambda rows, position: checkpoints.append((rows, position)),
+                   checkpoint_rows=4)
+    rows, position = checkpoints[1]
+    assert checkpoints[-1] == (11, len(first.getvalue()))
+
+    # A run killed after its second checkpoint, with a half-written record after it
+    output = io.BytesIO(first.getvalue()[:position] + b'{"row": 9, "id"')
+    output.truncate(position)
+    output.seek(position)
+    stats = asyncio.run(bulk_router().run(read_rows(io.StringIO(CSV), "csv"), output, "ndjson",
+                                          start_row=rows))
+    assert stats.routed + stats.invalid == 11 - rows
+
+    def records(data):
+        return [{**json.loads(line), "calculation_time_ms": None} for line in data.splitlines()]
+    assert records(output.getvalue()) == records(full.getvalue())
+
+def test_checkpoint_is_ignored_when_its_output_is_gone(tmp_path):
+    output_path = str(tmp_path / "out.ndjson")
+    run_state = {"input": "in.csv", "input_format": "csv", "format": "ndjson"}
+    state = {**run_state, "rows": 3, "output_bytes": 120}
+    assert resume_point(None, run_state, output_path) == (0, 0)
+    assert resume_point({**state, "format": "f32"}, run_state, output_path) == (0, 0)
+    with pytest.raises(ValueError):
+        resume_point(state, run_state, output_path)
+    with open(output_path, "wb") as f:
+        f.write(b"x" * 100)
+    with pytest.raises(ValueError):
+        resume_point(state, run_state, output_path)
+    with open(output_path, "ab") as f:
+        f.write(b"x" * 30)
+    assert resume_point(state, run_state, output_path) == (3, 120)
+
+def test_checkpoint_is_ignored_when_the_input_changed(tmp_path):
+    input_path, output_path = tmp_path / "trips.csv", str(tmp_path / "out.ndjson")
+    input_path.write_text(CSV)
+    with open(output_path, "wb") as f:
+        f.write(b"x" * 120)
+    state = {**run_state(str(input_path), "csv", "ndjson"), "rows": 3, "output_bytes": 120}
+    assert resume_point(state, run_state(str(input_path), "csv", "ndjson"), output_path) == (3, 120)
+    input_path.write_text("start_lat,start_lng,end_lat,end_lng\n" + CSV.split("\n", 1)[1])
+    assert resume_point(state, run_state(str(input_path), "csv", "ndjson"), output_path) == (0, 0)
+    assert run_state("-", "csv", "ndjson") == {"input": "-", "input_format": "csv", "format": "ndjson"}
+
+def test_cli_bulk_runs_from_the_repository_root(tmp_path, monkeypatch):
+    from click.testing import CliRunner
+    from app.core.config import get_settings
+    spec = importlib.util.spec_from_file_location("bulk_cli", CLI_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # The root .env is shared with the frontend, whose keys Settings does not know
+    (tmp_path / ".env").write_text("API_KEY=development_key\nREACT_APP_API_BASE_URL=http://localhost:8000\n")
+    (tmp_path / "trips.csv").write_text(CSV)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("USE_WASM", "false")
+    get_settings.cache_clear()
+    try:
+        result = CliRunner().invoke(module.cli, ["bulk", "trips.csv", "routes.ndjson", "--workers", "1"])
+    finally:
+        get_settings.cache_clear()
+    assert result.exit_code == 0, result.output
+    records = [json.loads(line) for line in (tmp_path / "routes.ndjson").read_text().splitlines()]
+    assert len(records) == 11 and "error" in records[-1]
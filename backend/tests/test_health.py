@@ -0,0 +1,28 @@
+import time
+from fastapi.testclient import TestClient
+from main import app
+from app.services.service_locator import navigation_service
+
+HEADERS = {"X-API-Key": "development_key"}
+
+def test_readiness_follows_engine_start_up():
+    client = TestClient(app)
+    navigation_service.warm_up_mode = "background"
+    if not navigation_service.executor.ready:
+        response = client.get("/api/v1/health/ready", headers=HEADERS)
+        assert response.status_code == 503
+        assert response.json()["status"] == "starting"
+
+    # Entering the client runs the startup hook, which begins warm-up
+    with TestClient(app) as started:
+        deadline = time.monotonic() + 10
+        while not navigation_service.executor.ready and time.monotonic() < deadline:
+            time.sleep(0.01)
+        response = started.get("/api/v1/health/ready", headers=HEADERS)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["engine_loaded"] is True
+        assert "app_import" in body["startup_ms"]
+        assert "engine_warm_up" in body["startup_ms"]
+        # Liveness never depends on the engine
+        assert started.get("/api/v1/health", headers=HEADERS).json() == {"status": "healthy"}
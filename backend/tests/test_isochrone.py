@@ -0,0 +1,108 @@
+import asyncio
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from app.models.navigation import Coordinates
+from app.services.isochrone import expand_grid, road_cells
+from app.services.navigation_service import NavigationService
+from app.services.path_engine import PathEngine
+from app.services.road_graph import RoadGraph
+from app.services.route_executor import RouteExecutor
+from app.services.search_budget import SearchBudget
+from app.utils.cell_outline import cell_centers, cell_polygons, outline_rings
+from benchmarks.bench_graph import synthetic_network
+
+client = TestClient(app)
+HEADERS = {"X-API-Key": "development_key"}
+
+def test_grid_expansion_is_the_step_diamond():
+    cells, costs, reached_cost, reason = expand_grid((-10000, 4000), 20)
+    assert reason is None and reached_cost == 20
+    assert len(cells) == 2 * 20 * 20 + 2 * 20 + 1
+    np.testing.assert_array_equal(costs, np.abs(cells - (-10000, 4000)).sum(axis=1))
+
+def test_exhausted_grid_expansion_keeps_whole_layers():
+    cells, costs, reached_cost, reason = expand_grid((0, 0), 20, SearchBudget(max_expansions=100))
+    assert reason == "expansions" and reached_cost < 20
+    assert len(cells) <= 100 and len(cells) == 2 * reached_cost ** 2 + 2 * reached_cost + 1
+
+def test_outlines():
+    # A ring of cells: the hole is filled in
+    ring = [(x, y) for x in range(3) for y in range(3) if (x, y) != (1, 1)]
+    np.testing.assert_array_equal(outline_rings(ring)[0], [[0, 0], [3, 0], [3, 3], [0, 3], [0, 0]])
+    # Cells touching at a corner share one ring; separate cells get one each, largest first
+    assert len(outline_rings([(0, 0), (1, 1)])) == 1
+    rings = outline_rings([(0, 0), (5, 5), (6, 5)])
+    assert [len(r) for r in rings] == [5, 5] and rings[0][:, 0].max() == 7
+    # Truncation toward zero makes cell 0 span (-resolution, resolution)
+    np.testing.assert_allclose(cell_polygons([(0, 0)], 0.01)[0], [[-0.01, -0.01], [-0.01, 0.01], [0.01, 0.01],
+                                                                  [0.01, -0.01], [-0.01, -0.01]])
+    centers = cell_centers([(0, 0), (-9985, 4010), (3, -2)], 0.01)
+    assert [(int(lng * 100), int(lat * 100)) for lat, lng in centers] == [(0, 0), (-9985, 4010), (3, -2)]
+
+def test_road_cells_match_shortest_paths():
+    graph = RoadGraph.from_arrays(*synthetic_network(30))
+    cells, costs, expanded, reached_cost, reason = road_cells(graph, 40.03, -99.97, 2000, 0.001)
+    assert reason is None and reached_cost == 2000 and costs.max() <= 2000
+    source, leg = graph.snap(40.03, -99.97)
+    nodes, distances, _ = graph.reachable(source, 2000 - leg)
+    assert expanded == len(nodes) and np.all(np.diff(distances) >= 0)
+    for node, distance in zip(nodes[::25].tolist(), distances[::25].tolist()):
+        assert graph.shortest_path(source, node)[1] == pytest.approx(distance)
+    # Every reached node lies in a covered cell no costlier than the node
+    node_cells = {(int(lng / 0.001), int(lat / 0.001)): cost
+                  for lat, lng, cost in zip(graph.lat[nodes], graph.lng[nodes], distances + leg)}
+    covered = {tuple(cell): cost for cell, cost in zip(cells.tolist(), costs.tolist())}
+    assert all(covered[cell] <= cost + 1e-6 for cell, cost in node_cells.items())
+
+    _, _, expanded, reached_cost, reason = road_cells(graph, 40.03, -99.97, 2000, 0.001,
+                                                      SearchBudget(max_expansions=10))
+    assert reason == "expansions" and expanded == 10 and reached_cost < 2000
+
+def test_graph_isochrones_are_cached_by_quantized_origin():
+    engine = PathEngine()
+    engine.graph = RoadGraph.from_arrays(*synthetic_network(30))
+    service = NavigationService()
+    service.executor = RouteExecutor(lambda: engine, mode="inline")
+    service.graph_configured = True
+    first = asyncio.run(service.compute_isochrone(Coordinates(lat=40.0302, lng=-99.9702), 2004))
+    assert first.mode == "graph" and first.max_cost == 2000 and not first.cached
+    nearby = asyncio.run(service.compute_isochrone(Coordinates(lat=40.0308, lng=-99.9709), 2009))
+    assert nearby.cached and nearby.cells is first.cells
+    # The expansion runs from the center of the origin's output cell
+    assert service._isochrone_key(Coordinates(lat=40.0308, lng=-99.9709), 2009, "graph")[1:3] == \
+        pytest.approx((40.0305, -99.9705))
+    degraded = asyncio.run(service.compute_isochrone(Coordinates(lat=40.03, lng=-99.97), 1500,
+                                                     budget=SearchBudget(max_expansions=10)))
+    assert degraded.degraded and degraded.reached_cost < 1500
+    # The cell cap applies to a copy of the caller's budget
+    unlimited = SearchBudget()
+    asyncio.run(service.compute_isochrone(Coordinates(lat=40.03, lng=-99.97), 100, budget=unlimited))
+    assert unlimited.max_expansions == 0
+    assert service.isochrone_stats()["cache"]["entries"] == 2
+
+def test_isochrone_endpoint():
+    body = {"origin": {"lat": 40.0, "lng": -100.0}, "max_cost": 5}
+    response = client.post("/api/v1/navigation/isochrone", json=body, headers=HEADERS)
+    assert response.status_code == 200
+    assert response.headers["X-Isochrone-Mode"] == "grid" and response.headers["X-Expanded"] == "61"
+    isochrone = response.json()
+    # The default tolerance straightens the step outline into a diamond
+    assert isochrone["cell_count"] == 61 and len(isochrone["polygons"]) == 1
+    assert len(isochrone["polygons"][0]) == 5 and isochrone["polygons"][0][0] == isochrone["polygons"][0][-1]
+
+    # Same cell and whole steps: a cache hit
+    body = {"origin": {"lat": 40.004, "lng": -100.002}, "max_cost": 5.9, "output": "cells"}
+    response = client.post("/api/v1/navigation/isochrone", json=body, headers=HEADERS)
+    assert response.headers["X-Cache"] == "hit"
+    cells = response.json()["cells"]
+    assert len(cells["lat"]) == 61 and sorted(cells["cost"])[-1] == 5
+
+    exact = {"origin": {"lat": 40.0, "lng": -100.0}, "max_cost": 5, "tolerance_m": 0}
+    outline = client.post("/api/v1/navigation/isochrone", json=exact, headers=HEADERS).json()["polygons"][0]
+    assert len(outline) == 4 * 2 * 5 + 1 + 4
+
+    graph = client.post("/api/v1/navigation/isochrone", json={**exact, "mode": "graph"}, headers=HEADERS)
+    assert graph.status_code == 400
+    assert client.get("/api/v1/metrics", headers=HEADERS).json()["isochrone"]["isochrones"] >= 3
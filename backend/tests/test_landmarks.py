@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from app.services.landmarks import Landmarks, dijkstra
+from app.services.road_graph import RoadGraph, haversine_m
+from benchmarks.bench_graph import synthetic_network, write_csv
+
+def build_graph(size=20, **kwargs):
+    graph = RoadGraph.from_arrays(*synthetic_network(size), **kwargs)
+    graph.landmarks = Landmarks.build(graph.offsets, graph.targets, graph.weights,
+                                      count=4, symmetric=graph.symmetric)
+    return graph
+
+def one_way_graph(size=15):
+    node_ids, lat, lng, sources, targets = synthetic_network(size)
+    index = {node: i for i, node in enumerate(node_ids.tolist())}
+    src = np.array([index[n] for n in sources.tolist()])
+    dst = np.array([index[n] for n in targets.tolist()])
+    base = haversine_m(lat[src], lng[src], lat[dst], lng[dst])
+    # Both directions exist but with different lengths, so d(u, v) != d(v, u)
+    rng = np.random.default_rng(2)
+    lengths = np.concatenate([base * rng.uniform(1, 3, len(base)), base * rng.uniform(1, 3, len(base))])
+    graph = RoadGraph.from_arrays(node_ids, lat, lng, np.concatenate([sources, targets]),
+                                  np.concatenate([targets, sources]), lengths, bidirectional=False)
+    graph.landmarks = Landmarks.build(graph.offsets, graph.targets, graph.weights, count=4, symmetric=False)
+    return graph
+
+@pytest.mark.parametrize("make_graph", [build_graph, one_way_graph])
+def test_alt_finds_shortest_paths(make_graph):
+    graph = make_graph()
+    assert graph.search_mode == "alt"
+    rng = np.random.default_rng(7)
+    for source, target in rng.integers(0, graph.node_count, size=(25, 2)):
+        expected = dijkstra(graph.offsets, graph.targets, graph.weights, int(source))[target]
+        result = graph.shortest_path(int(source), int(target))
+        if not np.isfinite(expected):
+            assert result is None
+        else:
+            assert np.isclose(result[1], expected)
+
+def test_landmark_bound_is_admissible():
+    graph = build_graph()
+    target = 123
+    exact = dijkstra(graph.offsets, graph.targets, graph.weights, target)
+    bound = graph.heuristic(target, "alt")
+    assert all(bound(node) <= exact[node] + 1e-6 for node in range(graph.node_count))
+
+def test_alt_expands_fewer_nodes_than_haversine():
+    graph = build_graph(size=40)
+    source = graph.snap(graph.lat.min(), graph.lng.min())[0]
+    target = graph.snap(graph.lat.max(), graph.lng.max())[0]
+    _, astar_length, astar_expanded = graph.shortest_path(source, target, "astar")
+    _, alt_length, alt_expanded = graph.shortest_path(source, target, "alt")
+    assert np.isclose(alt_length, astar_length)
+    assert alt_expanded < astar_expanded / 2
+
+def test_landmarks_are_memory_mapped_for_matching_graph_only(tmp_path):
+    nodes_path, edges_path = write_csv(str(tmp_path), 10)
+    cache_dir = str(tmp_path / "cache")
+    graph = RoadGraph.load(nodes_path, edges_path, cache_dir=cache_dir)
+    assert graph.landmarks is None and graph.search_mode == "astar"
+
+    Landmarks.build(graph.offsets, graph.targets, graph.weights, count=3).save(cache_dir, graph.signature())
+    reloaded = RoadGraph.load(nodes_path, edges_path, cache_dir=cache_dir)
+    assert reloaded.search_mode == "alt"
+    assert reloaded.landmarks.count == 3
+    assert isinstance(reloaded.landmarks.from_landmarks.base, np.memmap)
+
+    with pytest.raises(ValueError):
+        RoadGraph.load(nodes_path, edges_path, cache_dir=str(tmp_path / "empty"), search="alt")
+    other = RoadGraph.load(nodes_path, edges_path, cache_dir=cache_dir, bidirectional=False)
+    assert other.landmarks is None
+
+def test_landmarks_skip_disconnected_nodes():
+    node_ids, lat, lng, sources, targets = synthetic_network(10)
+    # Node 999 has no edges at all
+    graph = RoadGraph.from_arrays(np.append(node_ids, 999), np.append(lat, 41.0), np.append(lng, -99.0),
+                                  sources, targets)
+    isolated = int(np.searchsorted(graph.node_ids, 999))
+    landmarks = Landmarks.build(graph.offsets, graph.targets, graph.weights, count=4)
+    assert isolated not in landmarks.nodes.tolist()
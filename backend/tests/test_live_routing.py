@@ -0,0 +1,161 @@
+import collections
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from main import app
+from app.models.navigation import Coordinates
+from app.services.dstar_lite import DStarLite, GridSpace
+from app.services.live_routing import LiveRouteSession, LiveSessionError, LiveSessionLimitError, LiveSessionManager
+from app.services.road_graph import RoadGraph
+from app.services.search_budget import SearchBudget
+from benchmarks.bench_graph import synthetic_network
+
+client = TestClient(app)
+HEADERS = {"X-API-Key": "development_key"}
+START, END = Coordinates(lat=40.0, lng=-100.0), Coordinates(lat=40.1, lng=-99.85)
+
+def bfs_distance(blocked, start, goal, margin=10):
+    """Reference grid distance, searched inside the start/goal box plus a margin"""
+    low = (min(start[0], goal[0]) - margin, min(start[1], goal[1]) - margin)
+    high = (max(start[0], goal[0]) + margin, max(start[1], goal[1]) + margin)
+    seen, queue = {start: 0}, collections.deque([start])
+    while queue:
+        x, y = node = queue.popleft()
+        if node == goal:
+            return seen[node]
+        for neighbor in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if (neighbor not in seen and neighbor not in blocked
+                    and low[0] <= neighbor[0] <= high[0] and low[1] <= neighbor[1] <= high[1]):
+                seen[neighbor] = seen[node] + 1
+                queue.append(neighbor)
+    return float("inf")
+
+def test_grid_repairs_match_a_fresh_search():
+    rng = np.random.default_rng(1)
+    space = GridSpace()
+    start, goal = space.node(START.lat, START.lng), space.node(END.lat, END.lng)
+    search = DStarLite(space, start, goal)
+    search.compute()
+    for _ in range(20):
+        path = search.path()
+        for i in rng.choice(np.arange(2, len(path) - 1), size=min(2, len(path) - 3), replace=False):
+            search.update_edges(space.set_blocked(path[i], True))
+        if rng.random() < 0.3 and space.blocked:
+            search.update_edges(space.set_blocked(next(iter(space.blocked)), False))
+        search.move_start(path[1])
+        search.compute()
+        assert search.distance == bfs_distance(space.blocked, path[1], goal)
+        repaired = search.path()
+        assert repaired[0] == path[1] and repaired[-1] == goal
+        assert len(repaired) - 1 == search.distance and not set(repaired) & space.blocked
+
+def test_graph_edge_closures_are_repaired_and_reopened():
+    graph = RoadGraph.from_arrays(*synthetic_network(20))
+    session = LiveRouteSession("1", Coordinates(lat=40.0, lng=-100.0), Coordinates(lat=40.018, lng=-99.982),
+                               "graph", graph, 0.01, 0, 100)
+    first = session.update()
+    source, target = session.search.start, session.search.goal
+    assert first["cost"] == pytest.approx(graph.shortest_path(source, target)[1])
+    path = session.search.path()
+    edge = [int(graph.node_ids[path[1]]), int(graph.node_ids[path[2]])]
+
+    closed = session.update(block_edges=[edge])
+    assert closed["cost"] > first["cost"]
+    fresh = DStarLite(session.space, source, target)
+    fresh.compute()
+    assert closed["cost"] == pytest.approx(fresh.distance)
+    # Symmetric networks close both directions
+    assert (path[2], path[1]) in session.space.blocked_edges
+    reopened = session.update(unblock_edges=[edge])
+    assert reopened["cost"] == pytest.approx(first["cost"]) and reopened["lat"][0] == 40.0
+
+    with pytest.raises(LiveSessionError):
+        session.update(block_edges=[[1, 2]])
+
+def test_invalid_updates_change_nothing():
+    session = LiveRouteSession("1", START, END, "grid", None, 0.01, 0, 2)
+    first = session.update()
+    with pytest.raises(LiveSessionError):
+        session.update(position=Coordinates(lat=40.05, lng=-99.9), block=[END])
+    with pytest.raises(LiveSessionError):
+        session.update(block=[Coordinates(lat=40.05, lng=-99.9 + i / 100) for i in range(3)])
+    assert session.position == START and session.space.blocked_count == 0
+    assert session.update()["cost"] == first["cost"]
+
+def walls_around(cell):
+    x, y = cell
+    # Cell centres; truncation toward zero puts (x - 0.5) / 100 in cell x for negative x
+    return [Coordinates(lat=(y + dy + 0.5) / 100, lng=(x + dx - 0.5) / 100)
+            for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))]
+
+def test_search_state_is_bounded():
+    # The search runs backward from the destination, so an enclosed destination is settled at once...
+    session = LiveRouteSession("1", START, END, "grid", None, 0.01, 2000, 10)
+    route = session.update(block=walls_around(session.search.goal))
+    assert not route["reachable"] and not route["degraded"]
+
+    # ...but an enclosed start leaves the rest of the unbounded grid to explore until max_states
+    session = LiveRouteSession("1", START, END, "grid", None, 0.01, 2000, 10)
+    route = session.update(block=walls_around(session.search.start))
+    assert route["degraded"] and route["reason"] == "states" and not route["reachable"]
+    assert len(session.search) < 3000
+    route = session.update(budget=SearchBudget(max_expansions=10))
+    assert route["reason"] in ("states", "expansions")
+
+def test_search_state_is_bounded_across_sessions():
+    manager = LiveSessionManager(max_states=100_000, max_total_states=3000)
+    other = manager.open(START, END, "grid")
+    manager.update(other)
+    session = manager.open(START, END, "grid")
+    route = manager.update(session, block=walls_around(session.search.start))
+    # The enclosed start would explore until the per-session cap; the shared one stops it first
+    assert route["reason"] == "states"
+    held = len(session.search) + len(other.search)
+    assert 3000 <= held < 4000 and session.grant is None
+    with pytest.raises(LiveSessionLimitError):
+        manager.open(START, END, "grid")
+    manager.close(session)
+    assert manager.update(manager.open(START, END, "grid"))["reachable"]
+
+def test_session_limit_and_idle_eviction():
+    manager = LiveSessionManager(max_sessions=2, idle_seconds=60)
+    first = manager.open(START, END, "grid")
+    second = manager.open(START, END, "grid")
+    with pytest.raises(LiveSessionLimitError):
+        manager.open(START, END, "grid")
+    with pytest.raises(LiveSessionError):
+        manager.open(START, END, "walk")
+    manager.touch(first)
+    assert manager.evict_idle(now=second.last_active + 60) == 1
+    assert not manager.touch(second) and manager.touch(first)
+    assert manager.stats()["evicted_idle"] == 1 and manager.stats()["rejected"] == 1
+    manager.close(first)
+    assert len(manager) == 0
+
+def test_websocket_session():
+    with client.websocket_connect("/api/v1/navigation/live", headers=HEADERS) as websocket:
+        websocket.send_json({"type": "start", "start": START.model_dump(), "end": END.model_dump(), "mode": "grid"})
+        route = websocket.receive_json()
+        assert route["type"] == "route" and route["reachable"] and route["cost"] == 25
+        assert (route["lat"][0], route["lng"][-1]) == (40.0, -99.85)
+
+        websocket.send_json({"type": "update", "position": {"lat": 40.0, "lng": -99.99},
+                             "block": [{"lat": 40.0, "lng": -99.98}]})
+        route = websocket.receive_json()
+        assert route["cost"] == 24 and route["lng"][0] == -99.99
+
+        websocket.send_json({"type": "update", "block": [END.model_dump()]})
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_text("not json")
+        assert websocket.receive_json()["type"] == "error"
+        assert client.get("/api/v1/metrics", headers=HEADERS).json()["live_sessions"]["active"] >= 1
+
+def test_websocket_requires_api_key():
+    with pytest.raises(WebSocketDisconnect) as error:
+        with client.websocket_connect("/api/v1/navigation/live") as websocket:
+            websocket.receive_json()
+    assert error.value.code == 1008
+    with client.websocket_connect("/api/v1/navigation/live?api_key=development_key") as websocket:
+        websocket.send_json({"type": "update"})
+        assert "start" in websocket.receive_json()["detail"]
@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import pytest
+from logging.handlers import RotatingFileHandler, WatchedFileHandler
+from pydantic import ValidationError
+from app.core.config import Settings
+from app.utils.logger import (DroppingQueueHandler, JsonFormatter, LogPipeline, RateLimitFilter, log_pipeline,
+                              setup_logger)
+
+class ListHandler(logging.Handler):
+    def __init__(self, delay=0.0, gate=None):
+        super().__init__()
+        self.records = []
+        self.delay = delay
+        self.gate = gate
+
+    def emit(self, record):
+        if self.gate is not None:
+            self.gate.wait()
+        time.sleep(self.delay)
+        self.records.append(record)
+
+@pytest.fixture
+def pipeline():
+    pipeline = LogPipeline()
+    yield pipeline
+    pipeline.stop()
+
+def test_error_storm_is_rate_limited_per_message_type(pipeline):
+    target = ListHandler()
+    pipeline.start([target], rate=1, burst=5)
+    logger = logging.getLogger("test.storm")
+    for i in range(1000):
+        logger.error("WASM execution error: %s", f"trap {i}")
+    logger.warning("A different message")
+    # Refill one token, then the next record reports what was dropped before it
+    time.sleep(1.05)
+    logger.error("WASM execution error: %s", "trap after")
+    pipeline.stop()
+
+    messages = [record.getMessage() for record in target.records]
+    assert messages[:5] == [f"WASM execution error: trap {i}" for i in range(5)]
+    assert "A different message" in messages
+    assert target.records[-1].suppressed == 995
+    stats = pipeline.stats()
+    assert stats["dropped_rate_limited"] == 995
+    assert list(stats["top_rate_limited"].values()) == [995]
+
+def test_full_queue_drops_instead_of_blocking():
+    gate = threading.Event()
+    target = ListHandler(gate=gate)
+    handler = DroppingQueueHandler(queue.Queue(maxsize=5))
+    logger = logging.getLogger("test.full")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        started = time.perf_counter()
+        for i in range(50):
+            logger.error("record %d", i)
+        assert time.perf_counter() - started < 0.1
+    finally:
+        logger.removeHandler(handler)
+        gate.set()
+    assert (handler.enqueued, handler.dropped) == (5, 45)
+    assert handler.queue.get_nowait().getMessage() == "record 0"
+
+def test_slow_writer_does_not_slow_callers(pipeline):
+    target = ListHandler(delay=0.02)
+    pipeline.start([target], rate=0)
+    logger = logging.getLogger("test.slow")
+    started = time.perf_counter()
+    for i in range(20):
+        logger.error("slow %d", i)
+    assert time.perf_counter() - started < 0.1
+    pipeline.stop()
+    assert len(target.records) == 20
+
+def test_json_records_keep_extras_and_tracebacks():
+    handler = DroppingQueueHandler(queue.Queue())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.getLogger("test.json").makeRecord(
+            "test.json", logging.ERROR, __file__, 1, "route %s failed", ("r1",), sys.exc_info(),
+            extra={"route_id": "r1"})
+    entry = json.loads(JsonFormatter().format(handler.prepare(record)))
+    assert entry["message"] == "route r1 failed" and entry["level"] == "ERROR"
+    assert entry["route_id"] == "r1"
+    assert "ValueError: boom" in entry["exception"]
+
+def test_rate_limit_can_be_disabled():
+    limit = RateLimitFilter(rate=0)
+    record = logging.LogRecord("x", logging.ERROR, __file__, 1, "same", (), None)
+    assert all(limit.filter(record) for _ in range(100))
+
+def test_forked_workers_append_to_the_log_file_without_rotating_it(tmp_path):
+    path = tmp_path / "app.log"
+    handler = RotatingFileHandler(path, maxBytes=200, backupCount=2)
+    handler.setFormatter(JsonFormatter())
+    log_pipeline.start([handler], rate=0)
+    try:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                targets = list(log_pipeline._targets)
+                logging.getLogger("test.fork").warning("from the worker " + "x" * 300)
+                log_pipeline.stop()
+                code = 0 if [type(target) for target in targets] == [WatchedFileHandler] else 2
+            finally:
+                os._exit(code)
+        assert os.waitpid(pid, 0)[1] == 0
+        log_pipeline.stop()
+        assert "from the worker" in path.read_text()
+        # Past maxBytes, but only the parent may roll the file over
+        assert not (tmp_path / "app.log.1").exists()
+    finally:
+        setup_logger()
+
+def test_unknown_log_level_is_rejected_by_settings():
+    assert Settings(LOG_LEVEL="debug").LOG_LEVEL == "DEBUG"
+    with pytest.raises(ValidationError):
+        Settings(LOG_LEVEL="FOO")
@@ -0,0 +1,94 @@
+import struct
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from app.models.matrix import DistanceMatrix
+from app.services.path_engine import PathEngine
+from app.services.road_graph import RoadGraph, haversine_m
+from app.services.search_budget import SearchBudget
+from benchmarks.bench_graph import synthetic_network
+
+client = TestClient(app)
+HEADERS = {"X-API-Key": "development_key"}
+POINTS = np.array([[40.001, -99.999], [40.02, -99.97], [40.05, -99.99], [40.06, -99.94]])
+
+def graph_engine():
+    engine = PathEngine()
+    engine.graph = RoadGraph.from_arrays(*synthetic_network(40))
+    return engine
+
+def test_graph_matrix_matches_single_searches():
+    engine = graph_engine()
+    graph = engine.graph
+    sources, destinations = POINTS[:3], POINTS[1:]
+    distances, mode, reason = engine.calculate_matrix(sources, destinations, "graph")
+    assert mode == "graph" and reason is None and distances.shape == (3, 3)
+    for i, (source_lat, source_lng) in enumerate(sources):
+        for j, (destination_lat, destination_lng) in enumerate(destinations):
+            source, source_leg = graph.snap(source_lat, source_lng)
+            target, target_leg = graph.snap(destination_lat, destination_lng)
+            _, length, _ = graph.shortest_path(source, target)
+            assert distances[i, j] == pytest.approx(length + source_leg + target_leg)
+
+def test_search_direction_does_not_change_the_result():
+    engine = graph_engine()
+    many, few = POINTS, POINTS[:1]
+    forward, _, _ = engine.calculate_matrix(few, many, "graph")
+    backward, _, _ = engine.calculate_matrix(many, few, "graph")
+    np.testing.assert_allclose(forward, backward.T)
+
+def test_exhausted_budget_leaves_rows_empty():
+    engine = graph_engine()
+    distances, _, reason = engine.calculate_matrix(POINTS, POINTS, "graph", SearchBudget(max_expansions=10))
+    assert reason == "expansions"
+    assert np.isnan(distances).all()
+
+def test_haversine_and_grid_matrices():
+    engine = PathEngine()
+    distances, mode, _ = engine.calculate_matrix(POINTS[:2], POINTS, "haversine")
+    assert mode == "haversine"
+    assert distances[1, 3] == pytest.approx(haversine_m(*POINTS[1], *POINTS[3]))
+
+    grid = PathEngine.grid_matrix(np.array([[40.005, -99.995]]), np.array([[40.035, -99.955]]), 0.01)
+    step_m = haversine_m(0.0, 0.0, 0.01, 0.0)
+    assert grid[0, 0] == pytest.approx((3 + 4 * np.cos(np.radians(40.02))) * step_m, rel=1e-6)
+
+def test_unknown_mode_is_rejected():
+    engine = PathEngine()
+    engine.graph = None
+    with pytest.raises(ValueError):
+        engine.calculate_matrix(POINTS, POINTS, "graph")
+    with pytest.raises(ValueError):
+        engine.calculate_matrix(POINTS, POINTS, "teleport")
+
+def test_missing_routes_serialize_as_null():
+    matrix = DistanceMatrix(np.array([[1.2346, np.nan]]), np.array([[0.1, np.nan]]), "graph", 1.0)
+    response = matrix.to_response()
+    assert response.distances_m == [[1.235, None]] and response.durations_s == [[0.1, None]]
+
+def test_matrix_endpoint_json_and_binary():
+    body = {"sources": [{"lat": lat, "lng": lng} for lat, lng in POINTS[:2]],
+            "destinations": [{"lat": lat, "lng": lng} for lat, lng in POINTS],
+            "mode": "haversine", "speed_kmh": 36}
+    response = client.post("/api/v1/navigation/matrix", json=body, headers=HEADERS)
+    assert response.status_code == 200
+    assert response.headers["X-Matrix-Mode"] == "haversine"
+    data = response.json()
+    distances = np.array(data["distances_m"])
+    assert distances.shape == (2, 4)
+    # 36 km/h is 10 m/s
+    np.testing.assert_allclose(np.array(data["durations_s"]), distances / 10, atol=1e-3)
+
+    binary = client.post("/api/v1/navigation/matrix?format=f64", json=body, headers=HEADERS)
+    rows, cols = struct.unpack_from("<II", binary.content)
+    values = np.frombuffer(binary.content, dtype="<f8", offset=8).reshape(2, rows, cols)
+    np.testing.assert_allclose(values[0], distances, atol=1e-3)
+
+def test_matrix_endpoint_limits():
+    square = {"sources": [{"lat": 40.0, "lng": -100.0}] * 501}
+    response = client.post("/api/v1/navigation/matrix", json=square, headers=HEADERS)
+    assert response.status_code == 400
+    response = client.post("/api/v1/navigation/matrix?format=polyline", json={"sources": square["sources"][:2]},
+                           headers=HEADERS)
+    assert response.status_code == 406
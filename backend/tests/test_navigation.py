@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
 from app.models.navigation import Coordinates
@@ -5,6 +6,7 @@ from main import app
 from app.services.navigation_service import NavigationService
 
 client = TestClient(app)
+HEADERS = {"X-API-Key": "development_key"}
 
 def test_calculate_route():
     # Test the API endpoint
@@ -13,7 +15,8 @@ def test_calculate_route():
         json={
             "start": {"lat": 40.7128, "lng": -74.0060},
             "end": {"lat": 37.7749, "lng": -122.4194}
-        }
+        },
+        headers=HEADERS
     )
     assert response.status_code == 200
     data = response.json()
@@ -27,7 +30,7 @@ def test_navigation_service():
     start = Coordinates(lat=40.7128, lng=-74.0060)
     end = Coordinates(lat=37.7749, lng=-122.4194)
     
-    result = await nav_service.calculate_route(start, end)
+    result = asyncio.run(nav_service.calculate_route(start, end))
     assert result.path is not None
     assert len(result.path) > 0
     assert result.calculation_time_ms > 0
\ No newline at end of file
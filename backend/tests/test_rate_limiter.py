@@ -0,0 +1,50 @@
+from app.middleware.rate_limiter import RateLimiter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_limit_within_window():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=3, clock=clock)
+    assert [limiter.allow("1.1.1.1") for _ in range(4)] == [True, True, True, False]
+    assert limiter.allow("2.2.2.2")
+    assert limiter.stats()["rejected"] == 1
+
+def test_sliding_window_weights_previous_window():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=10, clock=clock)
+    for _ in range(10):
+        assert limiter.allow("ip")
+    # Halfway through the next window half of the previous count still applies
+    clock.now += 90
+    assert sum(limiter.allow("ip") for _ in range(10)) == 5
+    # Two full windows later everything has aged out
+    clock.now += 120
+    assert sum(limiter.allow("ip") for _ in range(10)) == 10
+
+def test_api_key_limit_spans_ips():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=100, api_key_requests_per_minute=2, clock=clock)
+    assert limiter.allow("1.1.1.1", "key")
+    assert limiter.allow("2.2.2.2", "key")
+    assert not limiter.allow("3.3.3.3", "key")
+    assert limiter.allow("3.3.3.3", "other-key")
+    # A rejected request is not charged to the IP either
+    assert limiter.ip_windows["3.3.3.3"].current == 1
+
+def test_idle_clients_are_swept():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=10, api_key_requests_per_minute=10, idle_seconds=120,
+                          sweep_interval_seconds=30, clock=clock)
+    limiter.allow("idle", "idle-key")
+    clock.now += 100
+    limiter.allow("active")
+    clock.now += 50
+    limiter.allow("active")
+    assert set(limiter.ip_windows) == {"active"}
+    assert not limiter.api_key_windows
+    assert limiter.stats()["swept_clients"] == 2
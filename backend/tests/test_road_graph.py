@@ -0,0 +1,104 @@
+import heapq
+import time
+import numpy as np
+from app.models.navigation import Coordinates
+from app.services.path_engine import PathEngine
+from app.services.road_graph import RoadGraph, haversine_m
+from benchmarks.bench_graph import synthetic_network, write_csv
+
+def build_graph(size=15, seed=0):
+    return RoadGraph.from_arrays(*synthetic_network(size, seed))
+
+def dijkstra_length(graph, source, target):
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u == target:
+            return d
+        if d > dist[u]:
+            continue
+        for i in range(graph.offsets[u], graph.offsets[u + 1]):
+            v, nd = int(graph.targets[i]), d + float(graph.weights[i])
+            if nd < dist.get(v, float("inf")):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return None
+
+def test_csr_layout_matches_edges():
+    graph = RoadGraph.from_arrays(
+        np.array([30, 10, 20]), np.array([0.0, 0.0, 0.0]), np.array([0.002, 0.0, 0.001]),
+        np.array([10, 20, 10]), np.array([20, 30, 99]))
+    # Node ids are sorted (10, 20, 30); the edge to unknown node 99 is dropped
+    assert graph.node_count == 3
+    assert graph.offsets.tolist() == [0, 1, 3, 4]
+    assert sorted(graph.targets[1:3].tolist()) == [0, 2]
+    assert np.isclose(graph.weights[0], haversine_m(0.0, 0.0, 0.0, 0.001), rtol=1e-6)
+
+def test_snap_finds_nearest_node():
+    graph = build_graph()
+    rng = np.random.default_rng(3)
+    for lat, lng in zip(rng.uniform(40.0, 40.03, 20), rng.uniform(-100.0, -99.97, 20)):
+        node, distance = graph.snap(lat, lng)
+        brute = haversine_m(lat, lng, graph.lat, graph.lng)
+        assert node == int(np.argmin(brute))
+        assert np.isclose(distance, brute.min())
+
+def test_snap_rejects_points_off_the_network():
+    assert build_graph().snap(10.0, 10.0) is None
+
+def test_snap_near_the_poles_is_fast_and_exact():
+    # Longitude cells are a few meters wide up here; the search must not walk them one by one.
+    # The last query is nearest to a node across the pole
+    lat = np.array([89.9, 89.92, -89.98])
+    lng = np.array([10.0, -170.0, 0.0])
+    graph = RoadGraph.from_arrays(np.arange(3), lat, lng, np.array([0]), np.array([1]))
+    started = time.perf_counter()
+    for query_lat, query_lng in ((89.93, 30.0), (89.95, 179.9), (89.9, 10.01), (-89.98, 180.0)):
+        found = graph.snap(query_lat, query_lng)
+        brute = haversine_m(query_lat, query_lng, lat, lng)
+        assert found[0] == int(np.argmin(brute)) and np.isclose(found[1], brute.min())
+    assert graph.snap(89.9, 100.0) is None
+    assert time.perf_counter() - started < 1.0
+
+def test_astar_matches_dijkstra():
+    graph = build_graph()
+    rng = np.random.default_rng(5)
+    for source, target in rng.integers(0, graph.node_count, size=(20, 2)):
+        expected = dijkstra_length(graph, int(source), int(target))
+        result = graph.shortest_path(int(source), int(target))
+        if expected is None:
+            assert result is None
+            continue
+        nodes, length, _ = result
+        assert np.isclose(length, expected)
+        assert nodes[0] == source and nodes[-1] == target
+
+def test_route_keeps_exact_endpoints():
+    graph = build_graph()
+    points = graph.route(40.0005, -99.9995, 40.025, -99.975)
+    assert points[0].tolist() == [40.0005, -99.9995]
+    assert points[-1].tolist() == [40.025, -99.975]
+    assert len(points) > 10
+    assert graph.stats()["queries"] == 1
+
+def test_csv_load_is_cached_as_memory_mapped_arrays(tmp_path):
+    nodes_path, edges_path = write_csv(str(tmp_path), 10)
+    cache_dir = str(tmp_path / "cache")
+    parsed = RoadGraph.load(nodes_path, edges_path, cache_dir=cache_dir)
+    cached = RoadGraph.load(nodes_path, edges_path, cache_dir=cache_dir)
+    assert (parsed.loaded_from, cached.loaded_from) == ("csv", "cache")
+    assert np.array_equal(parsed.targets, cached.targets)
+    assert np.allclose(parsed.route(40.0, -100.0, 40.015, -99.985),
+                       cached.route(40.0, -100.0, 40.015, -99.985))
+
+def test_path_engine_routes_on_graph_first():
+    engine = PathEngine()
+    engine.graph = build_graph()
+    on_network, off_network = engine.calculate_paths([
+        (Coordinates(lat=40.0, lng=-100.0), Coordinates(lat=40.02, lng=-99.98)),
+        (Coordinates(lat=10.0, lng=10.0), Coordinates(lat=11.0, lng=11.0)),
+    ])
+    assert len(on_network) > 20
+    assert engine.graph.stats()["failed_queries"] == 1
+    assert off_network[0].tolist() == [10.0, 10.0]
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from app.models.navigation import Coordinates
+from app.services.navigation_service import NavigationService
+from app.services.route_cache import RouteCache
+
+def test_lru_eviction_by_entry_count():
+    cache = RouteCache(max_entries=2, max_bytes=1000)
+    cache.put("a", 1, 10)
+    cache.put("b", 2, 10)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3, 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+def test_eviction_by_bytes():
+    cache = RouteCache(max_entries=100, max_bytes=100)
+    cache.put("a", 1, 60)
+    cache.put("b", 2, 60)
+    assert "a" not in cache
+    assert cache.current_bytes == 60
+    assert cache.put("huge", 3, 101) is False
+    assert cache.rejections == 1
+
+def test_ttl_expiry():
+    cache = RouteCache(max_entries=10, max_bytes=1000, ttl_seconds=0.01)
+    cache.put("a", 1, 10)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+    assert cache.current_bytes == 0
+
+def test_stats_counters():
+    cache = RouteCache(max_entries=10, max_bytes=1000)
+    cache.put("a", 1, 10)
+    cache.get("a")
+    cache.get("missing")
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["bytes"] == 10
+    assert stats["hit_rate"] == 0.5
+
+def test_grid_mode_reuses_route_within_cell():
+    service = NavigationService()
+    service.cache_key_mode = "grid"
+    first = asyncio.run(service.calculate_route(
+        Coordinates(lat=40.7128, lng=-74.0060), Coordinates(lat=37.7749, lng=-122.4194)))
+    second = asyncio.run(service.calculate_route(
+        Coordinates(lat=40.7151, lng=-74.0021), Coordinates(lat=37.7702, lng=-122.4111)))
+
+    assert service.cache.hits == 1
+    assert len(service.cache) == 1
+    assert (second.path[0].lat, second.path[0].lng) == (40.7151, -74.0021)
+    assert (second.path[-1].lat, second.path[-1].lng) == (37.7702, -122.4111)
+    assert [p.lat for p in first.path[1:-1]] == [p.lat for p in second.path[1:-1]]
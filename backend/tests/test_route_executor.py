@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.core.errors import ServiceOverloadedError
+from app.models.navigation import Coordinates
+from app.services.path_engine import PathEngine
+from app.services.route_executor import RouteExecutor
+
+class SlowEngine:
+    def thread_name(self):
+        return threading.current_thread().name
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+        return seconds
+
+def test_thread_mode_runs_off_event_loop():
+    executor = RouteExecutor(SlowEngine, mode="thread", workers=2)
+    name = asyncio.run(executor.run("thread_name"))
+    executor.shutdown()
+    assert name.startswith("route-worker")
+    assert executor.stats()["completed"] == 1
+
+def test_saturated_pool_rejects_with_overload_error():
+    executor = RouteExecutor(SlowEngine, mode="thread", workers=1, max_queue=1)
+
+    async def flood():
+        return await asyncio.gather(
+            *(executor.run("sleep", 0.05) for _ in range(4)), return_exceptions=True)
+
+    results = asyncio.run(flood())
+    executor.shutdown()
+    rejected = [r for r in results if isinstance(r, ServiceOverloadedError)]
+    assert len(rejected) == 2
+    assert executor.rejected == 2
+    assert executor.pending == 0
+
+def test_process_mode_computes_paths():
+    executor = RouteExecutor(PathEngine, mode="process", workers=1)
+    pairs = [(Coordinates(lat=0, lng=0), Coordinates(lat=1, lng=1))]
+    paths = asyncio.run(executor.run("calculate_paths", pairs))
+    executor.shutdown()
+    assert paths[0][-1].tolist() == [1.0, 1.0]
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        RouteExecutor(SlowEngine, mode="fibers")
+
+def test_background_warm_up_builds_engine_once():
+    built = []
+
+    def factory():
+        time.sleep(0.05)
+        built.append(1)
+        return SlowEngine()
+
+    executor = RouteExecutor(factory, mode="thread", workers=1)
+    assert not executor.ready
+    executor.warm_up()
+    # A request arriving mid warm-up waits for the same engine instead of building another
+    asyncio.run(executor.run("thread_name"))
+    executor.shutdown()
+    assert executor.ready
+    assert built == [1]
+
+def test_warm_up_failure_is_reported():
+    def factory():
+        raise RuntimeError("no engine")
+
+    executor = RouteExecutor(factory, mode="inline")
+    executor.warm_up(background=False)
+    assert not executor.ready
+    assert executor.warm_up_error == "no engine"
+
+@pytest.mark.parametrize("warm_up", [True, False])
+def test_engine_is_built_off_the_event_loop(warm_up):
+    def factory():
+        time.sleep(0.3)
+        return SlowEngine()
+
+    executor = RouteExecutor(factory, mode="thread", workers=1)
+    if warm_up:
+        executor.warm_up()
+
+    async def route_while_ticking():
+        gaps, route = [], asyncio.ensure_future(executor.run("thread_name"))
+        while not route.done():
+            tick = time.monotonic()
+            await asyncio.sleep(0.01)
+            gaps.append(time.monotonic() - tick)
+        return await route, max(gaps)
+
+    name, longest_gap = asyncio.run(route_while_ticking())
+    executor.shutdown()
+    assert name.startswith("route-worker")
+    assert longest_gap < 0.15
@@ -0,0 +1,127 @@
+import json
+import struct
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from app.models.navigation import Coordinates
+from app.models.route_path import RoutePath
+from app.utils.route_encoding import (decode_polyline, encode_polyline, encode_route, iter_route_chunks,
+                                      negotiate_format)
+
+client = TestClient(app)
+HEADERS = {"X-API-Key": "development_key"}
+ROUTE = {"start": {"lat": 40.7128, "lng": -74.0060}, "end": {"lat": 37.7749, "lng": -122.4194}}
+
+def test_polyline_matches_reference_encoding():
+    # Example from Google's polyline algorithm documentation
+    points = np.array([[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]])
+    encoded = encode_polyline(points)
+    assert encoded == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    np.testing.assert_allclose(decode_polyline(encoded), points)
+
+def test_negotiate_format():
+    assert negotiate_format(None) == "json"
+    assert negotiate_format("text/html, */*;q=0.8") == "json"
+    assert negotiate_format("application/json;q=0.5, application/vnd.naviwasm.path-f32") == "f32"
+    assert negotiate_format("application/json", "polyline") == "polyline"
+    with pytest.raises(ValueError):
+        negotiate_format(None, "xml")
+
+def test_formats_carry_the_same_path():
+    expected = client.post("/api/v1/navigation/route", json=ROUTE, headers=HEADERS).json()["path"]
+    expected = np.array([[p["lat"], p["lng"]] for p in expected])
+
+    columnar = client.post("/api/v1/navigation/route?format=columnar", json=ROUTE, headers=HEADERS)
+    assert columnar.headers["content-type"] == "application/vnd.naviwasm.columnar+json"
+    np.testing.assert_array_equal(np.column_stack([columnar.json()["lat"], columnar.json()["lng"]]), expected)
+
+    binary = client.post("/api/v1/navigation/route", json=ROUTE,
+                         headers={**HEADERS, "Accept": "application/vnd.naviwasm.path-f64"})
+    assert int(binary.headers["X-Point-Count"]) == len(expected)
+    np.testing.assert_array_equal(np.frombuffer(binary.content, dtype="<f8").reshape(-1, 2), expected)
+
+    polyline = client.post("/api/v1/navigation/route?format=polyline", json=ROUTE, headers=HEADERS)
+    np.testing.assert_allclose(decode_polyline(polyline.json()["polyline"]), expected, atol=1e-5)
+
+def test_batch_binary_layout():
+    other = {"start": {"lat": 0, "lng": 0}, "end": {"lat": 1, "lng": 1}}
+    response = client.post("/api/v1/navigation/routes?format=f32",
+                           json={"routes": [ROUTE, other]}, headers=HEADERS)
+    count, first, second = struct.unpack_from("<3I", response.content)
+    assert count == 2
+    points = np.frombuffer(response.content, dtype="<f4", offset=12)
+    assert len(points) == 2 * (first + second)
+
+def test_unknown_format_is_not_acceptable():
+    response = client.post("/api/v1/navigation/route?format=xml", json=ROUTE, headers=HEADERS)
+    assert response.status_code == 406
+
+def test_route_path_json_matches_response_schema():
+    route = RoutePath(np.array([[40.7128, -74.006], [0.1 + 0.2, -1e-7], [90.0, 180.0]]), 1.25)
+    assert json.loads(route.to_json()) == json.loads(route.to_response().model_dump_json())
+    assert json.loads(RoutePath(np.empty((0, 2)), 0.5).to_json()) == {"path": [], "calculation_time_ms": 0.5,
+                                                                     "degraded": False}
+
+def test_non_finite_coordinates_are_rejected_before_serialization():
+    body = '{"start": {"lat": 40.0, "lng": NaN}, "end": {"lat": Infinity, "lng": -74.0}}'
+    response = client.post("/api/v1/navigation/route", content=body,
+                           headers={**HEADERS, "Content-Type": "application/json"})
+    assert response.status_code == 422
+    assert [error["loc"] for error in response.json()["detail"]] == [["body", "start", "lng"],
+                                                                     ["body", "end", "lat"]]
+
+@pytest.mark.parametrize("path, body", [
+    ("/route?format=columnar", '{"start": {"lat": NaN, "lng": -74.0}, "end": {"lat": 37.7, "lng": -122.4}}'),
+    ("/route?format=polyline", '{"start": {"lat": 40.7, "lng": Infinity}, "end": {"lat": 37.7, "lng": -122.4}}'),
+    ("/route?format=ndjson", '{"start": {"lat": 40.7, "lng": -74.0}, "end": {"lat": -Infinity, "lng": -122.4}}'),
+    ("/routes", '{"routes": [{"start": {"lat": 40.7, "lng": -74.0}, "end": {"lat": 37.7, "lng": NaN}}]}'),
+    ("/route", '{"start": {"lat": 91.0, "lng": -74.0}, "end": {"lat": 37.7, "lng": -122.4}}'),
+])
+def test_out_of_range_coordinates_are_rejected(path, body):
+    response = client.post(f"/api/v1/navigation{path}", content=body,
+                           headers={**HEADERS, "Content-Type": "application/json"})
+    assert response.status_code == 422
+
+def test_grid_endpoints_at_the_edge_of_the_map(monkeypatch):
+    from app.services.service_locator import navigation_service
+    monkeypatch.setattr(navigation_service, "cache_key_mode", "grid")
+    start, end = navigation_service._search_endpoints(Coordinates(lat=90.0, lng=-180.0),
+                                                      Coordinates(lat=-90.0, lng=180.0))
+    assert start.lat > 90 and end.lng > 180
+
+def test_degraded_flag_reaches_every_format():
+    response = client.post("/api/v1/navigation/route?format=f64", json=ROUTE, headers=HEADERS)
+    assert response.headers["X-Route-Degraded"] in ("true", "false")
+    batch = client.post("/api/v1/navigation/routes?format=columnar", json={"routes": [ROUTE]}, headers=HEADERS)
+    assert batch.json()["routes"][0]["degraded"] is (batch.headers["X-Degraded-Routes"] == "1")
+    assert client.post("/api/v1/navigation/route?max_expansions=0", json=ROUTE, headers=HEADERS).status_code == 422
+
+def test_ndjson_stream_is_chunked_and_complete():
+    points = np.column_stack([np.linspace(0, 1, 2500), np.linspace(10, 11, 2500)])
+    chunks = list(iter_route_chunks(RoutePath(points, 2.0), "ndjson", chunk_points=1000))
+    lines = [json.loads(chunk) for chunk in chunks]
+    assert [line["type"] for line in lines] == ["header", "chunk", "chunk", "chunk", "end"]
+    assert lines[0]["point_count"] == 2500
+    streamed = np.column_stack([sum((line["lat"] for line in lines[1:-1]), []),
+                                sum((line["lng"] for line in lines[1:-1]), [])])
+    np.testing.assert_array_equal(streamed, points)
+    assert max(len(chunk) for chunk in chunks) < 50_000
+
+    binary = iter_route_chunks(RoutePath(points, 2.0), "f64", chunk_points=1000)
+    assert b"".join(binary) == encode_route(RoutePath(points, 2.0), "f64")
+
+def test_streamed_route_matches_json():
+    expected = client.post("/api/v1/navigation/route", json=ROUTE, headers=HEADERS).json()["path"]
+    response = client.post("/api/v1/navigation/route?stream=true", json=ROUTE, headers=HEADERS)
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1]["type"] == "end"
+    lats = sum((line["lat"] for line in lines if line["type"] == "chunk"), [])
+    assert lats == [point["lat"] for point in expected]
+
+    streamed_f32 = client.post("/api/v1/navigation/route?stream=true&format=f32", json=ROUTE, headers=HEADERS)
+    plain_f32 = client.post("/api/v1/navigation/route?format=f32", json=ROUTE, headers=HEADERS)
+    assert streamed_f32.content == plain_f32.content
+    assert client.post("/api/v1/navigation/route?stream=true&format=polyline",
+                       json=ROUTE, headers=HEADERS).status_code == 406
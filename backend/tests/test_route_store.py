@@ -0,0 +1,76 @@
+import asyncio
+import numpy as np
+from app.models.navigation import Coordinates
+from app.services.navigation_service import NavigationService
+from app.services.route_store import PersistentRouteStore
+
+def _path(n):
+    return np.arange(2 * n, dtype=np.float64).reshape(n, 2)
+
+def test_routes_survive_reopen(tmp_path):
+    db = str(tmp_path / "routes.db")
+    store = PersistentRouteStore(db, version="v1")
+    store.put((1.0, 2.0, 3.0, 4.0), _path(5))
+    store.close()
+
+    reopened = PersistentRouteStore(db, version="v1")
+    assert np.array_equal(reopened.get((1.0, 2.0, 3.0, 4.0)), _path(5))
+    assert reopened.get((0.0, 0.0, 0.0, 0.0)) is None
+    assert (reopened.hits, reopened.misses) == (1, 1)
+    reopened.close()
+
+def test_version_change_clears_store(tmp_path):
+    db = str(tmp_path / "routes.db")
+    store = PersistentRouteStore(db, version="v1")
+    store.put("key", _path(3))
+    store.close()
+
+    upgraded = PersistentRouteStore(db, version="v2")
+    assert upgraded.get("key") is None
+    upgraded.close()
+
+def test_compaction_evicts_least_recently_used(tmp_path):
+    # Each 4-point path is 64 bytes, so only two fit
+    store = PersistentRouteStore(str(tmp_path / "routes.db"), version="v1", max_bytes=150)
+    store.put("old", _path(4))
+    store.flush()
+    store.put("mid", _path(4))
+    store.flush()
+    store.get("old")
+    store.put("new", _path(4))
+    store.flush()
+
+    # One route per batch: the lock is released between deletes
+    assert store.compact(batch_size=1) > 0
+    assert store.total_bytes() <= 150
+    assert store.get("mid") is None
+    assert store.get("new") is not None
+    store.close()
+
+def test_flush_waits_for_the_batch_being_written(tmp_path):
+    store = PersistentRouteStore(str(tmp_path / "routes.db"), version="v1")
+    for i in range(2000):
+        store.put(("route", i), _path(3))
+    # The queue empties well before the writer's last batch commits
+    assert store.flush()
+    assert store.writes == 2000 and store.stats()["pending_writes"] == 0
+    assert store.get(("route", 1999)) is not None
+    store.close()
+
+def test_service_reads_disk_tier_after_restart(tmp_path):
+    db = str(tmp_path / "routes.db")
+    start, end = Coordinates(lat=40.7128, lng=-74.0060), Coordinates(lat=40.73, lng=-74.02)
+
+    service = NavigationService()
+    service.disk_cache = PersistentRouteStore(db, version="v1")
+    first = asyncio.run(service.compute_route(start, end))
+    service.disk_cache.close()
+
+    restarted = NavigationService()
+    restarted.disk_cache = PersistentRouteStore(db, version="v1")
+    second = asyncio.run(restarted.compute_route(start, end))
+
+    assert np.array_equal(first.points, second.points)
+    assert restarted.disk_cache.hits == 1
+    assert len(restarted.cache) == 1
+    restarted.disk_cache.close()
@@ -0,0 +1,123 @@
+import asyncio
+import pickle
+import time
+import numpy as np
+import pytest
+from app.models.navigation import Coordinates
+from app.services.navigation_service import NavigationService
+from app.services.path_engine import PathEngine
+from app.services.road_graph import RoadGraph
+from app.services.route_executor import RouteExecutor
+from app.services.search_budget import SearchBudget, SearchBudgetExceeded
+from benchmarks.bench_graph import synthetic_network
+
+START, END = Coordinates(lat=40.0, lng=-100.0), Coordinates(lat=40.039, lng=-99.961)
+
+def graph_engine():
+    engine = PathEngine()
+    engine.graph = RoadGraph.from_arrays(*synthetic_network(40))
+    return engine
+
+def test_expansion_budget_returns_anytime_path():
+    engine = graph_engine()
+    (path, reason), = engine.calculate_paths_bounded([(START, END)], SearchBudget(max_expansions=50))
+    assert reason == "expansions"
+    assert path[0].tolist() == [START.lat, START.lng]
+    assert path[-1].tolist() == [END.lat, END.lng]
+    assert len(path) > 3
+    assert engine.graph.stats()["budget_exceeded"] == 1
+
+    (full, reason), = engine.calculate_paths_bounded([(START, END)], SearchBudget(max_expansions=10**6))
+    assert reason is None and len(full) > len(path)
+
+@pytest.mark.parametrize("stop, reason", [
+    (lambda budget: time.sleep(0.002), "time"),
+    (lambda budget: budget.cancel(), "cancelled"),
+])
+def test_expired_or_cancelled_budget_stops_search(stop, reason):
+    graph = graph_engine().graph
+    budget = SearchBudget(time_budget_ms=1)
+    stop(budget)
+    source, target = graph.snap(START.lat, START.lng)[0], graph.snap(END.lat, END.lng)[0]
+    with pytest.raises(SearchBudgetExceeded) as exc:
+        graph.shortest_path(source, target, budget=budget)
+    assert exc.value.reason == reason
+    assert exc.value.nodes[0] == source
+
+def test_budget_survives_pickling_for_process_workers():
+    budget = SearchBudget(max_expansions=10, time_budget_ms=60_000)
+    budget.cancel()
+    copy = pickle.loads(pickle.dumps(budget))
+    assert (copy.max_expansions, copy.deadline, copy.cancelled) == (10, budget.deadline, True)
+
+def test_requests_can_only_tighten_configured_budget():
+    service = NavigationService()
+    service.max_expansions, service.time_budget_ms = 1000, 0
+    assert service.new_budget(max_expansions=10).max_expansions == 10
+    assert service.new_budget(max_expansions=10**9).max_expansions == 1000
+    assert service.new_budget().deadline is None
+    assert service.new_budget(time_budget_ms=500).deadline is not None
+
+def test_degraded_routes_are_flagged_and_not_cached():
+    service = NavigationService()
+    engine = graph_engine()
+    service.executor = RouteExecutor(lambda: engine, mode="inline")
+
+    degraded = asyncio.run(service.compute_route(START, END, service.new_budget(max_expansions=50)))
+    assert degraded.degraded and '"degraded":true' in degraded.to_json()
+    assert len(service.cache) == 0
+
+    route = asyncio.run(service.compute_route(START, END))
+    assert not route.degraded
+    assert len(service.cache) == 1
+    stats = service.budget_stats()
+    assert stats["exceeded"]["expansions"] == 1 and stats["degraded_routes"] == 1
+
+def test_overrunning_search_is_cut_off_at_the_deadline():
+    class SlowEngine:
+        def calculate_paths_bounded(self, pairs, budget):
+            # Like a WASM search, this ignores the clock until it finishes
+            time.sleep(0.3)
+            return [(np.zeros((2, 2)), None) for _ in pairs]
+
+    service = NavigationService()
+    service.executor = RouteExecutor(SlowEngine, mode="thread", workers=1)
+    started = time.perf_counter()
+    route = asyncio.run(service.compute_route(START, END, service.new_budget(time_budget_ms=20)))
+    assert time.perf_counter() - started < 0.25
+    assert route.degraded and route.points[-1].tolist() == [END.lat, END.lng]
+    assert service.budget_stats()["exceeded"]["time"] == 1
+    service.shutdown()
+
+class FailingBoundedWasm:
+    supports_bounded_search = True
+
+    def find_path_bounded(self, *args):
+        return None
+
+    def find_path_packed(self, *args):
+        raise AssertionError("a failed bounded search must not be retried without its budget")
+
+def test_failed_bounded_wasm_call_degrades_instead_of_searching_unbounded():
+    engine = PathEngine()
+    engine.graph, engine.use_wasm, engine.wasm = None, True, FailingBoundedWasm()
+    (path, reason), = engine.calculate_paths_bounded([(START, END)], SearchBudget(max_expansions=50))
+    assert reason == "error" and path[-1].tolist() == [END.lat, END.lng]
+
+    service = NavigationService()
+    service.executor = RouteExecutor(lambda: engine, mode="inline")
+    route = asyncio.run(service.compute_route(START, END, budget=SearchBudget(max_expansions=50)))
+    assert route.degraded and service.engine_errors == 1 and len(service.cache) == 0
+
+def test_failed_unbounded_wasm_call_is_degraded_and_not_cached():
+    class TrappingWasm(FailingBoundedWasm):
+        def find_path_packed(self, *args):
+            raise RuntimeError("unreachable executed")
+
+    engine = PathEngine()
+    engine.graph, engine.use_wasm, engine.wasm = None, True, TrappingWasm()
+    service = NavigationService()
+    service.executor = RouteExecutor(lambda: engine, mode="inline")
+    route = asyncio.run(service.compute_route(START, END))
+    assert route.degraded and len(route.points) == 11
+    assert service.engine_errors == 1 and len(service.cache) == 0
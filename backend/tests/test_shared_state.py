@@ -0,0 +1,99 @@
+import multiprocessing
+import numpy as np
+from app.middleware.rate_limiter import RateLimiter
+from app.core.config import get_settings
+from app.services.route_store import route_cache_version
+from app.services.shared_state import SharedState
+
+WORKERS = 4
+ATTEMPTS_PER_WORKER = 60
+LIMIT = 100
+
+def _hammer_limiter(path, start_event, results):
+    limiter = RateLimiter(requests_per_minute=LIMIT, api_key_requests_per_minute=0,
+                          shared=SharedState(path, limiter_slots=1024, cache_slots=4, cache_max_points=8))
+    start_event.wait()
+    results.put(sum(limiter.allow("10.0.0.1") for _ in range(ATTEMPTS_PER_WORKER)))
+
+def test_limit_is_global_across_processes(tmp_path):
+    path = str(tmp_path / "state.bin")
+    context = multiprocessing.get_context("spawn")
+    start_event = context.Event()
+    results = context.Queue()
+    workers = [context.Process(target=_hammer_limiter, args=(path, start_event, results))
+               for _ in range(WORKERS)]
+    for worker in workers:
+        worker.start()
+    start_event.set()
+    allowed = [results.get(timeout=60) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=60)
+
+    # 240 attempts across four processes; exactly the global limit gets through
+    assert sum(allowed) == LIMIT
+
+def _store_route(path, key):
+    state = SharedState(path, limiter_slots=16, cache_slots=8, cache_max_points=8)
+    state.cache_put(key, np.array([[1.0, 2.0], [3.0, 4.0]]))
+
+def test_route_cache_is_shared_across_processes(tmp_path):
+    path = str(tmp_path / "state.bin")
+    key = (40.7128, -74.006, 37.7749, -122.4194)
+    state = SharedState(path, limiter_slots=16, cache_slots=8, cache_max_points=8)
+    assert state.cache_get(key) is None
+
+    writer = multiprocessing.get_context("spawn").Process(target=_store_route, args=(path, key))
+    writer.start()
+    writer.join(timeout=60)
+
+    assert state.cache_get(key).tolist() == [[1.0, 2.0], [3.0, 4.0]]
+    assert state.cache_get((4071, -7400, 3777, -12241)) is None
+    assert state.stats()["cache_slots_used"] == 1
+
+def test_long_paths_are_not_shared(tmp_path):
+    state = SharedState(str(tmp_path / "state.bin"), limiter_slots=16, cache_slots=8, cache_max_points=4)
+    assert not state.cache_put((0, 0, 1, 1), np.zeros((5, 2)))
+
+def test_api_key_and_ip_limits_share_one_decision(tmp_path):
+    state = SharedState(str(tmp_path / "state.bin"), limiter_slots=64, cache_slots=1, cache_max_points=1)
+    limiter = RateLimiter(requests_per_minute=10, api_key_requests_per_minute=2, shared=state)
+    assert limiter.allow("a", "key") and limiter.allow("b", "key")
+    assert not limiter.allow("c", "key")
+    assert limiter.allow("c")
+
+def test_layout_change_replaces_the_file_instead_of_shrinking_it(tmp_path):
+    path = str(tmp_path / "state.bin")
+    key = (1.0, 2.0, 3.0, 4.0)
+    old = SharedState(path, limiter_slots=16, cache_slots=64, cache_max_points=8)
+    old.cache_put(key, np.array([[1.0, 2.0], [3.0, 4.0]]))
+
+    new = SharedState(path, limiter_slots=16, cache_slots=2, cache_max_points=8)
+    # The old worker's mapping is intact; reading all of it would SIGBUS if the file had been truncated
+    assert bytes(old._mm[-8:]) == bytes(8) and old.cache_get(key) is not None
+    assert new.cache_get(key) is None and new.stats()["cache_slots_used"] == 0
+    # Workers started later find the new layout and share it
+    new.cache_put(key, np.array([[5.0, 6.0], [7.0, 8.0]]))
+    later = SharedState(path, limiter_slots=16, cache_slots=2, cache_max_points=8)
+    assert later.cache_get(key).tolist() == [[5.0, 6.0], [7.0, 8.0]]
+    for state in (old, new, later):
+        state.close()
+
+def test_routes_from_another_cache_version_are_discarded(tmp_path, monkeypatch):
+    path = str(tmp_path / "state.bin")
+    key = (1.0, 2.0, 3.0, 4.0)
+    state = SharedState(path, limiter_slots=16, cache_slots=8, cache_max_points=8, version="python:grid:0.001")
+    state.cache_put(key, np.array([[1.0, 2.0], [3.0, 4.0]]))
+    same = SharedState(path, limiter_slots=16, cache_slots=8, cache_max_points=8, version="python:grid:0.001")
+    assert same.cache_get(key) is not None
+    # Raw-float keys must never be answered from a table filled under grid keys
+    other = SharedState(path, limiter_slots=16, cache_slots=8, cache_max_points=8, version="python:exact:0.001")
+    assert other.cache_get(key) is None
+    for s in (state, same, other):
+        s.close()
+
+    # The version follows the settings the disk tier is stamped with
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ROUTE_CACHE_KEY_MODE", "grid")
+    grid = route_cache_version(settings)
+    monkeypatch.setattr(settings, "ROUTE_CACHE_KEY_MODE", "exact")
+    assert route_cache_version(settings) != grid
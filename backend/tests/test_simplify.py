@@ -0,0 +1,71 @@
+import asyncio
+import numpy as np
+from fastapi.testclient import TestClient
+from main import app
+from app.models.navigation import Coordinates
+from app.services.navigation_service import NavigationService
+from app.services.path_engine import PathEngine
+from app.services.route_executor import RouteExecutor
+from app.utils.simplify import _project, douglas_peucker, quantize_tolerance, zoom_tolerance_m
+
+client = TestClient(app)
+HEADERS = {"X-API-Key": "development_key"}
+ROUTE = {"start": {"lat": 40.7128, "lng": -74.0060}, "end": {"lat": 40.30, "lng": -73.50}}
+
+def segment_distances(points, line):
+    """Distance in meters from every point to the nearest segment of `line`"""
+    both = _project(np.vstack([line, points]))
+    line_xy, xy = both[:len(line)], both[len(line):]
+    best = np.full(len(xy), np.inf)
+    for a, b in zip(line_xy[:-1], line_xy[1:]):
+        d = b - a
+        t = np.clip((xy - a) @ d / max(d @ d, 1e-12), 0, 1)
+        best = np.minimum(best, np.hypot(*(xy - a - t[:, None] * d).T))
+    return best
+
+def test_collinear_points_collapse_to_endpoints():
+    line = np.column_stack([np.linspace(40, 41, 500), np.linspace(-74, -73, 500)])
+    simplified = douglas_peucker(line, 1.0)
+    assert simplified.tolist() == [line[0].tolist(), line[-1].tolist()]
+
+def test_simplified_path_stays_within_tolerance():
+    rng = np.random.default_rng(1)
+    path = np.cumsum(rng.normal(0, 0.001, size=(5000, 2)), axis=0) + [40.0, -74.0]
+    for tolerance in (5.0, 50.0, 500.0):
+        simplified = douglas_peucker(path, tolerance)
+        assert simplified[0].tolist() == path[0].tolist() and simplified[-1].tolist() == path[-1].tolist()
+        assert len(simplified) < len(path)
+        assert segment_distances(path, simplified).max() <= tolerance * 1.001
+
+def test_zoom_tolerance_halves_per_level():
+    assert np.isclose(zoom_tolerance_m(0, 0.0), 156543.0, rtol=1e-4)
+    assert np.isclose(zoom_tolerance_m(10, 60.0), zoom_tolerance_m(9, 60.0) / 2)
+    assert quantize_tolerance(12.345) == 12.0 and quantize_tolerance(0) is None
+    # Rounded down, never looser than requested
+    assert quantize_tolerance(12.99) == 12.0 and quantize_tolerance(0.12) == 0.12
+    assert all(quantize_tolerance(t) <= t for t in np.geomspace(0.01, 1e5, 997))
+
+def test_variants_are_built_on_the_route_executor():
+    service = NavigationService()
+    engine = PathEngine()
+    service.executor = RouteExecutor(lambda: engine, mode="thread", workers=1)
+    start, end = Coordinates(**ROUTE["start"]), Coordinates(**ROUTE["end"])
+    full = asyncio.run(service.compute_route(start, end))
+    searched = service.executor.completed
+    simplified = asyncio.run(service.compute_route(start, end, tolerance_m=1000))
+    assert service.executor.completed == searched + 1 and len(simplified) < len(full)
+    # The variant is cached next to the full path
+    asyncio.run(service.compute_route(start, end, tolerance_m=1000))
+    service.executor.shutdown()
+    assert service.executor.completed == searched + 1
+
+def test_endpoint_reports_original_and_simplified_counts():
+    full = client.post("/api/v1/navigation/route", json=ROUTE, headers=HEADERS)
+    simplified = client.post("/api/v1/navigation/route?zoom=8", json=ROUTE, headers=HEADERS)
+    assert simplified.headers["X-Original-Point-Count"] == full.headers["X-Point-Count"]
+    assert int(simplified.headers["X-Point-Count"]) < int(full.headers["X-Point-Count"])
+    path = simplified.json()["path"]
+    assert path[0] == ROUTE["start"] and path[-1] == ROUTE["end"]
+
+    batch = client.post("/api/v1/navigation/routes?tolerance_m=1000", json={"routes": [ROUTE, ROUTE]}, headers=HEADERS)
+    assert int(batch.headers["X-Point-Count"]) < int(batch.headers["X-Original-Point-Count"])
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+import numpy as np
+import pytest
+from app.models.navigation import Coordinates
+from app.services.navigation_service import NavigationService
+from app.services.route_executor import RouteExecutor
+from app.services.single_flight import SingleFlight
+
+class CountingEngine:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def calculate_paths_bounded(self, pairs, budget):
+        with self.lock:
+            self.calls.append(len(pairs))
+        time.sleep(self.delay)
+        # A tiny expansion cap stands in for a search cut short by its budget
+        reason = "expansions" if 0 < budget.max_expansions < 10 else None
+        return [(np.array([[start.lat, start.lng], [end.lat, end.lng]]), reason) for start, end in pairs]
+
+def counted_compute(calls, delay=0.05, error=None):
+    async def compute(keys):
+        calls.append(list(keys))
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return [f"path-{key}" for key in keys]
+    return compute
+
+def test_identical_requests_share_one_search():
+    service = NavigationService()
+    engine = CountingEngine()
+    service.executor = RouteExecutor(lambda: engine, mode="thread", workers=4)
+    start, end = Coordinates(lat=1.0, lng=2.0), Coordinates(lat=3.0, lng=4.0)
+
+    async def burst():
+        return await asyncio.gather(*(service.compute_route(start, end) for _ in range(50)))
+
+    routes = asyncio.run(burst())
+    assert engine.calls == [1]
+    assert all(np.array_equal(route.points, routes[0].points) for route in routes)
+    assert service.in_flight.stats()["coalesced"] == 49
+    assert len(service.in_flight) == 0
+    assert len(service.cache) == 1
+    service.shutdown()
+
+def test_requests_with_other_limits_do_not_share_a_search():
+    service = NavigationService()
+    engine = CountingEngine()
+    service.executor = RouteExecutor(lambda: engine, mode="thread", workers=4)
+    start, end = Coordinates(lat=1.0, lng=2.0), Coordinates(lat=3.0, lng=4.0)
+
+    async def burst():
+        return await asyncio.gather(service.compute_route(start, end, budget=service.new_budget(max_expansions=1)),
+                                    service.compute_route(start, end),
+                                    service.compute_route(start, end))
+
+    tiny, *default = asyncio.run(burst())
+    assert engine.calls == [1, 1]
+    assert tiny.degraded and not any(route.degraded for route in default)
+    assert service.in_flight.stats()["coalesced"] == 1
+    service.shutdown()
+
+def test_batch_joins_searches_already_in_flight():
+    flight, calls = SingleFlight(), []
+
+    async def run():
+        single = asyncio.ensure_future(flight.run(["a"], counted_compute(calls)))
+        await asyncio.sleep(0)
+        batch = await flight.run(["a", "b", "c"], counted_compute(calls))
+        return await single, batch
+
+    single, batch = asyncio.run(run())
+    assert calls == [["a"], ["b", "c"]]
+    assert single == ["path-a"] and batch == ["path-a", "path-b", "path-c"]
+    assert flight.stats()["coalesced"] == 1
+
+def test_leader_error_reaches_every_waiter():
+    flight, calls = SingleFlight(), []
+
+    async def run():
+        compute = counted_compute(calls, error=RuntimeError("engine crashed"))
+        return await asyncio.gather(*(flight.run(["a"], compute) for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.stats()["errors"] == 1 and len(flight) == 0
+
+def test_cancelled_waiter_does_not_stop_the_others():
+    flight, calls = SingleFlight(), []
+
+    async def run():
+        leader = asyncio.ensure_future(flight.run(["a"], counted_compute(calls)))
+        follower = asyncio.ensure_future(flight.run(["a"], counted_compute(calls)))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == ["path-a"]
+    assert flight.stats()["abandoned"] == 0
+
+def test_search_cancelled_once_every_waiter_is_gone():
+    flight, calls = SingleFlight(), []
+
+    async def run():
+        waiters = [asyncio.ensure_future(flight.run(["a"], counted_compute(calls, delay=10))) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert flight.stats()["abandoned"] == 1
+    assert len(flight) == 0
@@ -0,0 +1,81 @@
+import threading
+import time
+from fastapi.testclient import TestClient
+from main import app
+from app.core.telemetry import Histogram, SamplingProfiler, StageMetrics
+
+client = TestClient(app)
+HEADERS = {"X-API-Key": "development_key"}
+ROUTE = {"start": {"lat": 40.7128, "lng": -74.0060}, "end": {"lat": 40.73, "lng": -74.02}}
+
+def test_quantiles_interpolate_within_buckets():
+    histogram = Histogram(buckets=(0.001, 0.002, 0.004))
+    for seconds in [0.0015] * 50 + [0.003] * 45 + [0.01] * 5:
+        histogram.observe(seconds)
+    assert 0.001 < histogram.quantile(0.5) <= 0.002
+    assert 0.002 < histogram.quantile(0.95) <= 0.004
+    # Beyond the last bucket the estimate is capped at the last bound
+    assert histogram.quantile(0.99) == 0.004
+    assert Histogram().quantile(0.5) == 0.0
+
+def test_prometheus_exposition_is_cumulative():
+    metrics = StageMetrics(buckets=(0.001, 0.01))
+    for seconds in (0.0005, 0.005, 0.005, 1.0):
+        metrics.observe("engine_call", seconds)
+    lines = metrics.render_prometheus().splitlines()
+    assert 'naviwasm_stage_duration_seconds_bucket{stage="engine_call",le="0.001"} 1' in lines
+    assert 'naviwasm_stage_duration_seconds_bucket{stage="engine_call",le="0.01"} 3' in lines
+    assert 'naviwasm_stage_duration_seconds_bucket{stage="engine_call",le="+Inf"} 4' in lines
+    assert 'naviwasm_stage_duration_seconds_count{stage="engine_call"} 4' in lines
+    assert any(line.startswith('naviwasm_stage_duration_seconds_quantile{stage="engine_call",quantile="0.99"}')
+               for line in lines)
+
+def test_route_request_records_every_stage():
+    client.post("/api/v1/navigation/route", json=ROUTE, headers=HEADERS)
+    response = client.get("/api/v1/metrics/prometheus")
+    assert response.headers["content-type"].startswith("text/plain")
+    for stage in ("rate_limit", "auth", "cache_lookup", "route_calculation", "serialization", "request"):
+        assert f'stage="{stage}"' in response.text
+    latency = client.get("/api/v1/metrics").json()["latency"]
+    assert {"count", "avg_ms", "p50_ms", "p95_ms", "p99_ms"} <= set(latency["auth"])
+
+def busy_loop_for_profiler(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_profiler_stops_after_requested_requests():
+    profiler = SamplingProfiler()
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop_for_profiler, args=(stop,))
+    worker.start()
+    profiler.start(requests=2, interval_ms=1)
+    time.sleep(0.05)
+    profiler.request_finished()
+    assert profiler.active
+    profiler.request_finished()
+    stop.set()
+    worker.join()
+    assert not profiler.active
+    assert profiler.samples > 0
+    assert "busy_loop_for_profiler" in profiler.collapsed()
+
+def test_finishing_request_does_not_wait_for_the_sampler():
+    profiler = SamplingProfiler()
+    profiler.start(requests=1, interval_ms=500)
+    started = time.perf_counter()
+    profiler.request_finished()
+    assert time.perf_counter() - started < 0.1
+    assert not profiler.active
+    # A run started right away is not fed by the old thread
+    profiler.start(requests=1, interval_ms=1000)
+    time.sleep(0.6)
+    assert profiler.samples == 0
+    profiler.stop()
+
+def test_profiler_control_requires_api_key():
+    assert client.post("/api/v1/metrics/profiler?requests=1").status_code == 401
+    started = client.post("/api/v1/metrics/profiler?requests=1&interval_ms=1", headers=HEADERS).json()
+    assert started["active"] and started["remaining_requests"] == 1
+    # The next request completes the run
+    client.get("/api/v1/health")
+    assert not client.get("/api/v1/metrics").json()["profiler"]["active"]
@@ -0,0 +1,123 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+import wasmtime
+from app.services.wasm_service import WasmService
+
+# Minimal stand-in for the pathfinding module: returns a pointer to a
+# null-terminated JSON path and grows linear memory by one page per call.
+FAKE_MODULE = """
+(module
+  (memory (export "memory") 1)
+  (data (i32.const 16) "[{\\"lat\\":1.5,\\"lng\\":2.5}]\\00")
+  (func (export "find_path") (param f64 f64 f64 f64) (result i32)
+    (drop (memory.grow (i32.const 1)))
+    (i32.const 16)))
+"""
+
+# Packed ABI stand-in: writes [2, start_lat, start_lng, end_lat, end_lng] at offset 64
+FAKE_PACKED_MODULE = """
+(module
+  (memory (export "memory") 1)
+  (global $freed (export "freed") (mut i32) (i32.const 0))
+  (func (export "find_path_packed") (param f64 f64 f64 f64) (result i32)
+    (f64.store (i32.const 64) (f64.const 2))
+    (f64.store (i32.const 72) (local.get 0))
+    (f64.store (i32.const 80) (local.get 1))
+    (f64.store (i32.const 88) (local.get 2))
+    (f64.store (i32.const 96) (local.get 3))
+    (i32.const 64))
+  (func (export "free_path") (param i32)
+    (global.set $freed (i32.add (global.get $freed) (i32.const 1)))))
+"""
+
+# Bounded ABI stand-in: straight start -> end path, degraded when the budget is under 10
+FAKE_BOUNDED_MODULE = """
+(module
+  (memory (export "memory") 1)
+  (global $degraded (mut i32) (i32.const 0))
+  (func (export "find_path_bounded") (param f64 f64 f64 f64 i32) (result i32)
+    (global.set $degraded (i32.lt_u (local.get 4) (i32.const 10)))
+    (f64.store (i32.const 64) (f64.const 2))
+    (f64.store (i32.const 72) (local.get 0))
+    (f64.store (i32.const 80) (local.get 1))
+    (f64.store (i32.const 88) (local.get 2))
+    (f64.store (i32.const 96) (local.get 3))
+    (i32.const 64))
+  (func (export "last_search_degraded") (result i32) (global.get $degraded))
+  (func (export "free_path") (param i32)))
+"""
+
+def write_module(tmp_path, source=FAKE_MODULE):
+    path = tmp_path / "fake.wasm"
+    path.write_bytes(wasmtime.wat2wasm(source))
+    return str(path)
+
+def test_pool_serves_concurrent_calls(tmp_path):
+    service = WasmService(wasm_path=write_module(tmp_path), pool_size=3)
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(lambda _: service.find_path(0, 0, 1, 1), range(30)))
+    assert all(json.loads(r) == [{"lat": 1.5, "lng": 2.5}] for r in results)
+    stats = service.stats()
+    assert stats["checkouts"] == 30
+    assert stats["in_use"] == 0
+    assert stats["size"] == 3
+
+def test_instances_recycled_past_memory_limit(tmp_path):
+    page = 64 * 1024
+    service = WasmService(wasm_path=write_module(tmp_path), pool_size=1,
+                          max_memory_bytes=2 * page)
+    for _ in range(4):
+        service.find_path(0, 0, 1, 1)
+    # Every second call takes memory to 3 pages, past the limit, and is recycled
+    assert service.stats()["recycled"] == 2
+
+def test_missing_module_reports_unavailable(tmp_path):
+    service = WasmService(wasm_path=str(tmp_path / "missing.wasm"))
+    assert not service.available
+    assert service.find_path(0, 0, 1, 1) is None
+
+def test_packed_abi_reads_path_in_bulk(tmp_path):
+    service = WasmService(wasm_path=write_module(tmp_path, FAKE_PACKED_MODULE))
+    points = service.find_path_packed(40.5, -74.25, 37.75, -122.5)
+    assert points.shape == (2, 2)
+    assert points.tolist() == [[40.5, -74.25], [37.75, -122.5]]
+    with service.pool.checkout() as wasm:
+        assert wasm.instance.exports(wasm.store)["freed"].value(wasm.store) == 1
+
+def test_packed_abi_missing_falls_back_to_none(tmp_path):
+    service = WasmService(wasm_path=write_module(tmp_path))
+    assert service.find_path_packed(0, 0, 1, 1) is None
+
+def test_bounded_search_reports_degraded_paths(tmp_path):
+    service = WasmService(wasm_path=write_module(tmp_path, FAKE_BOUNDED_MODULE))
+    points, degraded = service.find_path_bounded(1, 2, 3, 4, max_expansions=5)
+    assert degraded and points.tolist() == [[1, 2], [3, 4]]
+    assert service.find_path_bounded(1, 2, 3, 4, max_expansions=10**12)[1] is False
+    packed_only = WasmService(wasm_path=write_module(tmp_path, FAKE_PACKED_MODULE))
+    assert packed_only.find_path_bounded(0, 0, 1, 1, 5) is None
+    assert service.supports_bounded_search and not packed_only.supports_bounded_search
+
+def test_precompiled_artifact_reused_across_starts(tmp_path):
+    wasm_path = write_module(tmp_path, FAKE_PACKED_MODULE)
+    cache_dir = tmp_path / "artifacts"
+
+    first = WasmService(wasm_path=wasm_path, artifact_cache_dir=str(cache_dir))
+    assert first.artifact_cache == "miss"
+    assert len(list(cache_dir.glob("*.cwasm"))) == 1
+
+    second = WasmService(wasm_path=wasm_path, artifact_cache_dir=str(cache_dir))
+    assert second.artifact_cache == "hit"
+    assert "wasm_deserialize" in second.startup_ms
+    assert second.find_path_packed(1, 2, 3, 4).tolist() == [[1, 2], [3, 4]]
+
+def test_corrupt_artifact_is_recompiled(tmp_path):
+    wasm_path = write_module(tmp_path, FAKE_PACKED_MODULE)
+    cache_dir = tmp_path / "artifacts"
+    WasmService(wasm_path=wasm_path, artifact_cache_dir=str(cache_dir))
+    artifact = next(cache_dir.glob("*.cwasm"))
+    artifact.write_bytes(b"not a module")
+
+    service = WasmService(wasm_path=wasm_path, artifact_cache_dir=str(cache_dir))
+    assert service.available
+    assert service.artifact_cache == "miss"
+    assert WasmService(wasm_path=wasm_path, artifact_cache_dir=str(cache_dir)).artifact_cache == "hit"
@@ -1,13 +1,137 @@
+import asyncio
+import os
+import sys
+import time
+from functools import partial
+
 import click
 
-@click.command()
+# The CLI runs the backend in-process rather than calling the API
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+
+def _coordinates(value):
+    from app.models.navigation import Coordinates
+    try:
+        lat, lng = (float(part) for part in value.split(","))
+    except ValueError:
+        raise click.BadParameter(f'expected "lat,lng", got "{value}"')
+    return Coordinates(lat=lat, lng=lng)
+
+
+@click.group()
+def cli():
+    """NaviWasm command line tools"""
+
+
+@cli.command()
 @click.option('--start', prompt='Start location', help='Starting coordinates (e.g. "lat,lon").')
 @click.option('--end', prompt='End location', help='Ending coordinates (e.g. "lat,lon").')
 def navigate(start, end):
-    # ...call the backend API or integrate with the Rust wasm...
+    """Calculate a single route"""
+    from app.services.navigation_service import NavigationService
     click.echo(f"Calculating path from {start} to {end}...")
-    # ...existing logic to compute path...
-    click.echo("Path computed successfully!")
+    service = NavigationService()
+    try:
+        route = asyncio.run(service.compute_route(_coordinates(start), _coordinates(end)))
+    finally:
+        service.shutdown()
+    click.echo(f"Path computed successfully! {len(route)} points in {route.calculation_time_ms:.1f} ms")
+
+
+@cli.command()
+@click.argument('input_path', type=click.Path(dir_okay=False, allow_dash=True))
+@click.argument('output_path', type=click.Path(dir_okay=False))
+@click.option('--input-format', type=click.Choice(['csv', 'ndjson']),
+              help='Defaults to the input file extension; required when reading stdin.')
+@click.option('--format', 'output_format', type=click.Choice(['ndjson', 'f32', 'f64']), default='ndjson',
+              show_default=True, help='Output: one JSON line per route, or packed binary records.')
+@click.option('--workers', type=int, default=0, help='Worker processes, one path engine each (default: CPU count).')
+@click.option('--batch-size', type=int, default=256, show_default=True, help='Pairs sent to a worker at once.')
+@click.option('--max-expansions', type=int, help='Cap on nodes expanded per search.')
+@click.option('--checkpoint', 'checkpoint_path', type=click.Path(dir_okay=False),
+              help='Checkpoint file (default: OUTPUT_PATH.checkpoint).')
+@click.option('--checkpoint-rows', type=int, default=100_000, show_default=True,
+              help='Rows between checkpoints.')
+@click.option('--resume/--no-resume', default=True, show_default=True,
+              help='Continue from the checkpoint when one matches this run.')
+@click.option('--progress-interval', type=float, default=2.0, show_default=True,
+              help='Seconds between progress lines on stderr; 0 to disable.')
+def bulk(input_path, output_path, input_format, output_format, workers, batch_size, max_expansions,
+         checkpoint_path, checkpoint_rows, resume, progress_interval):
+    """Route every origin/destination pair in INPUT_PATH and write the routes to OUTPUT_PATH.
+
+    Input is CSV (start_lat,start_lng,end_lat,end_lng[,id], with or
+    without that header) or NDJSON. Rows are read, routed and written as a
+    stream, so memory stays flat however long the input is. An interrupted
+    run picks up from its last checkpoint when started again.
+    """
+    from app.services.bulk_router import (BulkRouter, input_format_for, read_checkpoint, read_rows,
+                                          resume_point, run_state as checkpoint_state, write_checkpoint)
+    from app.services.navigation_service import NavigationService
+    from app.services.path_engine import PathEngine
+    from app.services.route_executor import RouteExecutor
+
+    if input_format is None:
+        if input_path == '-':
+            raise click.UsageError('--input-format is required when reading stdin')
+        try:
+            input_format = input_format_for(input_path)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+    checkpoint_path = checkpoint_path or output_path + '.checkpoint'
+    try:
+        run_state = checkpoint_state(input_path, input_format, output_format)
+    except OSError as e:
+        raise click.FileError(input_path, e.strerror)
+
+    state = read_checkpoint(checkpoint_path) if resume else None
+    try:
+        start_row, output_bytes = resume_point(state, run_state, output_path)
+    except ValueError as e:
+        click.echo(f"Ignoring checkpoint: {e}; starting from the first row", err=True)
+        start_row, output_bytes = 0, 0
+    if start_row:
+        click.echo(f"Resuming after row {start_row:,}", err=True)
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 2
+    # Each worker process builds its own engine (and WASM instance) once
+    service = NavigationService(RouteExecutor(partial(PathEngine, wasm_pool_size=1), mode="process",
+                                              workers=workers, max_queue=max_in_flight))
+    router = BulkRouter(service, batch_size=batch_size, max_in_flight=max_in_flight,
+                        max_expansions=max_expansions)
+
+    last_report = [0.0]
+
+    def report(stats):
+        now = time.monotonic()
+        if progress_interval and now - last_report[0] >= progress_interval:
+            last_report[0] = now
+            click.echo(f"{stats.rows:,} rows  {stats.rows_per_second:,.0f} rows/s  "
+                       f"{stats.invalid:,} invalid  {stats.degraded:,} degraded", err=True)
+
+    def checkpoint(rows, position):
+        write_checkpoint(checkpoint_path, {**run_state, "rows": rows, "output_bytes": position})
+
+    mode = 'r+b' if start_row else 'wb'
+    input_stream = click.open_file(input_path, 'r', encoding='utf-8')
+    try:
+        with input_stream, open(output_path, mode) as output:
+            # Drop whatever was written after the last checkpoint
+            output.truncate(output_bytes)
+            output.seek(output_bytes)
+            stats = asyncio.run(router.run(read_rows(input_stream, input_format), output, output_format,
+                                           checkpoint=checkpoint, checkpoint_rows=checkpoint_rows,
+                                           progress=report, start_row=start_row))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    finally:
+        service.shutdown()
+    click.echo(f"Done: {stats.rows:,} rows ({stats.routed:,} routed, {stats.invalid:,} invalid, "
+               f"{stats.degraded:,} degraded) in {stats.elapsed_seconds:.1f} s, "
+               f"{stats.rows_per_second:,.0f} rows/s", err=True)
+
 
 if __name__ == '__main__':
-    navigate()
\ No newline at end of file
+    cli()
@@ -1,10 +1,22 @@
+#[cfg(feature = "js")]
 use wasm_bindgen::prelude::*;
+#[cfg(feature = "js")]
 use serde::{Serialize, Deserialize};
-use serde_wasm_bindgen;
 use std::collections::{BinaryHeap, HashMap};
 use std::cmp::Ordering;
+use std::sync::atomic::{AtomicU32, Ordering as AtomicOrdering};
 
-#[derive(Clone, Serialize, Deserialize)]
+/// Expansion cap for callers that do not pass their own budget, so no query
+/// can search an unbounded grid forever.
+const DEFAULT_MAX_EXPANSIONS: u32 = 1_000_000;
+
+/// Whether the last search on this instance ran out of budget (1) or not (0).
+static LAST_SEARCH_DEGRADED: AtomicU32 = AtomicU32::new(0);
+/// Nodes expanded by the last search on this instance.
+static LAST_SEARCH_EXPANDED: AtomicU32 = AtomicU32::new(0);
+
+#[derive(Clone)]
+#[cfg_attr(feature = "js", derive(Serialize, Deserialize))]
 pub struct Point {
     lat: f64,
     lon: f64,
@@ -28,17 +40,76 @@ impl PartialOrd for Node {
     }
 }
 
-#[derive(Serialize, Deserialize)]
+#[cfg_attr(feature = "js", derive(Serialize, Deserialize))]
 pub struct Coordinates {
     lat: f64,
     lng: f64,
 }
 
+#[cfg(feature = "js")]
 #[wasm_bindgen]
 pub fn find_path(start_lat: f64, start_lng: f64, end_lat: f64, end_lng: f64) -> JsValue {
     // Set up console error panic hook for better debugging
     console_error_panic_hook::set_once();
-    
+
+    let path = compute_path(start_lat, start_lng, end_lat, end_lng, DEFAULT_MAX_EXPANSIONS);
+    serde_wasm_bindgen::to_value(&path).unwrap()
+}
+
+/// Packed variant of `find_path` for non-JS hosts such as the Python backend.
+///
+/// Returns a pointer to a buffer of f64 values: the first element holds the
+/// number of points `n`, followed by `n` interleaved (lat, lng) pairs. The
+/// host reads it in one bulk copy and must release it with `free_path`.
+#[no_mangle]
+pub extern "C" fn find_path_packed(start_lat: f64, start_lng: f64, end_lat: f64, end_lng: f64) -> *mut f64 {
+    find_path_bounded(start_lat, start_lng, end_lat, end_lng, DEFAULT_MAX_EXPANSIONS)
+}
+
+/// `find_path_packed` with an explicit cap on expanded nodes.
+///
+/// When the cap is hit the returned path is the best partial route (up to
+/// the expanded cell closest to the goal, then straight to the goal) and
+/// `last_search_degraded` reports 1 until the next search.
+#[no_mangle]
+pub extern "C" fn find_path_bounded(start_lat: f64, start_lng: f64, end_lat: f64, end_lng: f64,
+                                    max_expansions: u32) -> *mut f64 {
+    let path = compute_path(start_lat, start_lng, end_lat, end_lng, max_expansions);
+    let mut buffer = Vec::with_capacity(1 + 2 * path.len());
+    buffer.push(path.len() as f64);
+    for point in &path {
+        buffer.push(point.lat);
+        buffer.push(point.lng);
+    }
+    Box::into_raw(buffer.into_boxed_slice()) as *mut f64
+}
+
+/// 1 if the last search stopped at its expansion budget, else 0.
+#[no_mangle]
+pub extern "C" fn last_search_degraded() -> u32 {
+    LAST_SEARCH_DEGRADED.load(AtomicOrdering::Relaxed)
+}
+
+/// Number of nodes expanded by the last search.
+#[no_mangle]
+pub extern "C" fn last_search_expanded() -> u32 {
+    LAST_SEARCH_EXPANDED.load(AtomicOrdering::Relaxed)
+}
+
+/// Releases a buffer returned by `find_path_packed` or `find_path_bounded`.
+#[no_mangle]
+pub extern "C" fn free_path(ptr: *mut f64) {
+    if ptr.is_null() {
+        return;
+    }
+    unsafe {
+        let len = 1 + 2 * (*ptr as usize);
+        drop(Box::from_raw(std::ptr::slice_from_raw_parts_mut(ptr, len)));
+    }
+}
+
+fn compute_path(start_lat: f64, start_lng: f64, end_lat: f64, end_lng: f64,
+                max_expansions: u32) -> Vec<Coordinates> {
     // Convert to grid coordinates (simplified for example)
     let start_x = (start_lng * 100.0) as i32;
     let start_y = (start_lat * 100.0) as i32;
@@ -46,18 +117,25 @@ pub fn find_path(start_lat: f64, start_lng: f64, end_lat: f64, end_lng: f64) ->
     let end_y = (end_lat * 100.0) as i32;
     
     // Run A* pathfinding
-    let grid_path = a_star((start_x, start_y), (end_x, end_y));
-    
+    let (grid_path, complete, expanded) = a_star((start_x, start_y), (end_x, end_y), max_expansions);
+    LAST_SEARCH_DEGRADED.store(if complete { 0 } else { 1 }, AtomicOrdering::Relaxed);
+    LAST_SEARCH_EXPANDED.store(expanded, AtomicOrdering::Relaxed);
+
     // Convert back to geographic coordinates
-    let geo_path: Vec<Coordinates> = grid_path.into_iter()
+    let mut geo_path: Vec<Coordinates> = grid_path.into_iter()
         .map(|(x, y)| Coordinates {
             lat: y as f64 / 100.0,
             lng: x as f64 / 100.0,
         })
         .collect();
+
+    // Out of budget: finish the partial route with a straight segment to the goal
+    if !complete && !geo_path.is_empty() {
+        geo_path.push(Coordinates { lat: end_lat, lng: end_lng });
+    }
     
     // If no path found, fall back to interpolation
-    let path = if geo_path.is_empty() {
+    if geo_path.is_empty() {
         // Simple linear interpolation as fallback
         let steps = 10;
         (0..=steps).map(|i| {
@@ -68,25 +146,38 @@ pub fn find_path(start_lat: f64, start_lng: f64, end_lat: f64, end_lng: f64) ->
         }).collect()
     } else {
         geo_path
-    };
-    
-    serde_wasm_bindgen::to_value(&path).unwrap()
+    }
 }
 
-fn a_star(start: (i32, i32), goal: (i32, i32)) -> Vec<(i32, i32)> {
+/// Returns the path, whether it reaches `goal`, and the number of expanded nodes.
+/// After `max_expansions` the path to the expanded cell nearest the goal is
+/// returned instead.
+fn a_star(start: (i32, i32), goal: (i32, i32), max_expansions: u32) -> (Vec<(i32, i32)>, bool, u32) {
     let mut open_set = BinaryHeap::new();
     let mut came_from = HashMap::new();
     let mut g_score = HashMap::new();
-    
+    let mut expanded: u32 = 0;
+    let mut closest = start;
+    let mut closest_distance = manhattan_distance(start, goal);
+
     g_score.insert(start, 0);
     open_set.push(Node {
-        cost: manhattan_distance(start, goal),
+        cost: closest_distance,
         position: start,
     });
 
     while let Some(current) = open_set.pop() {
         if current.position == goal {
-            return reconstruct_path(came_from, current.position);
+            return (reconstruct_path(came_from, current.position), true, expanded);
+        }
+        if expanded >= max_expansions {
+            return (reconstruct_path(came_from, closest), false, expanded);
+        }
+        expanded += 1;
+        let distance = manhattan_distance(current.position, goal);
+        if distance < closest_distance {
+            closest = current.position;
+            closest_distance = distance;
         }
 
         for neighbor in get_neighbors(current.position) {
@@ -102,7 +193,7 @@ fn a_star(start: (i32, i32), goal: (i32, i32)) -> Vec<(i32, i32)> {
             }
         }
     }
-    vec![] // No path found
+    (vec![], true, expanded) // No path found
 }
 
 fn manhattan_distance(a: (i32, i32), b: (i32, i32)) -> i32 {